@@ -1,21 +1,67 @@
+import time
+_import_started = time.perf_counter()
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_login import LoginManager
 from config import Config
+from app.services.replica import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
+_import_ms = round((time.perf_counter() - _import_started) * 1000, 1)
+
+
+class StartupTimer:
+    """Wall time per create_app() phase, kept in app.extensions['startup']"""
+    
+    def __init__(self):
+        self.started = self.lap_started = time.perf_counter()
+        self.phases = {'imports': _import_ms}
+    
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self.lap_started) * 1000, 1)
+        self.lap_started = now
+    
+    def to_dict(self):
+        return {'total_ms': round(sum(self.phases.values()), 1), 'phases': self.phases}
+
+
 def create_app(config_class=Config):
+    timer = StartupTimer()
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # orjson-backed JSON and gzip/brotli for large JSON responses
+    from app.services.encoding import FastJSONProvider, compressor
+    app.json = FastJSONProvider(app)
+    compressor.init_app(app)
+    
     # Initialize extensions
     db.init_app(app)
     CORS(app)
     login_manager.init_app(app)
     login_manager.login_view = 'views.login'
+    timer.lap('extensions')
+    
+    from app.services import replica
+    from app.services.cache import cache
+    from app.services.dedupe import scan_dedupe
+    from app.services.reports import report_cache
+    from app.services.catalog import catalog_cache
+    from app.services.admission import admission
+    from app.services.auth import device_keys
+    cache.init_app(app)
+    replica.init_app(app)
+    scan_dedupe.init_app(app)
+    report_cache.init_app(app)
+    catalog_cache.init_app(app)
+    admission.init_app(app)
+    device_keys.init_app(app)
+    timer.lap('services')
     
     # Register blueprints
     from app.routes.api import api_bp
@@ -23,9 +69,34 @@ def create_app(config_class=Config):
     
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(views_bp)
+    timer.lap('blueprints')
+    
+    # Fingerprinted, precompressed static files
+    from app.services.assets import assets
+    assets.init_app(app)
+    timer.lap('assets')
     
-    # Create database tables
+    # Check the schema version (migrations are applied with `python migrate.py`)
+    from app import migrations
     with app.app_context():
-        db.create_all()
+        migrations.check(app)
+    timer.lap('schema')
+    
+    # Seed live occupancy counters from the latest state per (student, zone)
+    from app.services.occupancy import occupancy
+    occupancy.init_app(app)
+    timer.lap('occupancy')
+    
+    # Periodic maintenance: overdue sweep, compaction, cache warming, ANALYZE, occupancy reconcile
+    from app.services.scheduler import scheduler
+    from app.services import jobs
+    jobs.register(scheduler, app.config)
+    scheduler.init_app(app)
+    timer.lap('scheduler')
+    
+    app.extensions['startup'] = timer.to_dict()
+    if app.config['STARTUP_REPORT']:
+        phases = ', '.join(f'{name} {ms:.0f}' for name, ms in timer.phases.items())
+        print(f"🚀 App ready in {app.extensions['startup']['total_ms']:.0f} ms ({phases})")
     
     return app
@@ -0,0 +1,273 @@
+"""
+Optional ASGI entry point: asyncio scan ingestion in front of the Flask app.
+
+POST /api/scan, POST /api/scan/batch and GET /api/health are handled on the
+event loop by AsyncScanRecorder, so thousands of gates can have a scan in
+flight without a worker thread each. Every other request is passed to the
+regular Flask app on a small thread pool, so one server still serves the
+whole site. Scans are rate limited per reader and checked for a device token (valid
+for the scan's device_id) exactly as in the Flask app (app/services/admission.py, app/services/auth.py).
+
+Requires an ASGI server and an async driver (uvicorn, aiosqlite or asyncpg):
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+import asyncio
+import io
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.admission import admission
+from app.services.auth import device_keys
+from config import Config
+
+
+def create_asgi_app(config_class=Config):
+    from app import create_app
+    from app.services.scan_async import AsyncScanRecorder
+
+    flask_app = create_app(config_class)
+    return ScanIngestionApp(flask_app, AsyncScanRecorder(flask_app))
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _client(scope):
+    return scope['client'][0] if scope.get('client') else ''
+
+
+def _wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': _client(scope),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class ScanIngestionApp:
+    def __init__(self, flask_app, recorder):
+        self.flask_app = flask_app
+        self.recorder = recorder
+        self.json = flask_app.json
+        self.batch_max_size = flask_app.config['SCAN_BATCH_MAX_SIZE']
+        self.executor = ThreadPoolExecutor(flask_app.config['ASGI_WSGI_THREADS'], thread_name_prefix='wsgi')
+        self.routes = {
+            ('POST', '/api/scan'): self.scan,
+            ('POST', '/api/scan/batch'): self.scan_batch,
+            ('GET', '/api/health'): self.health,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        handler = self.routes.get((scope['method'], scope['path']))
+        body = await _read_body(receive)
+        if handler is None:
+            await self.wsgi(scope, body, send)
+            return
+
+        wait = self.rate_limit(scope)
+        if wait:
+            retry_after = max(1, math.ceil(wait))
+            await self.respond(send, 429, {'success': False, 'error': 'Rate limit exceeded', 'retry_after': retry_after},
+                               [(b'retry-after', str(retry_after).encode())])
+            return
+        device = None
+        if handler != self.health:
+            authorized, device = self.device_key(scope)
+            if not authorized:
+                await self.respond(send, 401, {'success': False, 'error': 'Valid X-Device-Token required'})
+                return
+        status, payload = await handler(body, device, _client(scope))
+        await self.respond(send, status, payload)
+
+    async def respond(self, send, status, payload, headers=()):
+        data = self.json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(data)).encode()),
+                        *headers],
+        })
+        await send({'type': 'http.response.body', 'body': data})
+
+    def device_key(self, scope):
+        """(authorized, verified key name) for the X-Device-Token, as device_auth_required checks the Flask routes"""
+        if device_keys.mode == 'off':
+            return True, None
+        token = dict(scope['headers']).get(b'x-device-token', b'').decode('latin-1')
+        device = device_keys.verify(token)
+        if device is not None:
+            return True, device
+        if device_keys.mode == 'warn':
+            print(f"⚠️ Scan from {_client(scope) or '?'} without a valid device token")
+            return True, None
+        return False, None
+
+    def rate_limit(self, scope):
+        """Seconds to wait if this client is over the critical rate, else 0 (keyed as admission does)"""
+        if not admission.enabled:
+            return 0
+        headers = dict(scope['headers'])
+        key = admission.key_for('critical', headers.get(b'x-device-token', b'').decode('latin-1'),
+                                headers.get(b'x-forwarded-for', b'').decode('latin-1'),
+                                _client(scope))
+        return admission.check_rate('critical', key)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.recorder.close()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # ---------- Scan endpoints (same contract as app/routes/api.py) ----------
+    def _parse(self, body):
+        try:
+            return self.json.loads(body) if body else None
+        except ValueError:
+            return None
+
+    async def scan(self, body, device, client):
+        from app.services.scan import scan_args
+
+        try:
+            args = scan_args(self._parse(body))
+        except ValueError as e:
+            return 400, {'success': False, 'error': str(e)}
+        error = device_keys.device_error(device, args[1], client)
+        if error:
+            return 403, {'success': False, 'error': error}
+        return 200, await self.recorder.handle(*args)
+
+    async def scan_batch(self, body, device, client):
+        from app.services.scan import scan_args
+
+        data = self._parse(body)
+        scans = data.get('scans') if isinstance(data, dict) else None
+        if not isinstance(scans, list) or not scans:
+            return 400, {'success': False, 'error': 'scans list required'}
+        if len(scans) > self.batch_max_size:
+            return 413, {'success': False, 'error': f'At most {self.batch_max_size} scans per batch'}
+
+        results = []
+        failed = False
+        for scan in scans:
+            if failed:
+                # Keep per-card order: nothing after a server error is recorded
+                results.append({'success': False, 'error': 'not attempted', 'retryable': True})
+                continue
+            try:
+                args = scan_args(scan)
+            except ValueError as e:
+                results.append({'success': False, 'error': str(e), 'retryable': False})
+                continue
+            error = device_keys.device_error(device, args[1], client)
+            if error:
+                results.append({'success': False, 'error': error, 'retryable': False})
+                continue
+            try:
+                results.append(await self.recorder.handle(*args))
+            except Exception as e:
+                print(f"❌ Batch scan error: {e}")
+                failed = True
+                results.append({'success': False, 'error': 'server error', 'retryable': True})
+        return 200, {'success': True, 'results': results, 'count': len(results)}
+
+    async def health(self, body, device, client):
+        try:
+            await self.recorder.ping()
+        except Exception:
+            return 503, {'status': 'unavailable'}
+        return 200, {'status': 'ok'}
+
+    # ---------- Everything else: the Flask app on a thread pool ----------
+    async def wsgi(self, scope, body, send):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        environ = _wsgi_environ(scope, body)
+
+        def emit(*message):
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+        def run():
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['status'], response['headers'] = status, headers
+
+            try:
+                result = self.flask_app(environ, start_response)
+                try:
+                    emit('start', response['status'], response['headers'])
+                    for chunk in result:
+                        if chunk:
+                            emit('body', chunk)
+                finally:
+                    if hasattr(result, 'close'):
+                        result.close()
+            except Exception as e:
+                print(f"❌ WSGI error on {environ['PATH_INFO']}: {e}")
+                emit('error')
+            emit('end')
+
+        future = loop.run_in_executor(self.executor, run)
+        started = False
+        while True:
+            kind, *args = await queue.get()
+            if kind == 'start':
+                status, headers = args
+                started = True
+                await send({
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+                })
+            elif kind == 'body':
+                await send({'type': 'http.response.body', 'body': args[0], 'more_body': True})
+            elif kind == 'error' and not started:
+                started = True
+                await send({'type': 'http.response.start', 'status': 500,
+                            'headers': [(b'content-type', b'text/plain')]})
+            elif kind == 'end':
+                await send({'type': 'http.response.body', 'body': b''})
+                break
+        await future
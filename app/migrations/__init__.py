@@ -0,0 +1,265 @@
+"""
+Versioned schema migrations.
+
+Each module mNNNN_<name>.py in this package is one migration: NNNN is its
+version, the module docstring its description, and upgrade(op) applies it
+through an Operations helper. Applied versions are recorded in
+schema_version; `python migrate.py` applies whatever is pending.
+
+Migrations run on an autocommit connection so each statement commits on its
+own: index builds never sit inside a long transaction, and PostgreSQL can use
+CREATE INDEX CONCURRENTLY. Migrations must be idempotent (IF NOT EXISTS,
+column checks), since databases created before versioning start at 0.
+Each migration spells out its own tables and columns (op.create_table,
+op.add_column) rather than building from the models, which describe the
+newest schema, not the one at that version.
+
+App startup only reads the latest schema_version row (check()) and compares
+it with the newest migration and a fingerprint of the models; when both match
+it runs no DDL and no reflection. It applies migrations itself only to an
+empty database, or when SCHEMA_AUTO_MIGRATE is set.
+"""
+import hashlib
+import importlib
+import pkgutil
+import time
+
+from sqlalchemy import MetaData, Table, func, inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+# Arbitrary key for the PostgreSQL advisory lock held while migrating
+_LOCK_KEY = 4153_2026
+
+
+class Operations:
+    """Schema helpers passed to each migration's upgrade()"""
+
+    def __init__(self, connection, batch_size=10000):
+        self.connection = connection
+        self.dialect = connection.dialect.name
+        self.batch_size = batch_size
+        self.metadata = MetaData()  # Tables created or referenced by this run's migrations
+
+    def execute(self, sql, **params):
+        return self.connection.execute(text(sql), params)
+
+    def has_table(self, table):
+        return inspect(self.connection).has_table(table)
+
+    def has_column(self, table, column):
+        return any(c['name'] == column for c in inspect(self.connection).get_columns(table))
+
+    def has_index(self, table, name):
+        return any(i['name'] == name for i in inspect(self.connection).get_indexes(table))
+
+    def create_table(self, name, *columns):
+        """
+        CREATE TABLE (and the indexes among columns) unless it exists; returns True if created.
+        columns are sqlalchemy Column / Index / constraint objects, as for Table().
+        """
+        if self.has_table(name):
+            return False
+        for column in columns:
+            for key in getattr(column, 'foreign_keys', ()):
+                target = key.target_fullname.split('.')[0]
+                if target not in self.metadata.tables:
+                    # Created by an earlier run: reflect it so the foreign key resolves
+                    Table(target, self.metadata, autoload_with=self.connection)
+        Table(name, self.metadata, *columns).create(self.connection)
+        return True
+
+    def add_column(self, table, column, ddl):
+        """ALTER TABLE ... ADD COLUMN unless it exists; returns True if added"""
+        if self.has_column(table, column):
+            return False
+        self.execute(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+        return True
+
+    def backfill(self, table, assignments, where, **params):
+        """
+        UPDATE table SET assignments WHERE where, one primary-key range per statement,
+        so writers (gate scans) only ever wait for one batch
+        """
+        lo, hi = self.execute(f'SELECT MIN(id), MAX(id) FROM {table}').one()
+        updated = 0
+        for start in range(lo or 0, (hi or -1) + 1, self.batch_size):
+            updated += self.execute(
+                f'UPDATE {table} SET {assignments} WHERE ({where}) AND id >= :_lo AND id < :_hi',
+                _lo=start, _hi=start + self.batch_size, **params
+            ).rowcount
+        return updated
+
+    def create_index(self, name, table, columns, unique=False):
+        """
+        Build an index without taking the table offline; returns True if built.
+
+        PostgreSQL: CREATE INDEX CONCURRENTLY (reads and writes continue). A failed
+        concurrent build leaves an INVALID index behind, which is dropped and rebuilt.
+        SQLite can't build an index incrementally and blocks writers while it
+        sorts, so the table is first read through in primary-key batches (reads
+        don't block writers in WAL mode) to make the locked build itself short.
+        """
+        unique_sql = 'UNIQUE ' if unique else ''
+        column_sql = ', '.join(columns)
+        if self.dialect == 'postgresql':
+            valid = self.execute(
+                'SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name',
+                name=name
+            ).scalar()
+            if valid:
+                return False
+            if valid is False:
+                self.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            self.execute(f'CREATE {unique_sql}INDEX CONCURRENTLY {name} ON {table} ({column_sql})')
+            return True
+
+        if self.has_index(table, name):
+            return False
+        if self.dialect == 'sqlite':
+            self._prewarm(table, columns)
+        self.execute(f'CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column_sql})')
+        return True
+
+    def _prewarm(self, table, columns):
+        lo, hi = self.execute(f'SELECT MIN(id), MAX(id) FROM {table}').one()
+        step = self.batch_size * 10
+        for start in range(lo or 0, (hi or -1) + 1, step):
+            self.execute(
+                f'SELECT COUNT({columns[0]}) FROM {table} WHERE id >= :lo AND id < :hi',
+                lo=start, hi=start + step
+            )
+
+
+def _module_names():
+    return sorted(
+        info.name for info in pkgutil.iter_modules(__path__)
+        if info.name.startswith('m') and info.name[1:5].isdigit()
+    )
+
+
+def discover():
+    """[(version, name, module)] for every migration in this package, by version"""
+    migrations = [
+        (int(name[1:5]), name[6:], importlib.import_module(f'{__name__}.{name}'))
+        for name in _module_names()
+    ]
+    versions = [m[0] for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f'Duplicate migration versions in {versions}')
+    return migrations
+
+
+def describe(module):
+    return (module.__doc__ or '').strip().split('\n')[0]
+
+
+def latest_version():
+    """Newest migration version, from the file names alone (nothing is imported)"""
+    return max((int(name[1:5]) for name in _module_names()), default=0)
+
+
+def fingerprint():
+    """Short hash of the model schema (tables, columns, types, keys, indexes); no DB access"""
+    from app import db
+
+    parts = []
+    for table in sorted(db.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        for column in table.columns:
+            targets = sorted(fk.target_fullname for fk in column.foreign_keys)
+            parts.append(f'  {column.name} {column.type!r} null={column.nullable} pk={column.primary_key} fk={targets}')
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            parts.append(f'  index {index.name} {[c.name for c in index.columns]} unique={index.unique}')
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()[:16]
+
+
+def _record_fingerprint(connection):
+    from app.models import SchemaVersion
+    version = current_version(connection)
+    connection.execute(
+        SchemaVersion.__table__.update().where(SchemaVersion.version == version).values(fingerprint=fingerprint())
+    )
+
+
+def current_version(connection):
+    """Highest applied version, 0 if nothing was ever recorded"""
+    from app.models import SchemaVersion
+    if not inspect(connection).has_table(SchemaVersion.__tablename__):
+        return 0
+    return connection.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def pending(connection):
+    version = current_version(connection)
+    return [m for m in discover() if m[0] > version]
+
+
+def upgrade(engine, target=None, batch_size=10000, log=print):
+    """Apply pending migrations up to target (default: latest); returns the versions applied"""
+    from app.models import SchemaVersion
+
+    applied = []
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': _LOCK_KEY})
+        try:
+            SchemaVersion.__table__.create(connection, checkfirst=True)
+            op = Operations(connection, batch_size)
+            for version, name, module in pending(connection):
+                if target is not None and version > target:
+                    break
+                log(f"⬆️  {version:04d} {name}: {describe(module)}")
+                started = time.perf_counter()
+                module.upgrade(op)
+                duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                connection.execute(SchemaVersion.__table__.insert().values(
+                    version=version, name=name, duration_ms=duration_ms
+                ))
+                applied.append(version)
+            _record_fingerprint(connection)
+        finally:
+            if connection.dialect.name == 'postgresql':
+                connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': _LOCK_KEY})
+    return applied
+
+
+def check(app):
+    """
+    Startup check: compare the latest schema_version row with the newest migration
+    and the models' fingerprint. One query when they match; otherwise migrates an
+    empty database (fresh install), or anything with SCHEMA_AUTO_MIGRATE, and only
+    warns in other cases, so workers never run DDL against a live database on boot.
+    Returns the schema version.
+    """
+    from app import db
+    from app.models import SchemaVersion
+
+    latest = latest_version()
+    try:
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                select(SchemaVersion.version, SchemaVersion.fingerprint)
+                .order_by(SchemaVersion.version.desc()).limit(1)
+            ).first()
+    except (OperationalError, ProgrammingError):
+        row = None  # No schema_version table (or no fingerprint column) yet
+    expected = fingerprint()
+    if row and row.version >= latest and row.fingerprint == expected:
+        return row.version
+
+    with db.engine.connect() as connection:
+        version = current_version(connection)
+        fresh = version == 0 and not inspect(connection).get_table_names()
+    if fresh or app.config.get('SCHEMA_AUTO_MIGRATE'):
+        upgrade(db.engine, log=lambda message: None)
+        if version >= latest:
+            # Models changed without a migration (development): create what's missing
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                db.metadata.create_all(connection)
+                _record_fingerprint(connection)
+        return max(version, latest)
+    if version < latest:
+        print(f"⚠️  Database schema is at version {version}, code expects {latest}: run `python migrate.py`")
+    else:
+        print("⚠️  Models differ from the migrated schema: add a migration in app/migrations")
+    return version
@@ -0,0 +1,142 @@
+"""Create the tables of the schema before versioning (any that are missing)"""
+from sqlalchemy import JSON, BigInteger, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text
+
+
+def upgrade(op):
+    op.create_table(
+        'students',
+        Column('id', Integer, primary_key=True),
+        Column('rfid_uid', String(50), unique=True, nullable=False, index=True),
+        Column('name', String(100), nullable=False),
+        Column('roll_number', String(50), unique=True, nullable=False),
+        Column('department', String(100)),
+        Column('email', String(120)),
+        Column('is_active', Boolean),
+        Column('is_inside', Boolean),
+        Column('created_at', DateTime),
+    )
+    op.create_table(
+        'books',
+        Column('id', Integer, primary_key=True),
+        Column('title', String(200), nullable=False),
+        Column('author', String(100)),
+        Column('isbn', String(20), unique=True),
+        Column('total_copies', Integer),
+        Column('available_copies', Integer),
+        Column('is_important', Boolean),
+        Column('created_at', DateTime),
+    )
+    op.create_table(
+        'admins',
+        Column('id', Integer, primary_key=True),
+        Column('username', String(64), unique=True, nullable=False, index=True),
+        Column('password_hash', String(256), nullable=False),
+        Column('role', String(20)),
+        Column('created_at', DateTime),
+    )
+    # The (student_id, zone, timestamp) index comes with 0003
+    op.create_table(
+        'attendance_logs',
+        Column('id', Integer, primary_key=True),
+        Column('student_id', Integer, ForeignKey('students.id'), nullable=False),
+        Column('rfid_uid', String(50), nullable=False, index=True),
+        Column('action', String(10), nullable=False),
+        Column('timestamp', DateTime, index=True),
+        Column('device_id', String(50)),
+        Column('zone', String(50)),
+    )
+    op.create_table(
+        'borrow_records',
+        Column('id', Integer, primary_key=True),
+        Column('book_id', Integer, ForeignKey('books.id'), nullable=False),
+        Column('student_id', Integer, ForeignKey('students.id'), nullable=False),
+        Column('borrowed_at', DateTime),
+        Column('due_date', DateTime),
+        Column('returned_at', DateTime),
+        Column('extensions_used', Integer),
+        Column('fine_amount', Float),
+        Column('fine_paid', Boolean),
+        Column('status', String(20)),
+    )
+    op.create_table(
+        'visit_sessions',
+        Column('id', Integer, primary_key=True),
+        Column('student_id', Integer, ForeignKey('students.id'), nullable=False),
+        Column('zone', String(50), nullable=False),
+        Column('entered_at', DateTime, nullable=False),
+        Column('exited_at', DateTime, nullable=False),
+        Column('duration_seconds', Integer, nullable=False),
+        Column('entry_log_id', Integer, ForeignKey('attendance_logs.id')),
+        Column('exit_log_id', Integer, ForeignKey('attendance_logs.id'), unique=True),
+        Index('ix_visit_sessions_student_entered', 'student_id', 'entered_at'),
+        Index('ix_visit_sessions_zone_entered', 'zone', 'entered_at'),
+    )
+    op.create_table(
+        'device_status',
+        Column('device_id', String(50), primary_key=True),
+        Column('zone', String(50)),
+        Column('host', String(100)),
+        Column('transport', String(10)),
+        Column('last_seen', DateTime, nullable=False),
+        Column('uptime_seconds', Integer),
+        Column('scans', Integer),
+        Column('errors', Integer),
+        Column('retries', Integer),
+        Column('queue_depth', Integer),
+        Column('send_p50_ms', Float),
+        Column('send_p95_ms', Float),
+    )
+    op.create_table(
+        'daily_circulation_stats',
+        Column('day', Date, primary_key=True),
+        Column('borrows', Integer, nullable=False),
+        Column('returns', Integer, nullable=False),
+        Column('overdue_returns', Integer, nullable=False),
+        Column('loan_seconds', BigInteger, nullable=False),
+        Column('extensions', Integer, nullable=False),
+        Column('fines_paid', Integer, nullable=False),
+        Column('fine_revenue', Float, nullable=False),
+    )
+    op.create_table(
+        'book_circulation_stats',
+        Column('book_id', Integer, ForeignKey('books.id'), primary_key=True),
+        Column('borrows', Integer, nullable=False),
+        Column('returns', Integer, nullable=False),
+        Column('overdue_returns', Integer, nullable=False),
+        Column('loan_seconds', BigInteger, nullable=False),
+        Column('extensions', Integer, nullable=False),
+        Column('fines_paid', Integer, nullable=False),
+        Column('fine_revenue', Float, nullable=False),
+        Column('last_borrowed_at', DateTime),
+    )
+    op.create_table(
+        'book_versions',
+        Column('book_id', Integer, ForeignKey('books.id'), primary_key=True),
+        Column('availability_version', BigInteger, nullable=False, index=True),
+    )
+    op.create_table(
+        'app_counters',
+        Column('name', String(50), primary_key=True),
+        Column('value', BigInteger, nullable=False),
+    )
+    op.create_table(
+        'job_leases',
+        Column('name', String(50), primary_key=True),
+        Column('owner', String(100)),
+        Column('acquired_at', DateTime),
+        Column('expires_at', DateTime, nullable=False),
+        Column('next_run_at', DateTime, nullable=False),
+    )
+    op.create_table(
+        'job_runs',
+        Column('id', Integer, primary_key=True),
+        Column('job', String(50), nullable=False),
+        Column('owner', String(100)),
+        Column('started_at', DateTime, nullable=False),
+        Column('finished_at', DateTime),
+        Column('duration_ms', Float),
+        Column('status', String(20), nullable=False),
+        Column('result', JSON),
+        Column('error', Text),
+        Index('ix_job_runs_job_started', 'job', 'started_at'),
+    )
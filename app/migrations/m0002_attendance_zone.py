@@ -0,0 +1,7 @@
+"""Add attendance_logs.zone (formerly migrate_zones.py)"""
+
+
+def upgrade(op):
+    if op.add_column('attendance_logs', 'zone', "VARCHAR(50) DEFAULT 'Library'"):
+        # Dialects that don't fill the default into existing rows
+        op.backfill('attendance_logs', "zone = 'Library'", 'zone IS NULL')
@@ -0,0 +1,9 @@
+"""Composite indexes for per-student zone history and open/returned loan lookups"""
+
+
+def upgrade(op):
+    # Latest log per (student, zone): scan handling, occupancy, visit rebuilds
+    op.create_index('ix_attendance_logs_student_zone_ts', 'attendance_logs', ['student_id', 'zone', 'timestamp'])
+    # A student's open loans / a book's open loans (returned_at IS NULL)
+    op.create_index('ix_borrow_records_student_returned', 'borrow_records', ['student_id', 'returned_at'])
+    op.create_index('ix_borrow_records_book_returned', 'borrow_records', ['book_id', 'returned_at'])
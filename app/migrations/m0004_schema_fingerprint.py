@@ -0,0 +1,5 @@
+"""Record a model schema fingerprint with the version, so startup can skip DDL checks"""
+
+
+def upgrade(op):
+    op.add_column('schema_version', 'fingerprint', 'VARCHAR(40)')
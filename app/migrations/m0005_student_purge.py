@@ -0,0 +1,24 @@
+"""Soft-deleted students (students.deleted_at) and the background purge queue"""
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+
+def upgrade(op):
+    op.add_column('students', 'deleted_at', 'TIMESTAMP')
+    op.create_table(
+        'student_purges',
+        Column('id', Integer, primary_key=True),
+        Column('student_id', Integer, nullable=False, unique=True),
+        Column('name', String(100)),
+        Column('roll_number', String(50)),
+        Column('rfid_uid', String(50)),
+        Column('status', String(20), nullable=False, index=True),
+        Column('requested_at', DateTime, nullable=False),
+        Column('started_at', DateTime),
+        Column('finished_at', DateTime),
+        Column('rows_total', Integer, nullable=False),
+        Column('logs_deleted', Integer, nullable=False),
+        Column('visits_deleted', Integer, nullable=False),
+        Column('borrows_deleted', Integer, nullable=False),
+        Column('copies_restored', Integer, nullable=False),
+        Column('error', Text),
+    )
@@ -0,0 +1,13 @@
+"""Scanner device keys and admin session versions (revocation)"""
+from sqlalchemy import Column, DateTime, Integer, String
+
+
+def upgrade(op):
+    op.add_column('admins', 'session_version', 'INTEGER NOT NULL DEFAULT 0')
+    op.create_table(
+        'device_keys',
+        Column('id', Integer, primary_key=True),
+        Column('name', String(50), nullable=False, index=True),
+        Column('created_at', DateTime, nullable=False),
+        Column('revoked_at', DateTime),
+    )
@@ -0,0 +1,23 @@
+"""Online backup history and the attendance export watermark"""
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, String, Text
+
+
+def upgrade(op):
+    op.create_table(
+        'backup_snapshots',
+        Column('id', Integer, primary_key=True),
+        Column('kind', String(20), nullable=False),
+        Column('status', String(20), nullable=False, index=True),
+        Column('path', String(500)),
+        Column('started_at', DateTime, nullable=False),
+        Column('finished_at', DateTime),
+        Column('duration_ms', Float),
+        Column('size_bytes', BigInteger),
+        Column('rows', Integer),
+        Column('from_watermark', Integer),
+        Column('watermark', Integer),
+        Column('lock_wait_ms', Float),
+        Column('max_step_ms', Float),
+        Column('restarts', Integer),
+        Column('error', Text),
+    )
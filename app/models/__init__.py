@@ -3,3 +3,15 @@ from app.models.attendance import AttendanceLog
 from app.models.admin import Admin
 from app.models.book import Book
 from app.models.borrow_record import BorrowRecord
+from app.models.visit_session import VisitSession
+from app.models.device_status import DeviceStatus
+from app.models.book_circulation_stat import BookCirculationStat
+from app.models.daily_circulation_stat import DailyCirculationStat
+from app.models.app_counter import AppCounter
+from app.models.book_version import BookVersion
+from app.models.job_lease import JobLease
+from app.models.job_run import JobRun
+from app.models.schema_version import SchemaVersion
+from app.models.student_purge import StudentPurge
+from app.models.device_key import DeviceKey
+from app.models.backup_snapshot import BackupSnapshot
@@ -10,6 +10,7 @@ class Admin(UserMixin, db.Model):
     username = db.Column(db.String(64), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(20), default='admin')
+    session_version = db.Column(db.Integer, default=0, nullable=False)  # Bumped to sign out every session
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
@@ -31,4 +32,6 @@ class Admin(UserMixin, db.Model):
 
 @login_manager.user_loader
 def load_user(id):
-    return Admin.query.get(int(id))
+    # Resolved from the signed session, not a query per request
+    from app.services.auth import load_admin
+    return load_admin(id)
@@ -0,0 +1,11 @@
+from app import db
+
+class AppCounter(db.Model):
+    """Named monotonic counters (e.g. the book availability version)"""
+    __tablename__ = 'app_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<AppCounter {self.name}={self.value}>'
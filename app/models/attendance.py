@@ -12,6 +12,10 @@ class AttendanceLog(db.Model):
     device_id = db.Column(db.String(50), default='GATE_01')  # Identify which reader
     zone = db.Column(db.String(50), default='Library')  # 'Library', 'Lab', 'Classroom'
     
+    __table_args__ = (
+        db.Index('ix_attendance_logs_student_zone_ts', 'student_id', 'zone', 'timestamp'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -20,7 +24,7 @@ class AttendanceLog(db.Model):
             'roll_number': self.student.roll_number if self.student else None,
             'rfid_uid': self.rfid_uid,
             'action': self.action,
-            'timestamp': self.timestamp.isoformat() + 'Z' if self.timestamp else None,
+            'timestamp': self.timestamp,
             'device_id': self.device_id,
             'zone': self.zone
         }
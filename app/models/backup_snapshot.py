@@ -0,0 +1,51 @@
+from datetime import datetime
+from app import db
+
+class BackupSnapshot(db.Model):
+    """One online backup: a full snapshot or an incremental attendance export (see services/backup.py)"""
+    __tablename__ = 'backup_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # full, attendance
+    status = db.Column(db.String(20), default='running', nullable=False, index=True)  # running, done, failed, pruned
+    path = db.Column(db.String(500))
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Float)
+    size_bytes = db.Column(db.BigInteger)
+    rows = db.Column(db.Integer)                 # Attendance logs exported (attendance exports only)
+    from_watermark = db.Column(db.Integer)       # Exports cover attendance_logs.id in (from_watermark, watermark]
+    watermark = db.Column(db.Integer)            # Highest attendance_logs.id included
+    lock_wait_ms = db.Column(db.Float)           # Time the backup spent waiting for locks held by writers
+    max_step_ms = db.Column(db.Float)            # Longest single step: the most a writer waited on the backup
+    restarts = db.Column(db.Integer, default=0)  # SQLite copies restarted by concurrent writes
+    error = db.Column(db.Text)
+    
+    @property
+    def throughput_mb_s(self):
+        if not self.size_bytes or not self.duration_ms:
+            return None
+        return round(self.size_bytes / 1e6 / (self.duration_ms / 1000), 2)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'path': self.path,
+            'started_at': self.started_at.isoformat() + 'Z' if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() + 'Z' if self.finished_at else None,
+            'duration_ms': self.duration_ms,
+            'size_bytes': self.size_bytes,
+            'throughput_mb_s': self.throughput_mb_s,
+            'rows': self.rows,
+            'from_watermark': self.from_watermark,
+            'watermark': self.watermark,
+            'lock_wait_ms': self.lock_wait_ms,
+            'max_step_ms': self.max_step_ms,
+            'restarts': self.restarts,
+            'error': self.error
+        }
+    
+    def __repr__(self):
+        return f'<BackupSnapshot {self.id} {self.kind} {self.status}>'
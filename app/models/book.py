@@ -25,7 +25,7 @@ class Book(db.Model):
             'total_copies': self.total_copies,
             'available_copies': self.available_copies,
             'is_important': self.is_important,
-            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None
+            'created_at': self.created_at
         }
     
     def __repr__(self):
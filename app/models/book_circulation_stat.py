@@ -0,0 +1,40 @@
+from app import db
+
+class BookCirculationStat(db.Model):
+    """Per-book circulation rollup, kept current by the borrow endpoints (see services/circulation.py)"""
+    __tablename__ = 'book_circulation_stats'
+    
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    borrows = db.Column(db.Integer, default=0, nullable=False)
+    returns = db.Column(db.Integer, default=0, nullable=False)
+    overdue_returns = db.Column(db.Integer, default=0, nullable=False)
+    loan_seconds = db.Column(db.BigInteger, default=0, nullable=False)  # Sum over returned loans
+    extensions = db.Column(db.Integer, default=0, nullable=False)
+    fines_paid = db.Column(db.Integer, default=0, nullable=False)
+    fine_revenue = db.Column(db.Float, default=0.0, nullable=False)
+    last_borrowed_at = db.Column(db.DateTime)
+    
+    book = db.relationship('Book')
+    
+    def to_dict(self):
+        active = self.borrows - self.returns
+        return {
+            'book_id': self.book_id,
+            'title': self.book.title if self.book else None,
+            'total_copies': self.book.total_copies if self.book else None,
+            'is_important': self.book.is_important if self.book else None,
+            'borrows': self.borrows,
+            'returns': self.returns,
+            'active_loans': active,
+            'utilization': round(active / self.book.total_copies, 2) if self.book and self.book.total_copies else None,
+            'avg_loan_days': round(self.loan_seconds / self.returns / 86400, 2) if self.returns else None,
+            'overdue_rate': round(self.overdue_returns / self.returns, 3) if self.returns else None,
+            'extensions': self.extensions,
+            'fines_paid': self.fines_paid,
+            'fine_revenue': round(self.fine_revenue, 2),
+            'last_borrowed_at': self.last_borrowed_at.isoformat() + 'Z' if self.last_borrowed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<BookCirculationStat {self.book_id}: {self.borrows} borrows>'
+
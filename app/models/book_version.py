@@ -0,0 +1,11 @@
+from app import db
+
+class BookVersion(db.Model):
+    """Catalog version at which a book's availability last changed (see services/catalog.py)"""
+    __tablename__ = 'book_versions'
+    
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id'), primary_key=True)
+    availability_version = db.Column(db.BigInteger, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<BookVersion {self.book_id}@{self.availability_version}>'
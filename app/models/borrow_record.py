@@ -1,6 +1,13 @@
 from datetime import datetime, timedelta
 from app import db
 
+def days_overdue(due_date, as_of):
+    """Whole days past due; 1 second past the due date counts as 1 day"""
+    if as_of <= due_date:
+        return 0
+    delta = as_of - due_date
+    return delta.days + (1 if delta.seconds > 0 or delta.microseconds > 0 else 0)
+
 class BorrowRecord(db.Model):
     __tablename__ = 'borrow_records'
     
@@ -15,6 +22,11 @@ class BorrowRecord(db.Model):
     fine_paid = db.Column(db.Boolean, default=False)
     status = db.Column(db.String(20), default='ACTIVE')  # ACTIVE, RETURNED, OVERDUE
     
+    __table_args__ = (
+        db.Index('ix_borrow_records_student_returned', 'student_id', 'returned_at'),
+        db.Index('ix_borrow_records_book_returned', 'book_id', 'returned_at'),
+    )
+    
     def calculate_fine(self):
         """Calculate fine: ₹1 per day past due date"""
         if self.status == 'RETURNED' or self.fine_paid:
@@ -22,11 +34,7 @@ class BorrowRecord(db.Model):
             
         now = datetime.utcnow()
         if now > self.due_date:
-            # Calculate days overdue (difference in full days)
-            delta = now - self.due_date
-            # 1 second past midnight counts as 1 day overdue
-            days_overdue = delta.days + (1 if delta.seconds > 0 or delta.microseconds > 0 else 0)
-            self.fine_amount = float(max(0, days_overdue))
+            self.fine_amount = float(days_overdue(self.due_date, now))
             self.status = 'OVERDUE'
         else:
             # If it was overdue but now (due to extension) it isn't, 
@@ -45,9 +53,9 @@ class BorrowRecord(db.Model):
             'book_title': self.book.title if self.book else None,
             'student_id': self.student_id,
             'student_name': self.student.name if self.student else None,
-            'borrowed_at': self.borrowed_at.isoformat() + 'Z' if self.borrowed_at else None,
-            'due_date': self.due_date.isoformat() + 'Z' if self.due_date else None,
-            'returned_at': self.returned_at.isoformat() + 'Z' if self.returned_at else None,
+            'borrowed_at': self.borrowed_at,
+            'due_date': self.due_date,
+            'returned_at': self.returned_at,
             'extensions_used': self.extensions_used,
             'fine_amount': self.fine_amount,
             'fine_paid': self.fine_paid,
@@ -0,0 +1,29 @@
+from app import db
+
+class DailyCirculationStat(db.Model):
+    """Per-day (UTC) circulation rollup: loans out, returns, extensions and fine revenue"""
+    __tablename__ = 'daily_circulation_stats'
+    
+    day = db.Column(db.Date, primary_key=True)
+    borrows = db.Column(db.Integer, default=0, nullable=False)
+    returns = db.Column(db.Integer, default=0, nullable=False)
+    overdue_returns = db.Column(db.Integer, default=0, nullable=False)
+    loan_seconds = db.Column(db.BigInteger, default=0, nullable=False)
+    extensions = db.Column(db.Integer, default=0, nullable=False)
+    fines_paid = db.Column(db.Integer, default=0, nullable=False)
+    fine_revenue = db.Column(db.Float, default=0.0, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'borrows': self.borrows,
+            'returns': self.returns,
+            'overdue_returns': self.overdue_returns,
+            'avg_loan_days': round(self.loan_seconds / self.returns / 86400, 2) if self.returns else None,
+            'extensions': self.extensions,
+            'fines_paid': self.fines_paid,
+            'fine_revenue': round(self.fine_revenue, 2)
+        }
+    
+    def __repr__(self):
+        return f'<DailyCirculationStat {self.day}>'
@@ -0,0 +1,22 @@
+from datetime import datetime
+from app import db
+
+class DeviceKey(db.Model):
+    """A scanner's X-Device-Token key; the token is an HMAC of the id, so no secret is stored (see services/auth.py)"""
+    __tablename__ = 'device_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, index=True)  # The Pi's DEVICE_ID, or its readers' ids comma-separated
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    revoked_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'created_at': self.created_at,
+            'revoked_at': self.revoked_at,
+        }
+    
+    def __repr__(self):
+        return f'<DeviceKey {self.id} {self.name}>'
@@ -0,0 +1,45 @@
+from datetime import datetime
+from app import db
+
+class DeviceStatus(db.Model):
+    """Latest heartbeat from a gate reader (one row per device, upserted)"""
+    __tablename__ = 'device_status'
+    
+    device_id = db.Column(db.String(50), primary_key=True)
+    zone = db.Column(db.String(50))
+    host = db.Column(db.String(100))
+    transport = db.Column(db.String(10))
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    uptime_seconds = db.Column(db.Integer, default=0)
+    scans = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Integer, default=0)
+    retries = db.Column(db.Integer, default=0)
+    queue_depth = db.Column(db.Integer, default=0)
+    send_p50_ms = db.Column(db.Float)
+    send_p95_ms = db.Column(db.Float)
+    
+    def is_stale(self, stale_seconds, now=None):
+        now = now or datetime.utcnow()
+        return (now - self.last_seen).total_seconds() > stale_seconds
+    
+    def to_dict(self, stale_seconds=None):
+        data = {
+            'device_id': self.device_id,
+            'zone': self.zone,
+            'host': self.host,
+            'transport': self.transport,
+            'last_seen': self.last_seen.isoformat() + 'Z' if self.last_seen else None,
+            'uptime_seconds': self.uptime_seconds,
+            'scans': self.scans,
+            'errors': self.errors,
+            'retries': self.retries,
+            'queue_depth': self.queue_depth,
+            'send_p50_ms': self.send_p50_ms,
+            'send_p95_ms': self.send_p95_ms
+        }
+        if stale_seconds is not None:
+            data['stale'] = self.is_stale(stale_seconds)
+        return data
+    
+    def __repr__(self):
+        return f'<DeviceStatus {self.device_id} @ {self.last_seen}>'
@@ -0,0 +1,18 @@
+from datetime import datetime
+from app import db
+
+class JobLease(db.Model):
+    """Cluster-wide schedule and lock for one periodic job (see services/scheduler.py)"""
+    __tablename__ = 'job_leases'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))                    # host:pid holding the lease, None when free
+    acquired_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    next_run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def is_held(self, now=None):
+        return self.owner is not None and self.expires_at > (now or datetime.utcnow())
+    
+    def __repr__(self):
+        return f'<JobLease {self.name} owner={self.owner}>'
@@ -0,0 +1,36 @@
+from datetime import datetime
+from app import db
+
+class JobRun(db.Model):
+    """One execution of a scheduled job"""
+    __tablename__ = 'job_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(50), nullable=False)
+    owner = db.Column(db.String(100))
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Float)
+    status = db.Column(db.String(20), default='running', nullable=False)  # running, success, failed, timeout, abandoned
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    
+    __table_args__ = (
+        db.Index('ix_job_runs_job_started', 'job', 'started_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job': self.job,
+            'owner': self.owner,
+            'started_at': self.started_at.isoformat() + 'Z' if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() + 'Z' if self.finished_at else None,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error
+        }
+    
+    def __repr__(self):
+        return f'<JobRun {self.job} {self.status}>'
@@ -0,0 +1,15 @@
+from datetime import datetime
+from app import db
+
+class SchemaVersion(db.Model):
+    """One row per applied migration (see app/migrations); the schema version is the max"""
+    __tablename__ = 'schema_version'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    duration_ms = db.Column(db.Float)
+    fingerprint = db.Column(db.String(40))  # Model schema hash after this migration (see migrations.fingerprint)
+    
+    def __repr__(self):
+        return f'<SchemaVersion {self.version} {self.name}>'
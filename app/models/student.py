@@ -13,6 +13,8 @@ class Student(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     is_inside = db.Column(db.Boolean, default=False)  # Track if currently in library
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set by deletion: the student is hidden at once, their history is purged in the background
+    deleted_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
     attendance_logs = db.relationship('AttendanceLog', backref='student', lazy='dynamic')
@@ -28,7 +30,7 @@ class Student(db.Model):
             'email': self.email,
             'is_active': self.is_active,
             'is_inside': self.is_inside,
-            'created_at': (self.created_at.isoformat() + 'Z') if self.created_at else None
+            'created_at': self.created_at
         }
     
     def __repr__(self):
@@ -0,0 +1,50 @@
+from datetime import datetime
+from app import db
+
+class StudentPurge(db.Model):
+    """Background removal of a deleted student's history (see services/purge.py)"""
+    __tablename__ = 'student_purges'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, nullable=False, unique=True)  # No FK: the student row goes last
+    name = db.Column(db.String(100))
+    roll_number = db.Column(db.String(50))
+    rfid_uid = db.Column(db.String(50))
+    status = db.Column(db.String(20), default='pending', nullable=False, index=True)  # pending, running, done, failed
+    requested_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    rows_total = db.Column(db.Integer, default=0, nullable=False)  # Counted when queued
+    logs_deleted = db.Column(db.Integer, default=0, nullable=False)
+    visits_deleted = db.Column(db.Integer, default=0, nullable=False)
+    borrows_deleted = db.Column(db.Integer, default=0, nullable=False)
+    copies_restored = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text)
+    
+    @property
+    def rows_deleted(self):
+        return self.logs_deleted + self.visits_deleted + self.borrows_deleted
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'name': self.name,
+            'roll_number': self.roll_number,
+            'rfid_uid': self.rfid_uid,
+            'status': self.status,
+            'requested_at': self.requested_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'rows_total': self.rows_total,
+            'rows_deleted': self.rows_deleted,
+            'progress': 1.0 if self.status == 'done' else round(min(1.0, self.rows_deleted / self.rows_total), 3) if self.rows_total else 0.0,
+            'logs_deleted': self.logs_deleted,
+            'visits_deleted': self.visits_deleted,
+            'borrows_deleted': self.borrows_deleted,
+            'copies_restored': self.copies_restored,
+            'error': self.error
+        }
+    
+    def __repr__(self):
+        return f'<StudentPurge {self.student_id} {self.status}>'
@@ -0,0 +1,32 @@
+from app import db
+
+class VisitSession(db.Model):
+    """A paired ENTRY/EXIT in one zone, materialized when the EXIT is recorded"""
+    __tablename__ = 'visit_sessions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    zone = db.Column(db.String(50), nullable=False)
+    entered_at = db.Column(db.DateTime, nullable=False)
+    exited_at = db.Column(db.DateTime, nullable=False)
+    duration_seconds = db.Column(db.Integer, nullable=False)
+    entry_log_id = db.Column(db.Integer, db.ForeignKey('attendance_logs.id'))
+    exit_log_id = db.Column(db.Integer, db.ForeignKey('attendance_logs.id'), unique=True)
+    
+    __table_args__ = (
+        db.Index('ix_visit_sessions_student_entered', 'student_id', 'entered_at'),
+        db.Index('ix_visit_sessions_zone_entered', 'zone', 'entered_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'zone': self.zone,
+            'entered_at': self.entered_at.isoformat() + 'Z' if self.entered_at else None,
+            'exited_at': self.exited_at.isoformat() + 'Z' if self.exited_at else None,
+            'duration_seconds': self.duration_seconds
+        }
+    
+    def __repr__(self):
+        return f'<VisitSession {self.student_id} in {self.zone} for {self.duration_seconds}s>'
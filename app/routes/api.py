@@ -1,89 +1,106 @@
+from collections import Counter
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import current_user, login_required
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import Student, AttendanceLog, Admin, Book, BorrowRecord
+from app.models import Student, AttendanceLog, Admin, Book, BorrowRecord, DeviceStatus, BookCirculationStat
+from app.services.replica import replica_reads
+from app.services.occupancy import occupancy
+from app.services.scan import handle_scan, scan_args
+from app.services import visits, circulation, catalog, purge, corrections, backup
+from app.services.reports import report_cache, REPORTS
+from app.services.scheduler import scheduler
+from app.services.admission import admission, priority
+from app.services.cache import cache
+from app.services.auth import device_auth_required, device_error, revoke_sessions
 
 api_bp = Blueprint('api', __name__)
 
 # ============== RFID SCAN ENDPOINT ==============
 @api_bp.route('/scan', methods=['POST'])
+@priority('critical')
+@device_auth_required
 def scan_rfid():
     """
     Main endpoint for RFID scanner.
     Receives RFID UID and logs entry/exit.
     """
-    data = request.get_json()
-    
-    if not data or 'rfid_uid' not in data:
-        return jsonify({'success': False, 'error': 'RFID UID required'}), 400
-    
-    rfid_uid = data['rfid_uid'].upper().strip()
-    device_id = data.get('device_id', 'GATE_01')
-    zone = data.get('zone', 'Library')
-    
-    # Find student by RFID
-    student = Student.query.filter_by(rfid_uid=rfid_uid, is_active=True).first()
-    
-    is_new_registration = False
-    if not student:
-        # AUTO-REGISTRATION LOGIC
-        print(f"✨ Auto-registering new card: {rfid_uid}")
-        student = Student(
-            rfid_uid=rfid_uid,
-            name=f"New Student ({rfid_uid})",
-            roll_number=f"TEMP-{rfid_uid}",
-            department="Auto-Registered",
-            is_inside=False # Will be set to True below
-        )
-        db.session.add(student)
-        db.session.commit()
-        is_new_registration = True
-    
-    # Zone-specific toggling logic
-    latest_log = AttendanceLog.query.filter_by(
-        student_id=student.id, 
-        zone=zone
-    ).order_by(AttendanceLog.timestamp.desc()).first()
-
-    if latest_log and latest_log.action == 'ENTRY':
-        action = 'EXIT'
-        # Update student global state if needed
-        student.is_inside = False
-    else:
-        action = 'ENTRY'
-        student.is_inside = True
-    
-    # Create attendance log
-    log = AttendanceLog(
-        student_id=student.id,
-        rfid_uid=rfid_uid,
-        action=action,
-        device_id=device_id,
-        zone=zone
-    )
+    try:
+        args = scan_args(request.get_json())
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    error = device_error(args[1])
+    if error:
+        return jsonify({'success': False, 'error': error}), 403
     
-    db.session.add(log)
-    db.session.commit()
+    return jsonify(handle_scan(*args))
+
+
+@api_bp.route('/scan/batch', methods=['POST'])
+@priority('critical')
+@device_auth_required
+def scan_rfid_batch():
+    """
+    Upload a chunk of queued scans in one request, recorded in the given order.
+    Expected JSON: {"scans": [{"rfid_uid", "device_id", "zone", "client_seq", "timestamp"}, ...]}
+    Returns one result per scan. Failed scans carry 'retryable': True when the
+    reader should keep them queued (server error) rather than drop them (bad input);
+    scans after a server error are not attempted.
+    """
+    data = request.get_json()
+    scans = data.get('scans') if data else None
+    if not isinstance(scans, list) or not scans:
+        return jsonify({'success': False, 'error': 'scans list required'}), 400
+    max_size = current_app.config['SCAN_BATCH_MAX_SIZE']
+    if len(scans) > max_size:
+        return jsonify({'success': False, 'error': f'At most {max_size} scans per batch'}), 413
+    
+    results = []
+    failed = False
+    for scan in scans:
+        if failed:
+            # Keep per-card order: nothing after a server error is recorded
+            results.append({'success': False, 'error': 'not attempted', 'retryable': True})
+            continue
+        try:
+            args = scan_args(scan)
+        except ValueError as e:
+            results.append({'success': False, 'error': str(e), 'retryable': False})
+            continue
+        error = device_error(args[1])
+        if error:
+            results.append({'success': False, 'error': error, 'retryable': False})
+            continue
+        try:
+            results.append(handle_scan(*args))
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Batch scan error: {e}")
+            failed = True
+            results.append({'success': False, 'error': 'server error', 'retryable': True})
     
-    return jsonify({
-        'success': True,
-        'action': action,
-        'student': {
-            'id': student.id,
-            'name': student.name,
-            'roll_number': student.roll_number,
-            'department': student.department
-        },
-        'zone': log.zone,
-        'timestamp': log.timestamp.isoformat() + 'Z'
-    })
+    return jsonify({'success': True, 'results': results, 'count': len(results)})
+
+
+@api_bp.route('/health', methods=['GET'])
+@priority('critical')
+def health():
+    """Cheap liveness probe (readers poll this before draining their offline queue)"""
+    try:
+        db.session.execute(text('SELECT 1'))
+    except Exception:
+        return jsonify({'status': 'unavailable'}), 503
+    return jsonify({'status': 'ok'})
 
 
 # ============== STUDENT ENDPOINTS ==============
 @api_bp.route('/students', methods=['GET'])
+@replica_reads
 def get_students():
     """Get all students"""
-    students = Student.query.order_by(Student.name).all()
+    students = Student.query.filter_by(deleted_at=None).order_by(Student.name).all()
     return jsonify({
         'success': True,
         'students': [s.to_dict() for s in students],
@@ -142,14 +159,14 @@ def create_student():
 @api_bp.route('/students/<int:id>', methods=['GET'])
 def get_student(id):
     """Get a single student"""
-    student = Student.query.get_or_404(id)
+    student = Student.query.filter_by(id=id, deleted_at=None).first_or_404()
     return jsonify({'success': True, 'student': student.to_dict()})
 
 
 @api_bp.route('/students/<int:id>', methods=['PUT'])
 def update_student(id):
     """Update a student"""
-    student = Student.query.get_or_404(id)
+    student = Student.query.filter_by(id=id, deleted_at=None).first_or_404()
     data = request.get_json()
     
     if 'name' in data:
@@ -175,31 +192,52 @@ def update_student(id):
         student.roll_number = data['roll_number'].strip()
     
     db.session.commit()
+    if 'department' in data:
+        report_cache.clear()
     return jsonify({'success': True, 'student': student.to_dict()})
 
 
 @api_bp.route('/students/<int:id>', methods=['DELETE'])
 def delete_student(id):
-    """Delete a student"""
-    student = Student.query.get_or_404(id)
-    
-    # Delete related attendance logs first
-    AttendanceLog.query.filter_by(student_id=id).delete()
-    
-    db.session.delete(student)
-    db.session.commit()
-    return jsonify({'success': True, 'message': 'Student deleted'})
+    """
+    Delete a student: hidden from scans and lookups at once, their logs, visits
+    and borrow records are purged in the background (GET /api/admin/purges)
+    """
+    Student.query.get_or_404(id)
+    result = purge.delete_students([id])
+    _start_purge()
+    return jsonify({'success': True, 'message': 'Student deleted', **result})
+
+
+@api_bp.route('/students/delete', methods=['POST'])
+@login_required
+def delete_students():
+    """Delete many students at once (e.g. a graduating class). Expected JSON: {"ids": [...]}"""
+    data = request.get_json()
+    ids = data.get('ids') if data else None
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        return jsonify({'success': False, 'error': 'ids list required'}), 400
+    result = purge.delete_students(ids)
+    _start_purge()
+    return jsonify({'success': True, **result})
+
+
+def _start_purge():
+    if 'student-purge' in scheduler.jobs:
+        scheduler.trigger('student-purge')
 
 
 # ============== ATTENDANCE ENDPOINTS ==============
 @api_bp.route('/attendance', methods=['GET'])
+@replica_reads
 def get_attendance():
     """Get attendance logs with optional filters"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
     date = request.args.get('date')  # Format: YYYY-MM-DD
     
-    query = AttendanceLog.query.order_by(AttendanceLog.timestamp.desc())
+    # Student names in the same query, not one lookup per log
+    query = AttendanceLog.query.options(joinedload(AttendanceLog.student)).order_by(AttendanceLog.timestamp.desc())
     
     if date:
         try:
@@ -223,12 +261,14 @@ def get_attendance():
 
 
 @api_bp.route('/attendance/today', methods=['GET'])
+@priority('low')
+@replica_reads
 def get_today_attendance():
     """Get today's attendance logs"""
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     tomorrow = today + timedelta(days=1)
     
-    logs = AttendanceLog.query.filter(
+    logs = AttendanceLog.query.options(joinedload(AttendanceLog.student)).filter(
         AttendanceLog.timestamp >= today,
         AttendanceLog.timestamp < tomorrow
     ).order_by(AttendanceLog.timestamp.desc()).all()
@@ -251,6 +291,11 @@ def update_attendance_zone(id):
     
     log.zone = data['zone']
     db.session.commit()
+    # The log now closes (or opens) a visit in a different zone
+    visits.rebuild_students([log.student_id])
+    corrections.refresh_is_inside([log.student_id])
+    occupancy.refresh_student(log.student_id)
+    report_cache.invalidate_day(log.timestamp.date())
     
     return jsonify({
         'success': True,
@@ -258,8 +303,29 @@ def update_attendance_zone(id):
     })
 
 
+@api_bp.route('/attendance/bulk-update', methods=['POST'])
+@login_required
+def bulk_update_attendance():
+    """
+    Correct many attendance logs at once (e.g. a misconfigured gate for a day).
+    Expected JSON: {"filter": {"ids", "device_id", "zone", "action", "start", "end"},
+                    "patch": {"zone", "device_id", "action"}, "dry_run": false}
+    start/end are ISO 8601 (end exclusive). dry_run only counts the rows.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'success': False, 'error': 'filter and patch required'}), 400
+    try:
+        result = corrections.bulk_update(data.get('filter'), data.get('patch'), dry_run=data.get('dry_run', False))
+    except corrections.CorrectionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, **result})
+
+
 # ============== DASHBOARD ENDPOINTS ==============
 @api_bp.route('/dashboard/stats', methods=['GET'])
+@priority('low')
+@replica_reads
 def get_dashboard_stats():
     """Get statistics for dashboard"""
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -271,36 +337,24 @@ def get_dashboard_stats():
     # Total registered students
     total_students = Student.query.filter_by(is_active=True).count()
     
-    # Today's entry count
-    today_entries = AttendanceLog.query.filter(
-        AttendanceLog.timestamp >= today,
-        AttendanceLog.timestamp < tomorrow,
-        AttendanceLog.action == 'ENTRY'
-    ).count()
-    
-    # Today's exit count
-    today_exits = AttendanceLog.query.filter(
-        AttendanceLog.timestamp >= today,
-        AttendanceLog.timestamp < tomorrow,
-        AttendanceLog.action == 'EXIT'
-    ).count()
+    # Today's entry and exit counts
+    today_range = (AttendanceLog.timestamp >= today, AttendanceLog.timestamp < tomorrow)
+    action_counts = dict(db.session.execute(
+        select(AttendanceLog.action, func.count()).where(*today_range).group_by(AttendanceLog.action)
+    ).all())
+    today_entries = action_counts.get('ENTRY', 0)
+    today_exits = action_counts.get('EXIT', 0)
     
     # Recent activity (last 10 scans)
-    recent_logs = AttendanceLog.query.order_by(
+    recent_logs = AttendanceLog.query.options(joinedload(AttendanceLog.student)).order_by(
         AttendanceLog.timestamp.desc()
     ).limit(10).all()
     
-    # Hourly breakdown for today
-    hourly_data = []
-    for hour in range(24):
-        start = today + timedelta(hours=hour)
-        end = start + timedelta(hours=1)
-        count = AttendanceLog.query.filter(
-            AttendanceLog.timestamp >= start,
-            AttendanceLog.timestamp < end,
-            AttendanceLog.action == 'ENTRY'
-        ).count()
-        hourly_data.append({'hour': hour, 'entries': count})
+    # Hourly breakdown for today, bucketed from one read of today's entry times
+    hours = Counter(timestamp.hour for timestamp in db.session.scalars(
+        select(AttendanceLog.timestamp).where(*today_range, AttendanceLog.action == 'ENTRY')
+    ))
+    hourly_data = [{'hour': hour, 'entries': hours[hour]} for hour in range(24)]
     
     return jsonify({
         'success': True,
@@ -310,11 +364,176 @@ def get_dashboard_stats():
             'today_entries': today_entries,
             'today_exits': today_exits
         },
+        'zone_occupancy': occupancy.snapshot(current_app.config['ZONES'])['zones'],
         'recent_activity': [log.to_dict() for log in recent_logs],
         'hourly_data': hourly_data
     })
 
 
+@api_bp.route('/occupancy', methods=['GET'])
+@priority('critical')  # Fire-safety headcount; memory only, so never worth shedding
+def get_occupancy():
+    """Live headcount per zone and per device (served from memory, no table scan)"""
+    return jsonify({
+        'success': True,
+        **occupancy.snapshot(current_app.config['ZONES'])
+    })
+
+
+@api_bp.route('/visits/dwell', methods=['GET'])
+@priority('low')
+@replica_reads
+def get_dwell_time():
+    """
+    Aggregate time spent per student, zone or day from visit sessions.
+    Query: group_by=student|zone|day, start/end=YYYY-MM-DD (inclusive), zone, student_id
+    """
+    group_by = request.args.get('group_by', 'student')
+    try:
+        start = visits.parse_day(request.args.get('start'))
+        end = visits.parse_day(request.args.get('end'))
+        rows = visits.dwell_time(
+            group_by, start=start, end=end,
+            zone=request.args.get('zone'),
+            student_id=request.args.get('student_id', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'group_by': group_by,
+        'results': rows,
+        'count': len(rows)
+    })
+
+
+@api_bp.route('/devices/heartbeat', methods=['POST'])
+@device_auth_required
+def device_heartbeat():
+    """
+    Health heartbeat from a scanner process (one per Pi, covering all its readers)
+    Expected JSON: {"host", "transport", "uptime_seconds", "queue_depth", "retries",
+                    "readers": [{"device_id", "zone", "scans", "errors", "send_p50_ms", "send_p95_ms"}]}
+    """
+    data = request.get_json() or {}
+    readers = data.get('readers')
+    if not isinstance(readers, list) or not readers:
+        return jsonify({'success': False, 'error': 'readers is required'}), 400
+    
+    now = datetime.utcnow()
+    for reader in readers:
+        device_id = reader.get('device_id')
+        if not device_id or device_error(device_id):
+            continue
+        status = db.session.get(DeviceStatus, device_id)
+        if not status:
+            status = DeviceStatus(device_id=device_id)
+            db.session.add(status)
+        status.zone = reader.get('zone')
+        status.host = data.get('host')
+        status.transport = data.get('transport')
+        status.last_seen = now
+        status.uptime_seconds = data.get('uptime_seconds', 0)
+        status.queue_depth = data.get('queue_depth', 0)
+        status.retries = data.get('retries', 0)
+        status.scans = reader.get('scans', 0)
+        status.errors = reader.get('errors', 0)
+        status.send_p50_ms = reader.get('send_p50_ms')
+        status.send_p95_ms = reader.get('send_p95_ms')
+    db.session.commit()
+    
+    return jsonify({'success': True, 'received_at': now.isoformat() + 'Z'})
+
+
+@api_bp.route('/devices', methods=['GET'])
+@priority('low')
+def get_devices():
+    """Latest heartbeat per gate reader, flagged stale after DEVICE_STALE_SECONDS"""
+    stale_seconds = current_app.config['DEVICE_STALE_SECONDS']
+    devices = DeviceStatus.query.order_by(DeviceStatus.device_id).all()
+    results = [d.to_dict(stale_seconds) for d in devices]
+    return jsonify({
+        'success': True,
+        'devices': results,
+        'count': len(results),
+        'stale_count': sum(1 for d in results if d['stale'])
+    })
+
+
+@api_bp.route('/reports', methods=['GET'])
+@priority('low')
+def list_reports():
+    """Names of the reports served under /api/reports/<name>"""
+    return jsonify({'success': True, 'reports': sorted(REPORTS)})
+
+
+@api_bp.route('/reports/<name>', methods=['GET'])
+@priority('low')
+@replica_reads
+def get_report(name):
+    """
+    Attendance report over a date range (UTC days, inclusive).
+    Query: start/end=YYYY-MM-DD (default: the last 28 days through today)
+    """
+    if name not in REPORTS:
+        return jsonify({'success': False, 'error': f'Unknown report: {name}'}), 404
+    try:
+        end = visits.parse_day(request.args.get('end')) or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        start = visits.parse_day(request.args.get('start')) or end - timedelta(days=27)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if start > end:
+        return jsonify({'success': False, 'error': 'start must not be after end'}), 400
+    
+    result, meta = report_cache.run(name, start, end)
+    return jsonify({'success': True, 'meta': meta, 'result': result})
+
+
+@api_bp.route('/reports/circulation/books', methods=['GET'])
+@priority('low')
+@replica_reads
+def get_circulation_books():
+    """
+    Per-book circulation from the rollup table.
+    Query: sort=borrows|active|overdue|fines|recent, limit (default 20, max 500)
+    """
+    limit = max(1, min(request.args.get('limit', 20, type=int), 500))
+    try:
+        books = circulation.top_books(request.args.get('sort', 'borrows'), limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'books': books, 'count': len(books)})
+
+
+@api_bp.route('/reports/circulation/books/<int:book_id>', methods=['GET'])
+@priority('low')
+@replica_reads
+def get_circulation_book(book_id):
+    """Circulation stats for one book"""
+    stat = db.session.get(BookCirculationStat, book_id)
+    if not stat:
+        return jsonify({'success': False, 'error': 'No circulation recorded for this book'}), 404
+    return jsonify({'success': True, 'book': stat.to_dict()})
+
+
+@api_bp.route('/reports/circulation/daily', methods=['GET'])
+@priority('low')
+@replica_reads
+def get_circulation_daily():
+    """
+    Per-day borrows, returns, extensions and fine revenue from the rollup table.
+    Query: start/end=YYYY-MM-DD (inclusive)
+    """
+    try:
+        start = visits.parse_day(request.args.get('start'))
+        end = visits.parse_day(request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    days, totals = circulation.daily(start, end)
+    return jsonify({'success': True, 'days': days, 'totals': totals})
+
+
 # ============== ADMIN ENDPOINTS ==============
 @api_bp.route('/admin/login', methods=['POST'])
 def admin_login():
@@ -360,26 +579,129 @@ def create_admin():
     }), 201
 
 
+@api_bp.route('/admin/sessions/revoke', methods=['POST'])
+@login_required
+def revoke_admin_sessions():
+    """Sign the current admin out of every session, this one included"""
+    admin = db.session.get(Admin, current_user.id)
+    revoke_sessions(admin)
+    return jsonify({'success': True, 'message': 'All sessions signed out'})
+
+
+@api_bp.route('/admin/jobs', methods=['GET'])
+@login_required
+def get_jobs():
+    """Scheduled maintenance jobs with their last run, duration, status and next run"""
+    return jsonify({
+        'success': True,
+        'enabled': current_app.config['BACKGROUND_SERVICES'],
+        'jobs': scheduler.status()
+    })
+
+
+@api_bp.route('/admin/purges', methods=['GET'])
+@login_required
+def get_purges():
+    """Progress of deleted students' background purges (status, limit)"""
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    return jsonify({'success': True, **purge.progress(request.args.get('status'), limit)})
+
+
+@api_bp.route('/admin/backups', methods=['GET'])
+@login_required
+def get_backups():
+    """Online backups and attendance exports: size, throughput, lock wait, watermark (kind, limit)"""
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    return jsonify({
+        'success': True,
+        'watermark': backup.last_watermark(),
+        'backups': backup.history(request.args.get('kind'), limit)
+    })
+
+
+@api_bp.route('/admin/load', methods=['GET'])
+@priority('critical')
+@login_required
+def get_load():
+    """Requests in flight per priority class, plus admitted / shed / rate-limited counts (this process)"""
+    return jsonify({'success': True, **admission.stats()})
+
+
+@api_bp.route('/admin/cache', methods=['GET'])
+@login_required
+def get_cache_stats():
+    """Cache backend and this worker's hits / misses per namespace"""
+    return jsonify({'success': True, **cache.stats()})
+
+
+@api_bp.route('/admin/jobs/<name>/runs', methods=['GET'])
+@login_required
+def get_job_runs(name):
+    """Recent runs of one job (limit, default 50, max 500)"""
+    if name not in scheduler.jobs:
+        return jsonify({'success': False, 'error': f'Unknown job: {name}'}), 404
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    return jsonify({'success': True, 'runs': scheduler.history(name, limit)})
+
+
+@api_bp.route('/admin/jobs/<name>/run', methods=['POST'])
+@login_required
+def trigger_job(name):
+    """Make a job due now; it starts on the next scheduler tick"""
+    if name not in scheduler.jobs:
+        return jsonify({'success': False, 'error': f'Unknown job: {name}'}), 404
+    scheduler.trigger(name)
+    return jsonify({'success': True, 'message': f'{name} will run within {scheduler.tick}s'})
+
+
 # ============== LIBRARY BOOK ENDPOINTS ==============
 @api_bp.route('/books', methods=['GET'])
+@replica_reads
 def get_books():
-    """List all books with availability"""
+    """
+    List books with availability, ordered by id.
+    Query: search, fields=id,title,... (projection), limit + after_id (keyset pages;
+    pass the returned next_after_id to get the next page)
+    """
     search = request.args.get('search', '').strip()
-    query = Book.query
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, 500))
+    try:
+        fields = catalog.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
     if search:
-        query = query.filter(
-            (Book.title.ilike(f'%{search}%')) | 
-            (Book.author.ilike(f'%{search}%')) |
-            (Book.isbn.ilike(f'%{search}%'))
-        )
-        
-    books = query.all()
+        version = catalog.current_version()
+        books, next_after_id = catalog.list_books(fields, search, after_id, limit)
+    else:
+        books, next_after_id, version = catalog.catalog_cache.page(fields, after_id, limit)
+    
     return jsonify({
         'success': True,
-        'books': [b.to_dict() for b in books]
+        'books': books,
+        'next_after_id': next_after_id,
+        'version': version
     })
 
+
+@api_bp.route('/books/availability', methods=['GET'])
+@replica_reads
+def get_book_availability():
+    """
+    Availability changes since a catalog version (from a previous /books or /books/availability call).
+    Returns only (id, available_copies) pairs; without since, every book.
+    'reset': True means the client's version is unknown and it should reload the catalog.
+    """
+    since = request.args.get('since', 0, type=int)
+    version, books = catalog.availability_since(since)
+    reset = since > version
+    if reset:
+        version, books = catalog.availability_since(0)
+    return jsonify({'success': True, 'version': version, 'books': books, 'reset': reset})
+
 @api_bp.route('/borrow', methods=['GET'])
 def get_student_borrows():
     """Get active/overdue borrows for a student"""
@@ -398,6 +720,7 @@ def get_student_borrows():
     })
 
 @api_bp.route('/borrow', methods=['POST'])
+@priority('critical')
 def borrow_book():
     """Borrow a book"""
     try:
@@ -407,6 +730,10 @@ def borrow_book():
         if not data or 'book_id' not in data or 'student_id' not in data:
             return jsonify({'success': False, 'error': 'book_id and student_id required'}), 400
             
+        student = db.session.get(Student, data['student_id'])
+        if not student or student.deleted_at is not None:
+            return jsonify({'success': False, 'error': 'Student not found'}), 404
+            
         book = Book.query.get(data['book_id'])
         if not book:
             return jsonify({'success': False, 'error': 'Book not found'}), 404
@@ -432,6 +759,9 @@ def borrow_book():
         
         book.available_copies -= 1
         db.session.add(borrow)
+        db.session.flush()
+        circulation.record_borrow(borrow)
+        catalog.bump_availability(book)
         db.session.commit()
         
         print(f"✅ Borrow successful: {borrow.id}")
@@ -445,6 +775,7 @@ def borrow_book():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @api_bp.route('/borrow/<int:id>/extend', methods=['PUT'])
+@priority('critical')
 def extend_borrow(id):
     """Extend borrow deadline (max 2 times, blocked for important)"""
     borrow = BorrowRecord.query.get_or_404(id)
@@ -472,6 +803,7 @@ def extend_borrow(id):
     new_due_date = borrow.due_date + timedelta(days=7)
     borrow.due_date = new_due_date.replace(hour=23, minute=59, second=59, microsecond=0)
     borrow.extensions_used += 1
+    circulation.record_extension(borrow)
     db.session.commit()
     
     return jsonify({
@@ -481,6 +813,7 @@ def extend_borrow(id):
     })
 
 @api_bp.route('/borrow/<int:id>/return', methods=['PUT'])
+@priority('critical')
 def return_book(id):
     """Return a borrowed book"""
     borrow = BorrowRecord.query.get_or_404(id)
@@ -494,6 +827,8 @@ def return_book(id):
     
     # Calculate final fine
     borrow.calculate_fine()
+    circulation.record_return(borrow)
+    catalog.bump_availability(borrow.book)
     
     db.session.commit()
     
@@ -503,6 +838,7 @@ def return_book(id):
     })
 
 @api_bp.route('/fines/<int:id>/pay', methods=['POST'])
+@priority('critical')
 def pay_fine(id):
     """Mark fine as paid"""
     borrow = BorrowRecord.query.get_or_404(id)
@@ -510,7 +846,9 @@ def pay_fine(id):
     if borrow.fine_paid:
         return jsonify({'success': False, 'error': 'Fine already paid'}), 400
         
+    borrow.calculate_fine()  # Settle the fine accrued up to now
     borrow.fine_paid = True
+    circulation.record_fine_payment(borrow)
     db.session.commit()
     
     return jsonify({
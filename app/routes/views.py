@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, session
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import Admin
+from app.services.auth import remember_admin
 from app import db
 
 views_bp = Blueprint('views', __name__)
@@ -51,6 +52,12 @@ def manage_books():
     """Admin book management page"""
     return render_template('admin_books.html')
 
+@views_bp.route('/admin/jobs')
+@login_required
+def admin_jobs():
+    """Scheduled maintenance jobs: last run, duration and status"""
+    return render_template('admin_jobs.html')
+
 @views_bp.route('/register')
 def register():
     """Register new student with RFID"""
@@ -72,6 +79,7 @@ def login():
         
         if admin and admin.check_password(password):
             login_user(admin)
+            remember_admin(admin)
             return redirect(url_for('views.dashboard'))
         else:
             flash('Invalid username or password', 'error')
@@ -111,4 +119,5 @@ def admin_register():
 def logout():
     """Logout admin"""
     logout_user()
+    session.pop('admin', None)
     return redirect(url_for('views.index'))
@@ -0,0 +1,229 @@
+"""
+Admission control for the API: per-client rate limits and priority load shedding.
+
+Every request is classed by its view (see priority()):
+  critical  gate scans, circulation writes, health: never shed
+  normal    everything not marked otherwise
+  low       dashboards, reports, analytics: shed first
+
+Rate limits are token buckets per (class, client): for critical requests the
+device key an X-Device-Token verifies as (a caller-chosen device_id would let
+any client rotate into fresh buckets), otherwise the client IP (behind
+RATE_LIMIT_PROXY_HOPS trusted proxies, taken from X-Forwarded-For). Buckets
+live in a bounded LRU dict; an evicted client simply starts again with a full
+bucket.
+
+Off by default (ADMISSION_CONTROL): behind a proxy every client shares the
+proxy's IP until RATE_LIMIT_PROXY_HOPS is set, and then kiosks and dashboards
+would all drain one bucket per class.
+
+Shedding happens per process when it is overloaded: when the requests in flight
+reach a class's share of ADMISSION_MAX_INFLIGHT, or when the front proxy's
+X-Request-Start header shows requests queueing for longer than
+ADMISSION_MAX_QUEUE_MS (the only signal a single-threaded sync worker gets).
+Both rejections are 429 with Retry-After.
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import current_app, g, jsonify, request
+
+PRIORITIES = ('critical', 'normal', 'low')
+
+
+def priority(level):
+    """Mark a view's admission class"""
+    if level not in PRIORITIES:
+        raise ValueError(f'Unknown priority: {level}')
+
+    def decorator(view):
+        view.admission_priority = level
+        return view
+    return decorator
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by client, LRU-bounded to max_keys"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, key, rate, burst):
+        """Take one token; returns 0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = burst
+            else:
+                tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                self._buckets.move_to_end(key)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def queue_delay(header, now=None):
+    """Seconds since the proxy stamped X-Request-Start ('t=<epoch s|ms|us>'); None if absent/invalid"""
+    if not header:
+        return None
+    try:
+        stamp = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return None
+    if stamp > 1e14:
+        stamp /= 1e6    # microseconds
+    elif stamp > 1e11:
+        stamp /= 1e3    # milliseconds
+    return max(0.0, (now or time.time()) - stamp)
+
+
+class AdmissionController:
+    def __init__(self):
+        self.limiter = TokenBucketLimiter()
+        self.enabled = False
+        self.limits = {}
+        self.max_inflight = 32
+        self.shed_at = {}
+        self.max_queue = None
+        self.retry_after = 5
+        self.proxy_hops = 0
+        self._warned_proxy = False
+        self._lock = threading.Lock()
+        self.inflight = Counter()
+        self.admitted = Counter()
+        self.shed = Counter()
+        self.rate_limited = Counter()
+        self.max_seen_inflight = 0
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config['ADMISSION_CONTROL']
+        self.limiter = TokenBucketLimiter(config['RATE_LIMIT_MAX_KEYS'])
+        self.limits = config['RATE_LIMITS']
+        self.max_inflight = config['ADMISSION_MAX_INFLIGHT']
+        self.shed_at = {level: math.ceil(self.max_inflight * share)
+                        for level, share in config['ADMISSION_SHED_AT'].items()}
+        self.max_queue = config['ADMISSION_MAX_QUEUE_MS'] / 1000 if config['ADMISSION_MAX_QUEUE_MS'] else None
+        self.retry_after = config['ADMISSION_RETRY_AFTER']
+        self.proxy_hops = config['RATE_LIMIT_PROXY_HOPS']
+        if self.enabled:
+            app.before_request(self.admit)
+            app.teardown_request(self.release)
+
+    # ---------- Classification ----------
+    def classify(self):
+        view = current_app.view_functions.get(request.endpoint)
+        return getattr(view, 'admission_priority', 'normal')
+
+    def client_ip(self, forwarded_for, remote_addr):
+        if self.proxy_hops and forwarded_for:
+            # X-Forwarded-For entries left of the trusted proxies' own are client-supplied
+            route = [entry.strip() for entry in forwarded_for.split(',')]
+            return route[-min(self.proxy_hops, len(route))]
+        if forwarded_for and not self._warned_proxy:
+            self._warned_proxy = True
+            print("⚠️ Requests arrive through a proxy but RATE_LIMIT_PROXY_HOPS is 0: "
+                  "all its clients share one rate limit bucket")
+        return remote_addr
+
+    def key_for(self, level, token, forwarded_for, remote_addr):
+        """Bucket key: the verified device key for critical requests that carry one, else the client IP"""
+        if level == 'critical' and token:
+            from app.services.auth import device_keys
+
+            device = device_keys.verify(token)
+            if device is not None:
+                return f'device:{device}'
+        return f'ip:{self.client_ip(forwarded_for, remote_addr)}'
+
+    def client_key(self, level):
+        return self.key_for(level, request.headers.get('X-Device-Token'),
+                            request.headers.get('X-Forwarded-For'), request.remote_addr)
+
+    # ---------- Request hooks ----------
+    def check_rate(self, level, key):
+        """Seconds to wait if key is over its class's rate, else 0"""
+        rate, burst = self.limits.get(level) or (0, 0)
+        if rate <= 0:
+            return 0.0
+        wait = self.limiter.acquire((level, key), rate, burst)
+        if wait:
+            with self._lock:
+                self.rate_limited[level] += 1
+        return wait
+
+    def admit(self):
+        if request.endpoint in (None, 'static'):
+            return None
+        level = self.classify()
+        wait = self.check_rate(level, self.client_key(level))
+        if wait:
+            return self.reject('Rate limit exceeded', wait)
+
+        delay = queue_delay(request.headers.get('X-Request-Start')) if self.max_queue else None
+        with self._lock:
+            inflight = sum(self.inflight.values())
+            overloaded = level != 'critical' and (
+                inflight >= self.shed_at.get(level, self.max_inflight)
+                # Low priority goes at the queueing threshold, normal at twice it
+                or (delay is not None and delay > self.max_queue * (1 if level == 'low' else 2))
+            )
+            if overloaded:
+                self.shed[level] += 1
+            else:
+                self.inflight[level] += 1
+                self.admitted[level] += 1
+                self.max_seen_inflight = max(self.max_seen_inflight, inflight + 1)
+        if overloaded:
+            # Jitter so shed clients don't all come back on the same tick
+            return self.reject('Server busy, retry later', self.retry_after * random.uniform(0.5, 1.5))
+        g.admission_level = level
+        return None
+
+    def release(self, exc=None):
+        level = g.pop('admission_level', None)
+        if level is not None:
+            with self._lock:
+                self.inflight[level] -= 1
+
+    @staticmethod
+    def reject(message, wait):
+        retry_after = max(1, math.ceil(wait))
+        response = jsonify({'success': False, 'error': message, 'retry_after': retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    # ---------- Reads ----------
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'inflight': {level: self.inflight[level] for level in PRIORITIES},
+                'inflight_total': sum(self.inflight.values()),
+                'max_inflight': self.max_inflight,
+                'max_seen_inflight': self.max_seen_inflight,
+                'shed_at': self.shed_at,
+                'admitted': {level: self.admitted[level] for level in PRIORITIES},
+                'shed': {level: self.shed[level] for level in PRIORITIES},
+                'rate_limited': {level: self.rate_limited[level] for level in PRIORITIES},
+                'tracked_clients': len(self.limiter),
+            }
+
+
+admission = AdmissionController()
@@ -0,0 +1,188 @@
+"""
+Fingerprinted, precompressed static assets.
+
+At startup every file under the static folder (plus the virtual bundles in
+BUNDLES) is read once, lightly minified, hashed and compressed with gzip and
+brotli (if installed). url_for('static', filename='css/style.css') then
+resolves to the content-addressed name css/style.<hash>.css, which is served
+from memory with a year-long immutable Cache-Control: a changed file gets a
+new name, so browsers never revalidate what they already hold.
+
+Unhashed names still work (short cache, ETag revalidation), and in debug mode
+assets are rebuilt when a source file changes. With ASSET_FINGERPRINTING off
+only the bundles are built (served under their plain names); every other file
+comes from disk as usual.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import request
+
+from app.services.encoding import brotli, choose_encoding
+
+# Virtual files built from several sources, in order
+BUNDLES = {
+    'js/bundle.js': ('js/app.js', 'js/poll.js'),
+}
+
+_JS_COMMENT_LINE = re.compile(r'^\s*//.*$', re.MULTILINE)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_SPACE = re.compile(r'\s*([{};])\s*')
+
+
+def minify(name, text):
+    """Whitespace/comment stripping only; keeps one statement per line so ASI is untouched"""
+    if name.endswith('.js'):
+        text = _JS_COMMENT_LINE.sub('', text)
+        return '\n'.join(line.strip() for line in text.splitlines() if line.strip()) + '\n'
+    if name.endswith('.css'):
+        text = _CSS_COMMENT.sub('', text)
+        return _CSS_SPACE.sub(r'\1', ' '.join(text.split()))
+    return text
+
+
+def hashed_name(name, digest):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest}{ext}'
+
+
+class Asset:
+    """One built file: identity body plus its precompressed variants"""
+
+    def __init__(self, name, body, sources, mtime, gzip_level, brotli_quality):
+        self.name = name
+        self.sources = sources
+        self.mtime = mtime
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        digest = hashlib.sha256(body).hexdigest()
+        self.etag = digest[:32]
+        self.hashed_name = hashed_name(name, digest[:12])
+        self.variants = {None: body, 'gzip': gzip.compress(body, compresslevel=gzip_level, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=brotli_quality)
+        # Never send a "compressed" variant that is bigger than the original
+        for encoding in [e for e in self.variants if e and len(self.variants[e]) >= len(body)]:
+            del self.variants[encoding]
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'url_name': self.hashed_name,
+            'bytes': {encoding or 'identity': len(body) for encoding, body in self.variants.items()},
+        }
+
+
+class StaticAssets:
+    def __init__(self):
+        self.app = None
+        self.files = {}     # logical name -> Asset
+        self.hashed = {}    # hashed name -> Asset
+        self.max_age = 31536000
+        self.minify = True
+        self.gzip_level = 9
+        self.brotli_quality = 11
+        self.auto_reload = False
+        self.bundles_only = False
+
+    def init_app(self, app):
+        self.app = app
+        self.max_age = app.config['ASSET_MAX_AGE']
+        self.minify = app.config['ASSET_MINIFY']
+        self.gzip_level = app.config['ASSET_GZIP_LEVEL']
+        self.brotli_quality = app.config['ASSET_BROTLI_QUALITY']
+        self.auto_reload = app.debug
+        if not app.has_static_folder:
+            return
+
+        # Templates load the bundles, so they are served either way; fingerprinting adds the rest
+        self.bundles_only = not app.config['ASSET_FINGERPRINTING']
+        self.build()
+        if not self.bundles_only:
+            app.url_defaults(self.rewrite_url)
+        app.view_functions['static'] = self.serve
+        app.extensions['assets'] = self
+
+    def _read(self, name):
+        path = os.path.join(self.app.static_folder, name)
+        with open(path, 'rb') as f:
+            return f.read(), os.path.getmtime(path)
+
+    def _asset(self, name, sources):
+        parts, mtime = [], 0
+        for source in sources:
+            data, source_mtime = self._read(source)
+            parts.append(data)
+            mtime = max(mtime, source_mtime)
+        body = b'\n'.join(parts)
+        if self.minify and name.endswith(('.js', '.css')):
+            body = minify(name, body.decode('utf-8')).encode('utf-8')
+        return Asset(name, body, sources, mtime, self.gzip_level, self.brotli_quality)
+
+    def build(self):
+        """(Re)build every asset from the static folder (only the BUNDLES without fingerprinting)"""
+        folder = self.app.static_folder
+        names = {}
+        if not self.bundles_only:
+            for root, _dirs, filenames in os.walk(folder):
+                for filename in filenames:
+                    name = os.path.relpath(os.path.join(root, filename), folder).replace(os.sep, '/')
+                    names[name] = (name,)
+        names.update(BUNDLES)
+
+        files = {name: self._asset(name, sources) for name, sources in names.items()}
+        self.files = files
+        self.hashed = {asset.hashed_name: asset for asset in files.values()}
+
+    def _stale(self):
+        folder = self.app.static_folder
+        try:
+            return any(
+                os.path.getmtime(os.path.join(folder, source)) > asset.mtime
+                for asset in self.files.values() for source in asset.sources
+            )
+        except OSError:
+            return True
+
+    def rewrite_url(self, endpoint, values):
+        """url_defaults hook: static filenames -> content-hashed filenames"""
+        if endpoint != 'static' or 'filename' not in values:
+            return
+        if self.auto_reload and self._stale():
+            self.build()
+        asset = self.files.get(values['filename'])
+        if asset is not None:
+            values['filename'] = asset.hashed_name
+
+    def serve(self, filename):
+        """Replacement for the static view: hashed names from memory, anything else from disk"""
+        if self.auto_reload and self.bundles_only and self._stale():
+            self.build()
+        asset = self.hashed.get(filename)
+        immutable = asset is not None
+        if asset is None:
+            asset = self.files.get(filename)
+        if asset is None:
+            return self.app.send_static_file(filename)
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding not in asset.variants:
+            encoding = None
+        response = self.app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+        response.set_etag(asset.etag + (f'-{encoding}' if encoding else ''))
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if immutable:
+            response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    def stats(self):
+        return [asset.to_dict() for asset in sorted(self.files.values(), key=lambda a: a.name)]
+
+
+assets = StaticAssets()
@@ -0,0 +1,211 @@
+"""
+Per-request authentication without a database round trip.
+
+Scanner devices send X-Device-Token: '<key id>.<signature>', the signature
+being HMAC-SHA256(DEVICE_TOKEN_SECRET, 'device-key:<id>'). Verifying it takes
+one HMAC and a lookup in an in-process table of active key ids, reloaded every
+DEVICE_KEY_REFRESH_SECONDS, right away when a key is issued or revoked anywhere
+(shared cache pub/sub), and on an unknown id at most every few seconds. No
+secret is stored: revoking a key removes its id from the table. Binary wire
+frames carry the key id and a MAC keyed with the signature instead of the
+token (verify_frame). A key only vouches for the device ids in its name
+(device_error), so one gate's token can't record scans as another. DEVICE_AUTH
+is 'off', 'warn' (log bad tokens and mismatches, accept) or 'require'.
+
+Admin sessions carry a signed principal (id, username, role, session version)
+in the session cookie, so Flask-Login resolves current_user without loading
+the Admin row. The principal is valid while its version matches
+admins.session_version, read through the shared cache for
+ADMIN_SESSION_RECHECK_SECONDS; bumping it (revoke_sessions) signs the admin out
+everywhere.
+"""
+import base64
+import functools
+import hashlib
+import hmac
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, g, jsonify, request, session
+from flask_login import UserMixin
+from sqlalchemy import select
+
+from app import db
+from app.services import wire
+from app.services.cache import cache
+
+CHANNEL = 'device-keys'
+UNKNOWN_KEY_RELOAD_SECONDS = 5  # Floods of made-up key ids reload the table at most this often
+
+
+# ---------- Device tokens ----------
+class DeviceKeyring:
+    def __init__(self):
+        self.app = None
+        self.mode = 'off'
+        self.secret = b''
+        self.refresh_seconds = 60
+        self._keys = {}          # key id -> name
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config['DEVICE_AUTH']
+        if self.mode not in ('off', 'warn', 'require'):
+            raise ValueError(f"DEVICE_AUTH must be off, warn or require, not {self.mode}")
+        self.secret = (app.config['DEVICE_TOKEN_SECRET'] or app.config['SECRET_KEY']).encode()
+        self.refresh_seconds = app.config['DEVICE_KEY_REFRESH_SECONDS']
+        self._loaded_at = None
+        if self.mode != 'off':
+            cache.subscribe(CHANNEL, self.on_message)
+
+    def on_message(self, message):
+        # Another process issued or revoked a key
+        self._loaded_at = None
+
+    def signature(self, key_id):
+        digest = hmac.new(self.secret, f'device-key:{key_id}'.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+    def token(self, key_id):
+        return f'{key_id}.{self.signature(key_id)}'
+
+    def _load(self):
+        from app.models import DeviceKey
+
+        with self.app.app_context():
+            rows = db.session.execute(select(DeviceKey.id, DeviceKey.name).where(DeviceKey.revoked_at.is_(None)))
+            keys = dict(rows.all())
+        with self._lock:
+            self._keys = keys
+            self._loaded_at = time.monotonic()
+
+    def verify(self, token):
+        """Name of the device key the token was issued for, or None"""
+        key_id, _, signature = (token or '').partition('.')
+        if not key_id.isdigit() or not hmac.compare_digest(signature, self.signature(key_id)):
+            return None
+        return self._key_name(int(key_id))
+
+    def verify_frame(self, key_id, signed, mac):
+        """Name of the device key a signed wire frame was sent with, or None"""
+        if key_id is None or not hmac.compare_digest(mac, wire.frame_mac(self.signature(key_id), signed)):
+            return None
+        return self._key_name(key_id)
+
+    def allows(self, name, device_id):
+        """Whether a key may report as device_id: its name, or one of a comma-separated list (a Pi with several readers)"""
+        return device_id in name.split(',')
+
+    def device_error(self, name, device_id, source):
+        """Error if the key verified as name may not report as device_id, else None (also for no key: see mode)"""
+        if name is None or self.allows(name, device_id):
+            return None
+        if self.mode == 'warn':
+            print(f"⚠️ Scan as {device_id} from {source} with the device key for {name}")
+            return None
+        return f'Device token is not valid for {device_id}'
+
+    def _key_name(self, key_id):
+        """Name of an unrevoked key, reloading the key table when stale or on an unknown id"""
+        loaded_at = self._loaded_at
+        age = time.monotonic() - loaded_at if loaded_at is not None else None
+        if age is None or age >= self.refresh_seconds or (key_id not in self._keys and age >= UNKNOWN_KEY_RELOAD_SECONDS):
+            self._load()
+        return self._keys.get(key_id)
+
+    # ---------- Key management (scripts, admin API) ----------
+    def issue(self, name):
+        """Create a key for a device; returns (DeviceKey, token)"""
+        from app.models import DeviceKey
+
+        key = DeviceKey(name=name)
+        db.session.add(key)
+        db.session.commit()
+        cache.publish(CHANNEL, op='issued')
+        return key, self.token(key.id)
+
+    def revoke(self, key):
+        key.revoked_at = datetime.utcnow()
+        db.session.commit()
+        self._loaded_at = None
+        cache.publish(CHANNEL, op='revoked')
+
+
+device_keys = DeviceKeyring()
+
+
+def device_auth_required(view):
+    """Scanner endpoints: check X-Device-Token according to DEVICE_AUTH"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if device_keys.mode != 'off':
+            device = device_keys.verify(request.headers.get('X-Device-Token'))
+            if device is None:
+                if device_keys.mode == 'require':
+                    return jsonify({'success': False, 'error': 'Valid X-Device-Token required'}), 401
+                print(f"⚠️ Scan from {request.remote_addr} without a valid device token")
+            g.device_key = device
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def device_error(device_id):
+    """In a device_auth_required view: error if the request's key may not report as device_id, else None"""
+    return device_keys.device_error(g.get('device_key'), device_id, request.remote_addr)
+
+
+# ---------- Admin sessions ----------
+class AdminPrincipal(UserMixin):
+    """current_user for admins, built from the signed session"""
+
+    def __init__(self, id, username, role, version):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.version = version
+
+    def to_dict(self):
+        return {'id': self.id, 'username': self.username, 'role': self.role}
+
+
+session_versions = cache.namespace('admin-session-version', max_keys=1000)  # admin id -> session_version
+
+
+def current_version(admin_id):
+    """admins.session_version through the shared cache; None if the admin is gone"""
+    version = session_versions.get(str(admin_id))
+    if version is None:
+        from app.models import Admin
+
+        version = db.session.scalar(select(Admin.session_version).where(Admin.id == admin_id))
+        if version is None:
+            return None
+        session_versions.set(str(admin_id), version, current_app.config['ADMIN_SESSION_RECHECK_SECONDS'])
+    return version
+
+
+def remember_admin(admin):
+    """Store the signed principal; call next to login_user()"""
+    session['admin'] = {'id': admin.id, 'username': admin.username, 'role': admin.role,
+                        'version': admin.session_version or 0}
+
+
+def load_admin(user_id):
+    """Flask-Login user_loader: the session's principal while its version is current"""
+    principal = session.get('admin')
+    # Sessions from before principals were stored sign in again
+    if not principal or str(principal['id']) != str(user_id):
+        return None
+    if current_version(principal['id']) != principal['version']:
+        return None
+    return AdminPrincipal(**principal)
+
+
+def revoke_sessions(admin):
+    """Sign the admin out of every session"""
+    admin.session_version = (admin.session_version or 0) + 1
+    db.session.commit()
+    session_versions.delete(str(admin.id))
@@ -0,0 +1,301 @@
+"""
+Online backups while the app keeps serving: full snapshots and incremental attendance exports.
+
+SQLite snapshots use the backup API, BACKUP_STEP_PAGES pages per step with a
+BACKUP_STEP_SLEEP_MS pause between steps. Each step holds the database's
+shared lock only for its few pages, so a gate scan waits at most one step.
+Steps that find a writer holding the lock back off and retry. That time is
+reported as lock_wait_ms, and the longest step as max_step_ms. In WAL mode
+the copy reads from one snapshot held across all steps. Writers never wait on
+it and it never restarts. In rollback-journal mode (the default), a write
+from another connection restarts the copy. After BACKUP_MAX_RESTARTS restarts
+the rest is copied in a single step, and writers wait for that one step. The
+copy is written next to its final name, checked with PRAGMA quick_check, and
+then renamed.
+
+PostgreSQL snapshots stream `pg_dump --format=custom` to the file. pg_dump
+reads one MVCC snapshot and takes only ACCESS SHARE locks, so scans never
+wait on it. BACKUP_LOCK_TIMEOUT stops it from queueing behind a migration's
+DDL.
+
+Attendance exports are gzipped CSVs of the attendance_logs rows added since
+the last backup's watermark, the highest log id that backup included. Ids
+increase with every insert, so offline batches with old timestamps are still
+picked up. Rows are read BACKUP_EXPORT_CHUNK at a time, one short read each.
+To restore, load the newest full snapshot and then the exports that follow
+it. Corrections to older rows and purges reach the backups with the next full
+snapshot. On PostgreSQL, a scan whose transaction is still open when an
+export starts can commit below that export's watermark; the next full
+snapshot includes it.
+
+BACKUP_KEEP full snapshots are kept. Older ones, and the exports that come
+before the oldest snapshot kept, are deleted and marked 'pruned'.
+"""
+import csv
+import gzip
+import os
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models import AttendanceLog, BackupSnapshot
+
+BUSY_CODES = (5, 6)  # SQLITE_BUSY, SQLITE_LOCKED
+EXPORT_COLUMNS = ('id', 'student_id', 'rfid_uid', 'action', 'timestamp', 'device_id', 'zone')
+PG_DUMP_CHUNK = 1 << 20
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup_dir():
+    """BACKUP_DIR, relative paths under the instance folder (where the default SQLite DB lives)"""
+    path = os.path.join(current_app.instance_path, current_app.config['BACKUP_DIR'])
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def last_watermark():
+    """Highest attendance log id covered by a finished backup of either kind (0 if none)"""
+    return db.session.scalar(
+        select(func.max(BackupSnapshot.watermark)).where(BackupSnapshot.status.in_(('done', 'pruned')))
+    ) or 0
+
+
+def _start(kind, **fields):
+    record = BackupSnapshot(kind=kind, status='running', **fields)
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def _finish(record, path, started, stats):
+    record.status = 'done'
+    record.path = path
+    record.finished_at = datetime.utcnow()
+    record.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    record.size_bytes = os.path.getsize(path)
+    for name, value in stats.items():
+        setattr(record, name, value)
+    db.session.commit()
+
+
+def _fail(record, error, partial):
+    db.session.rollback()
+    record.status = 'failed'
+    record.finished_at = datetime.utcnow()
+    record.error = str(error)
+    db.session.commit()
+    if os.path.exists(partial):
+        os.remove(partial)
+
+
+# ---------- Full snapshots ----------
+def snapshot(deadline=None):
+    """Full online backup of the database; returns the finished BackupSnapshot"""
+    engine = db.engine
+    if engine.dialect.name not in ('sqlite', 'postgresql'):
+        raise RuntimeError(f'Online backup is not supported for {engine.dialect.name}')
+    record = _start('full')
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    if engine.dialect.name == 'sqlite':
+        path = os.path.join(backup_dir(), f'library-{stamp}-{record.id}.db')
+    else:
+        path = os.path.join(backup_dir(), f'library-{stamp}-{record.id}.dump')
+    partial = path + '.partial'
+    started = time.perf_counter()
+    try:
+        if engine.dialect.name == 'sqlite':
+            stats = _sqlite_backup(engine.url.database, partial, deadline)
+        else:
+            stats = _pg_dump(engine.url, partial, deadline)
+        os.replace(partial, path)
+    except BaseException as e:
+        _fail(record, e, partial)
+        raise
+    _finish(record, path, started, stats)
+    prune()
+    return record
+
+
+def _sqlite_backup(source_path, partial, deadline):
+    if not source_path or source_path == ':memory:':
+        raise RuntimeError('In-memory SQLite databases cannot be backed up')
+    config = current_app.config
+    step_pages = config['BACKUP_STEP_PAGES']
+    pause = config['BACKUP_STEP_SLEEP_MS'] / 1000
+    max_restarts = config['BACKUP_MAX_RESTARTS']
+    stats = {'lock_wait_ms': 0.0, 'max_step_ms': 0.0, 'restarts': 0}
+    progress_state = {'last': None, 'remaining': None, 'busy': False}
+
+    def progress(status, remaining, total):
+        now = time.perf_counter()
+        elapsed = now - progress_state['last']
+        busy = status in BUSY_CODES
+        if busy or progress_state['busy']:
+            # A busy step and the back-off after it are time spent waiting on a writer
+            stats['lock_wait_ms'] += elapsed * 1000
+        else:
+            stats['max_step_ms'] = max(stats['max_step_ms'], elapsed * 1000)
+            # Pages left only go up when a write elsewhere sent the copy back to page 1
+            if progress_state['remaining'] is not None and remaining >= progress_state['remaining']:
+                stats['restarts'] += 1
+                if stats['restarts'] > max_restarts:
+                    raise _TooManyRestarts()
+            progress_state['remaining'] = remaining
+        progress_state['busy'] = busy
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f'Backup still had {remaining} of {total} pages to copy at its deadline')
+        if remaining and not busy:
+            time.sleep(pause)
+        progress_state['last'] = time.perf_counter()
+
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(partial)
+    try:
+        wal = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+        if wal:
+            # One read snapshot across every step; in WAL mode it doesn't hold writers up
+            source.execute('BEGIN')
+            source.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+        # Report a busy step at once (then back off) instead of blocking inside it
+        source.execute('PRAGMA busy_timeout = 0')
+        progress_state['last'] = time.perf_counter()
+        try:
+            source.backup(target, pages=step_pages, progress=progress, sleep=pause)
+        except _TooManyRestarts:
+            print(f"⚠️ Backup restarted {max_restarts} times by concurrent writes; copying the rest in one step")
+            source.execute(f'PRAGMA busy_timeout = {int(config["BACKUP_LOCK_TIMEOUT"] * 1000)}')
+            step_started = time.perf_counter()
+            source.backup(target)
+            stats['max_step_ms'] = max(stats['max_step_ms'], (time.perf_counter() - step_started) * 1000)
+        if wal:
+            source.rollback()
+        # A copy of a WAL database is in WAL mode too; make it one self-contained file
+        target.execute('PRAGMA journal_mode = DELETE').fetchall()
+        check = target.execute('PRAGMA quick_check').fetchone()[0]
+        if check != 'ok':
+            raise RuntimeError(f'Backup failed its integrity check: {check}')
+        stats['watermark'] = target.execute('SELECT MAX(id) FROM attendance_logs').fetchone()[0] or 0
+    finally:
+        target.close()
+        source.close()
+    return {name: round(value, 1) if isinstance(value, float) else value for name, value in stats.items()}
+
+
+def _pg_dump(url, partial, deadline):
+    config = current_app.config
+    # The watermark is read first: a log committed during the dump is exported again, never lost
+    watermark = db.session.scalar(select(func.max(AttendanceLog.id))) or 0
+    db.session.commit()
+    env = dict(os.environ)
+    if url.password:
+        env['PGPASSWORD'] = url.password  # Kept off the command line (visible in ps)
+    dbname = url.set(drivername='postgresql', password=None).render_as_string(hide_password=False)
+    command = ['pg_dump', '--format=custom', '--no-owner',
+               f'--lock-wait-timeout={int(config["BACKUP_LOCK_TIMEOUT"] * 1000)}', f'--dbname={dbname}']
+    max_step = 0.0
+    with tempfile.TemporaryFile() as errors, open(partial, 'wb') as out:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors, env=env)
+        try:
+            while True:
+                read_started = time.perf_counter()
+                chunk = process.stdout.read(PG_DUMP_CHUNK)
+                max_step = max(max_step, time.perf_counter() - read_started)
+                if not chunk:
+                    break
+                out.write(chunk)
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError('pg_dump still running at its deadline')
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            returncode = process.wait()
+        if returncode != 0:
+            errors.seek(0)
+            raise RuntimeError(f'pg_dump exited with {returncode}: {errors.read().decode(errors="replace").strip()}')
+    # pg_dump's own lock waits aren't observable from here; the longest read between chunks is
+    return {'watermark': watermark, 'lock_wait_ms': None, 'max_step_ms': round(max_step * 1000, 1)}
+
+
+# ---------- Incremental attendance exports ----------
+def export_attendance(deadline=None):
+    """Attendance logs added since the last backup, as gzipped CSV; None when there is nothing new"""
+    since = last_watermark()
+    upper = db.session.scalar(select(func.max(AttendanceLog.id))) or 0
+    db.session.commit()
+    if upper <= since:
+        return None
+
+    record = _start('attendance', from_watermark=since)
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(backup_dir(), f'attendance-{stamp}-{record.id}-{since + 1}-{upper}.csv.gz')
+    partial = path + '.partial'
+    chunk_size = current_app.config['BACKUP_EXPORT_CHUNK']
+    columns = [getattr(AttendanceLog, name) for name in EXPORT_COLUMNS]
+    started = time.perf_counter()
+    rows = 0
+    max_step = 0.0
+    after_id = since
+    try:
+        with gzip.open(partial, 'wt', newline='', compresslevel=6) as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            while after_id < upper:
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f'Export reached its deadline at id {after_id} of {upper}')
+                read_started = time.perf_counter()
+                chunk = db.session.execute(
+                    select(*columns).where(AttendanceLog.id > after_id, AttendanceLog.id <= upper)
+                    .order_by(AttendanceLog.id).limit(chunk_size)
+                ).all()
+                db.session.commit()  # End the read between chunks
+                max_step = max(max_step, time.perf_counter() - read_started)
+                if not chunk:
+                    break
+                writer.writerows(chunk)
+                rows += len(chunk)
+                after_id = chunk[-1][0]
+        os.replace(partial, path)
+    except BaseException as e:
+        _fail(record, e, partial)
+        raise
+    _finish(record, path, started, {'rows': rows, 'watermark': upper, 'max_step_ms': round(max_step * 1000, 1)})
+    return record
+
+
+# ---------- Retention and history ----------
+def prune(keep=None):
+    """Delete full snapshots beyond the newest `keep` and the exports before the oldest kept; returns the count"""
+    keep = current_app.config['BACKUP_KEEP'] if keep is None else keep
+    if keep <= 0:
+        return 0
+    fulls = BackupSnapshot.query.filter_by(kind='full', status='done').order_by(BackupSnapshot.id.desc()).all()
+    if len(fulls) <= keep:
+        return 0
+    oldest_kept = fulls[keep - 1]
+    stale = fulls[keep:] + BackupSnapshot.query.filter(
+        BackupSnapshot.kind == 'attendance', BackupSnapshot.status == 'done',
+        BackupSnapshot.watermark <= oldest_kept.watermark, BackupSnapshot.id < oldest_kept.id
+    ).all()
+    for record in stale:
+        if record.path and os.path.exists(record.path):
+            os.remove(record.path)
+        record.status = 'pruned'
+    db.session.commit()
+    return len(stale)
+
+
+def history(kind=None, limit=50):
+    query = BackupSnapshot.query.order_by(BackupSnapshot.id.desc())
+    if kind:
+        query = query.filter_by(kind=kind)
+    return [record.to_dict() for record in query.limit(limit)]
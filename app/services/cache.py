@@ -0,0 +1,381 @@
+"""
+Shared cache, counters and pub/sub for state that must agree across workers and nodes.
+
+The backend is chosen by CACHE_BACKEND:
+  memory     per-process dicts (the default; enough for a single worker)
+  redis      a Redis server at CACHE_URL, shared by every worker on every node
+  fakeredis  in-process Redis emulation, for tests and local runs without a server
+
+Callers take a namespace (cache.namespace('reports', max_keys=128)) and use
+get / get_many / set / delete for values, add to claim a key only if it is
+absent (SET NX), and incr / counter for integers.
+The memory backend keeps one LRU per namespace bounded by max_keys; on Redis
+every value key carries a TTL (CACHE_DEFAULT_TTL unless the caller gives one)
+so abandoned keys don't pile up. Values are pickled for Redis.
+
+publish(channel, message) / subscribe(channel, callback) carry invalidations
+and counter updates to every process. Each message arrives with 'origin' set
+to the sending process, delivered to the sender as well, so subscribers can
+skip their own.
+
+A Redis outage degrades to cache misses and lost messages, never to failed requests.
+"""
+import os
+import pickle
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+NO_EXPIRY = float('inf')
+
+
+class TTLCache:
+    """LRU-bounded dict whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._trim(key)
+
+    def add(self, key, value, ttl=None):
+        """Set key only if it is absent (or expired); True if this call set it"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._data[key] = (now + (self.ttl if ttl is None else ttl), value)
+            self._trim(key)
+        return True
+
+    def incr(self, key, amount=1, ttl=None):
+        """Add to an integer entry (created at 0); counters never expire unless ttl is given"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                entry = (now + ttl if ttl else NO_EXPIRY, 0)
+            value = entry[1] + amount
+            self._data[key] = (entry[0], value)
+            self._trim(key)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _trim(self, key):
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MemoryBackend:
+    name = 'memory'
+
+    def __init__(self, default_ttl, default_max_keys=10000):
+        self.default_ttl = default_ttl
+        self.default_max_keys = default_max_keys
+        self._stores = {}
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def _store(self, namespace):
+        store = self._stores.get(namespace.name)
+        if store is None:
+            with self._lock:
+                store = self._stores.setdefault(
+                    namespace.name, TTLCache(namespace.max_keys or self.default_max_keys, self.default_ttl)
+                )
+        if namespace.max_keys and store.maxsize != namespace.max_keys:
+            store.maxsize = namespace.max_keys
+        return store
+
+    def get(self, namespace, key):
+        return self._store(namespace).get(key)
+
+    def get_many(self, namespace, keys):
+        store = self._store(namespace)
+        return [store.get(key) for key in keys]
+
+    def set(self, namespace, key, value, ttl=None):
+        self._store(namespace).set(key, value, ttl)
+
+    def add(self, namespace, key, value, ttl=None):
+        return self._store(namespace).add(key, value, ttl)
+
+    def delete(self, namespace, key):
+        self._store(namespace).delete(key)
+
+    def incr(self, namespace, key, amount=1, ttl=None):
+        return self._store(namespace).incr(key, amount, ttl)
+
+    def counter(self, namespace, key):
+        return self._store(namespace).get(key) or 0
+
+    def publish(self, channel, message):
+        for callback in list(self._subscribers[channel]):
+            callback(message)
+
+    def subscribe(self, channel, callback):
+        self._subscribers[channel].append(callback)
+
+    def close(self):
+        pass
+
+
+class RedisBackend:
+    ERROR_LOG_INTERVAL = 30
+
+    def __init__(self, client, prefix, default_ttl, name='redis'):
+        import redis
+
+        self.name = name
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.errors = (redis.RedisError, OSError)
+        self._callbacks = {}  # prefixed channel -> callback
+        self._listener = None
+        self._closed = False
+        self._last_error = 0.0
+        self._lock = threading.Lock()
+
+    def _key(self, namespace, key):
+        return f'{self.prefix}{namespace.name}:{key}'
+
+    def _failed(self, operation, error):
+        # One line per ERROR_LOG_INTERVAL: during an outage every request would fail
+        now = time.monotonic()
+        if now - self._last_error >= self.ERROR_LOG_INTERVAL:
+            self._last_error = now
+            print(f"⚠️ Cache {operation} failed ({error}); serving without the shared cache")
+
+    def get(self, namespace, key):
+        try:
+            raw = self.client.get(self._key(namespace, key))
+        except self.errors as e:
+            self._failed('get', e)
+            return None
+        return pickle.loads(raw) if raw is not None else None
+
+    def get_many(self, namespace, keys):
+        if not keys:
+            return []
+        try:
+            raws = self.client.mget([self._key(namespace, key) for key in keys])
+        except self.errors as e:
+            self._failed('get', e)
+            return [None] * len(keys)
+        return [pickle.loads(raw) if raw is not None else None for raw in raws]
+
+    def set(self, namespace, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            self.client.set(self._key(namespace, key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                            px=max(1, int(ttl * 1000)))
+        except self.errors as e:
+            self._failed('set', e)
+
+    def add(self, namespace, key, value, ttl=None):
+        """SET NX; True if this call set the key (also when Redis is unreachable: nobody else can hold it)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            return bool(self.client.set(self._key(namespace, key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                                        px=max(1, int(ttl * 1000)), nx=True))
+        except self.errors as e:
+            self._failed('add', e)
+            return True
+
+    def delete(self, namespace, key):
+        try:
+            self.client.delete(self._key(namespace, key))
+        except self.errors as e:
+            self._failed('delete', e)
+
+    def incr(self, namespace, key, amount=1, ttl=None):
+        """INCRBY; returns the new value, or None if Redis is unreachable"""
+        name = self._key(namespace, key)
+        try:
+            value = self.client.incrby(name, amount)
+            if ttl and value == amount:
+                # First increment created the key
+                self.client.pexpire(name, int(ttl * 1000))
+            return value
+        except self.errors as e:
+            self._failed('incr', e)
+            return None
+
+    def counter(self, namespace, key):
+        try:
+            return int(self.client.get(self._key(namespace, key)) or 0)
+        except self.errors as e:
+            self._failed('get', e)
+            return 0
+
+    def publish(self, channel, message):
+        try:
+            self.client.publish(self.prefix + channel, pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+        except self.errors as e:
+            self._failed('publish', e)
+
+    def subscribe(self, channel, callback):
+        """Deliver messages on channel to callback, on a background listener thread"""
+        with self._lock:
+            self._callbacks[self.prefix + channel] = callback
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='cache-subscriber', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        # (Re)subscribes after connection errors, so Redis may be down at startup
+        while not self._closed:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            subscribed = set()
+            try:
+                while not self._closed:
+                    if len(self._callbacks) != len(subscribed):
+                        # Channels added since the listener started
+                        pending = set(self._callbacks) - subscribed
+                        pubsub.subscribe(*pending)
+                        subscribed |= pending
+                    message = pubsub.get_message(timeout=1)
+                    if message is None:
+                        continue
+                    try:
+                        self._callbacks[message['channel'].decode()](pickle.loads(message['data']))
+                    except Exception as e:
+                        print(f"❌ Cache subscriber on {message['channel']} failed: {e}")
+            except self.errors as e:
+                self._failed('subscription', e)
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+    def close(self):
+        self._closed = True
+
+
+class Namespace:
+    """Keys of one cache user; counts this process's hits and misses"""
+
+    def __init__(self, cache, name, max_keys=None):
+        self.cache = cache
+        self.name = name
+        self.max_keys = max_keys
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, valid=None):
+        """Cached value or None; a value failing valid(value) counts as a miss"""
+        value = self.cache.backend.get(self, key)
+        if value is not None and valid is not None and not valid(value):
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_many(self, keys):
+        return self.cache.backend.get_many(self, keys)
+
+    def set(self, key, value, ttl=None):
+        self.cache.backend.set(self, key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        return self.cache.backend.add(self, key, value, ttl)
+
+    def delete(self, key):
+        self.cache.backend.delete(self, key)
+
+    def incr(self, key, amount=1, ttl=None):
+        return self.cache.backend.incr(self, key, amount, ttl)
+
+    def counter(self, key):
+        return self.cache.backend.counter(self, key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class SharedCache:
+    def __init__(self):
+        self.backend = MemoryBackend(default_ttl=86400)
+        self.namespaces = {}
+        # Forked workers share this; origin adds the pid
+        self._host = f'{socket.gethostname()}-{uuid.uuid4().hex[:6]}'
+
+    def init_app(self, app):
+        config = app.config
+        self.backend.close()
+        self.backend = self.create_backend(config['CACHE_BACKEND'], config['CACHE_URL'],
+                                           config['CACHE_KEY_PREFIX'], config['CACHE_DEFAULT_TTL'])
+        app.extensions['cache'] = self
+
+    @staticmethod
+    def create_backend(kind, url, prefix, default_ttl):
+        if kind == 'memory':
+            return MemoryBackend(default_ttl)
+        if kind == 'redis':
+            import redis
+            return RedisBackend(redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1),
+                                prefix, default_ttl)
+        if kind == 'fakeredis':
+            import fakeredis
+            return RedisBackend(fakeredis.FakeRedis(), prefix, default_ttl, name='fakeredis')
+        raise ValueError(f'Unknown CACHE_BACKEND: {kind} (memory, redis or fakeredis)')
+
+    @property
+    def origin(self):
+        return f'{self._host}-{os.getpid()}'
+
+    def namespace(self, name, max_keys=None):
+        namespace = Namespace(self, name, max_keys)
+        self.namespaces[name] = namespace
+        return namespace
+
+    def publish(self, channel, **message):
+        self.backend.publish(channel, {**message, 'origin': self.origin})
+
+    def subscribe(self, channel, callback):
+        self.backend.subscribe(channel, callback)
+
+    def stats(self):
+        return {
+            'backend': self.backend.name,
+            'origin': self.origin,
+            'namespaces': {name: namespace.stats() for name, namespace in sorted(self.namespaces.items())},
+        }
+
+
+cache = SharedCache()
@@ -0,0 +1,117 @@
+"""
+Book catalog reads: keyset pages with field projection, a cached snapshot,
+and availability deltas.
+
+Borrow and return bump the 'book_availability' counter and stamp the book
+with the new value (book_versions) in the same transaction. The counter row
+stays locked until commit, so versions become visible in order and a client
+polling /api/books/availability?since=<version> never skips a change.
+
+Unfiltered catalog pages are kept in the shared cache, keyed by availability
+version, so they are reused by every worker until a borrow or return changes
+the version (and for at most BOOK_CATALOG_CACHE_TTL seconds, for edits made
+outside the borrow endpoints).
+"""
+from sqlalchemy import select
+
+from app import db
+from app.models import AppCounter, Book, BookVersion
+from app.services.cache import cache
+from app.services.upsert import bump
+
+COUNTER = 'book_availability'
+
+FIELDS = {
+    'id': Book.id,
+    'title': Book.title,
+    'author': Book.author,
+    'isbn': Book.isbn,
+    'total_copies': Book.total_copies,
+    'available_copies': Book.available_copies,
+    'is_important': Book.is_important,
+    'created_at': Book.created_at,
+}
+
+
+def current_version():
+    value = db.session.execute(select(AppCounter.value).where(AppCounter.name == COUNTER)).scalar()
+    return value or 0
+
+
+def bump_availability(book):
+    """Stamp the book with a new catalog version; call right before commit"""
+    bump(AppCounter, {'name': COUNTER}, value=1)
+    version = current_version()
+    bump(BookVersion, {'book_id': book.id}, assign={'availability_version': version})
+    return version
+
+
+def availability_since(since):
+    """(current version, [{id, available_copies}] changed after since)"""
+    version = current_version()
+    query = select(Book.id, Book.available_copies)
+    if since:
+        query = query.join(BookVersion, BookVersion.book_id == Book.id).where(
+            BookVersion.availability_version > since
+        )
+    rows = db.session.execute(query.order_by(Book.id)).all()
+    return version, [{'id': book_id, 'available_copies': available} for book_id, available in rows]
+
+
+def parse_fields(value):
+    """Comma-separated field names -> list (always including id); ValueError on unknown names"""
+    if not value:
+        return list(FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(FIELDS)}")
+    return ['id'] + [name for name in fields if name != 'id']
+
+
+def list_books(fields, search=None, after_id=None, limit=None):
+    """One keyset page ordered by id: (books, next_after_id or None)"""
+    query = select(*(FIELDS[name] for name in fields))
+    if search:
+        query = query.where(
+            (Book.title.ilike(f'%{search}%')) |
+            (Book.author.ilike(f'%{search}%')) |
+            (Book.isbn.ilike(f'%{search}%'))
+        )
+    if after_id:
+        query = query.where(Book.id > after_id)
+    query = query.order_by(Book.id)
+    if limit:
+        query = query.limit(limit + 1)
+
+    rows = db.session.execute(query).all()
+    next_after_id = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = rows[-1][0]
+    books = [dict(zip(fields, row)) for row in rows]
+    return books, next_after_id
+
+
+class CatalogCache:
+    def __init__(self):
+        self.ttl = 30
+        self.pages = cache.namespace('catalog', max_keys=256)  # version:fields:after_id:limit -> page
+
+    def init_app(self, app):
+        self.ttl = app.config['BOOK_CATALOG_CACHE_TTL']
+
+    def page(self, fields, after_id=None, limit=None):
+        """Unfiltered catalog page: (books, next_after_id, version), from cache when still current"""
+        version = current_version()
+        key = f"{version}:{','.join(fields)}:{after_id}:{limit}"
+        cached = self.pages.get(key)
+        if cached is not None:
+            return (*cached, version)
+
+        books, next_after_id = list_books(fields, after_id=after_id, limit=limit)
+        self.pages.set(key, (books, next_after_id), self.ttl)
+        return books, next_after_id, version
+
+
+catalog_cache = CatalogCache()
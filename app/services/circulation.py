@@ -0,0 +1,160 @@
+"""
+Circulation rollups: per-book and per-day counters for borrows, returns,
+loan length, overdue returns, extensions and fine revenue.
+
+The borrow endpoints bump the rollups in the same transaction as the borrow
+record change, with additive upserts (see services/upsert.py) so concurrent
+requests never lose an increment. Reports read only the rollup tables, never scan
+borrow_records. rebuild() recomputes them from borrow_records.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, select, text
+
+from app import db
+from app.models import BookCirculationStat, BorrowRecord, DailyCirculationStat
+from app.services.upsert import bump
+
+
+def _loan_stats(borrow):
+    loan_seconds = int((borrow.returned_at - borrow.borrowed_at).total_seconds())
+    overdue = 1 if borrow.returned_at > borrow.due_date else 0
+    return {'returns': 1, 'overdue_returns': overdue, 'loan_seconds': loan_seconds}
+
+
+def record_borrow(borrow):
+    now = borrow.borrowed_at or datetime.utcnow()
+    bump(BookCirculationStat, {'book_id': borrow.book_id}, assign={'last_borrowed_at': now}, borrows=1)
+    bump(DailyCirculationStat, {'day': now.date()}, borrows=1)
+
+
+def record_return(borrow):
+    stats = _loan_stats(borrow)
+    bump(BookCirculationStat, {'book_id': borrow.book_id}, **stats)
+    bump(DailyCirculationStat, {'day': borrow.returned_at.date()}, **stats)
+
+
+def record_extension(borrow):
+    bump(BookCirculationStat, {'book_id': borrow.book_id}, extensions=1)
+    bump(DailyCirculationStat, {'day': datetime.utcnow().date()}, extensions=1)
+
+
+def record_fine_payment(borrow):
+    amount = float(borrow.fine_amount or 0)
+    bump(BookCirculationStat, {'book_id': borrow.book_id}, fines_paid=1, fine_revenue=amount)
+    bump(DailyCirculationStat, {'day': datetime.utcnow().date()}, fines_paid=1, fine_revenue=amount)
+
+
+# ---------- Reads ----------
+BOOK_SORTS = {
+    'borrows': BookCirculationStat.borrows.desc(),
+    'active': (BookCirculationStat.borrows - BookCirculationStat.returns).desc(),
+    'overdue': BookCirculationStat.overdue_returns.desc(),
+    'fines': BookCirculationStat.fine_revenue.desc(),
+    'recent': BookCirculationStat.last_borrowed_at.desc(),
+}
+
+
+def top_books(sort='borrows', limit=20):
+    if sort not in BOOK_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(BOOK_SORTS)}")
+    query = BookCirculationStat.query.order_by(BOOK_SORTS[sort], BookCirculationStat.book_id)
+    return [stat.to_dict() for stat in query.limit(limit)]
+
+
+def daily(start=None, end=None):
+    query = DailyCirculationStat.query
+    if start:
+        query = query.filter(DailyCirculationStat.day >= start.date())
+    if end:
+        query = query.filter(DailyCirculationStat.day <= end.date())
+    rows = [stat.to_dict() for stat in query.order_by(DailyCirculationStat.day)]
+    totals = {
+        key: sum(row[key] for row in rows)
+        for key in ('borrows', 'returns', 'overdue_returns', 'extensions', 'fines_paid', 'fine_revenue')
+    }
+    totals['fine_revenue'] = round(totals['fine_revenue'], 2)
+    return rows, totals
+
+
+# ---------- Rebuild ----------
+def rebuild():
+    """
+    Recompute both rollups from borrow_records in one transaction.
+
+    borrow_records keeps no payment or extension dates, so per-day extensions
+    and fine revenue can't be re-derived: existing daily values are kept for
+    those columns. Per-book totals are fully recomputed.
+    Returns (book rows, day rows) written.
+    """
+    bind = db.session.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # Live bumps wait for the rebuild instead of being lost or double counted
+        db.session.execute(text(
+            'LOCK TABLE book_circulation_stats, daily_circulation_stats IN SHARE ROW EXCLUSIVE MODE'
+        ))
+    else:
+        # Take the write lock first (SQLite) so the aggregates see no concurrent writes
+        db.session.execute(delete(BookCirculationStat))
+
+    returned = BorrowRecord.returned_at.isnot(None)
+    loan_seconds = func.sum(func.coalesce(_seconds_between(BorrowRecord.borrowed_at, BorrowRecord.returned_at), 0))
+    overdue = func.sum(case((returned & (BorrowRecord.returned_at > BorrowRecord.due_date), 1), else_=0))
+    paid = BorrowRecord.fine_paid.is_(True)
+
+    books = db.session.execute(select(
+        BorrowRecord.book_id,
+        func.count(BorrowRecord.id),
+        func.count(BorrowRecord.returned_at),
+        func.coalesce(overdue, 0),
+        loan_seconds,
+        func.coalesce(func.sum(BorrowRecord.extensions_used), 0),
+        func.sum(case((paid, 1), else_=0)),
+        func.coalesce(func.sum(case((paid, BorrowRecord.fine_amount), else_=0.0)), 0.0),
+        func.max(BorrowRecord.borrowed_at),
+    ).group_by(BorrowRecord.book_id)).all()
+
+    borrow_days = dict(db.session.execute(
+        select(func.date(BorrowRecord.borrowed_at), func.count(BorrowRecord.id))
+        .group_by(func.date(BorrowRecord.borrowed_at))
+    ).all())
+    return_days = {row[0]: row[1:] for row in db.session.execute(
+        select(func.date(BorrowRecord.returned_at), func.count(BorrowRecord.id),
+               func.coalesce(overdue, 0), loan_seconds)
+        .where(returned).group_by(func.date(BorrowRecord.returned_at))
+    )}
+
+    db.session.execute(delete(BookCirculationStat))
+    db.session.bulk_insert_mappings(BookCirculationStat, [{
+        'book_id': book_id, 'borrows': borrows, 'returns': returns, 'overdue_returns': int(overdue_count),
+        'loan_seconds': int(seconds), 'extensions': int(extensions), 'fines_paid': int(fines_paid or 0),
+        'fine_revenue': float(revenue), 'last_borrowed_at': last_borrowed_at
+    } for book_id, borrows, returns, overdue_count, seconds, extensions, fines_paid, revenue, last_borrowed_at in books])
+
+    existing = {stat.day: stat for stat in DailyCirculationStat.query}
+    days = {_as_date(day) for day in list(borrow_days) + list(return_days)} | set(existing)
+    borrow_days = {_as_date(day): count for day, count in borrow_days.items()}
+    return_days = {_as_date(day): values for day, values in return_days.items()}
+    for day in days:
+        stat = existing.get(day)
+        if stat is None:
+            stat = DailyCirculationStat(day=day, extensions=0, fines_paid=0, fine_revenue=0.0)
+            db.session.add(stat)
+        returns, overdue_count, seconds = return_days.get(day, (0, 0, 0))
+        stat.borrows = borrow_days.get(day, 0)
+        stat.returns = returns
+        stat.overdue_returns = int(overdue_count)
+        stat.loan_seconds = int(seconds)
+    db.session.commit()
+    return len(books), len(days)
+
+
+def _seconds_between(start, end):
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    return func.extract('epoch', end - start)
+
+
+def _as_date(value):
+    """func.date() gives a string on SQLite and a date elsewhere"""
+    return datetime.strptime(value, '%Y-%m-%d').date() if isinstance(value, str) else value
@@ -0,0 +1,173 @@
+"""
+Set-based attendance corrections (POST /api/attendance/bulk-update).
+
+A filter (ids, device_id, zone, action, start/end) selects attendance logs and
+a patch (zone, device_id, action) is applied with plain UPDATE statements: one
+for small selections, or one per primary-key range of BULK_UPDATE_CHUNK ids,
+each committed on its own, so gate scans only ever wait for one chunk.
+
+Everything derived from the corrected rows is then brought back in line: the
+affected students' visit sessions and is_inside flag, this worker's occupancy
+counters (other workers heal on their next reconcile) and cached reports for
+the affected days.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, update
+
+from app import db
+from app.models import AttendanceLog, Student
+from app.services import visits
+from app.services.occupancy import occupancy
+from app.services.reports import report_cache
+
+FILTER_FIELDS = ('ids', 'device_id', 'zone', 'action', 'start', 'end')
+PATCH_FIELDS = ('zone', 'device_id', 'action')
+ACTIONS = ('ENTRY', 'EXIT')
+# Above this many students the occupancy counters are rebuilt in one query
+OCCUPANCY_REFRESH_LIMIT = 100
+
+
+class CorrectionError(ValueError):
+    pass
+
+
+def _parse_time(name, value):
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise CorrectionError(f'{name} must be an ISO 8601 timestamp')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def build_filter(spec):
+    """WHERE conditions for a filter dict; raises CorrectionError"""
+    unknown = set(spec) - set(FILTER_FIELDS) if isinstance(spec, dict) else ()
+    if unknown:
+        raise CorrectionError(f"Unknown filter field(s): {', '.join(sorted(unknown))}")
+    # An empty filter would rewrite the whole table
+    if not isinstance(spec, dict) or not any(spec.get(name) not in (None, '', []) for name in FILTER_FIELDS):
+        raise CorrectionError(f"filter needs at least one of: {', '.join(FILTER_FIELDS)}")
+
+    conditions = []
+    if spec.get('ids'):
+        ids = spec['ids']
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            raise CorrectionError('ids must be a list of integers')
+        conditions.append(AttendanceLog.id.in_(ids))
+    for name in ('device_id', 'zone', 'action'):
+        if spec.get(name):
+            conditions.append(getattr(AttendanceLog, name) == spec[name])
+    if spec.get('start'):
+        conditions.append(AttendanceLog.timestamp >= _parse_time('start', spec['start']))
+    if spec.get('end'):
+        conditions.append(AttendanceLog.timestamp < _parse_time('end', spec['end']))
+    return conditions
+
+
+def build_patch(spec):
+    """Column values to set; raises CorrectionError"""
+    if not isinstance(spec, dict) or not spec:
+        raise CorrectionError(f"patch needs at least one of: {', '.join(PATCH_FIELDS)}")
+    unknown = set(spec) - set(PATCH_FIELDS)
+    if unknown:
+        raise CorrectionError(f"Unknown patch field(s): {', '.join(sorted(unknown))}")
+    zones = current_app.config['ZONES']
+    if 'zone' in spec and spec['zone'] not in zones:
+        raise CorrectionError(f"zone must be one of: {', '.join(zones)}")
+    if 'action' in spec and spec['action'] not in ACTIONS:
+        raise CorrectionError('action must be ENTRY or EXIT')
+    if 'device_id' in spec and not (isinstance(spec['device_id'], str) and spec['device_id'].strip()):
+        raise CorrectionError('device_id must be a non-empty string')
+    return dict(spec)
+
+
+def _days(first, last):
+    day = first.date()
+    while day <= last.date():
+        yield day
+        day += timedelta(days=1)
+
+
+def refresh_is_inside(student_ids, chunk_size=500):
+    """Set students.is_inside from each student's latest log in any zone"""
+    student_ids = sorted(set(student_ids))
+    for start in range(0, len(student_ids), chunk_size):
+        chunk = student_ids[start:start + chunk_size]
+        rank = func.row_number().over(
+            partition_by=AttendanceLog.student_id,
+            order_by=(AttendanceLog.timestamp.desc(), AttendanceLog.id.desc())
+        ).label('rank')
+        latest = (select(AttendanceLog.student_id, AttendanceLog.action, rank)
+                  .where(AttendanceLog.student_id.in_(chunk)).subquery())
+        inside = select(latest.c.student_id).where(latest.c.rank == 1, latest.c.action == 'ENTRY')
+        db.session.execute(update(Student).where(Student.id.in_(chunk)).values(is_inside=Student.id.in_(inside)))
+        db.session.commit()
+
+
+def bulk_update(filter_spec, patch_spec, dry_run=False):
+    """Apply a patch to every log matching the filter; returns a summary dict. Raises CorrectionError."""
+    started = time.perf_counter()
+    conditions = build_filter(filter_spec)
+    patch = build_patch(patch_spec)
+    # Rows already carrying every patched value need no write
+    changes = [getattr(AttendanceLog, name).is_distinct_from(value) for name, value in patch.items()]
+    target = and_(*conditions, or_(*changes))
+
+    matched = db.session.scalar(select(func.count()).select_from(AttendanceLog).where(*conditions))
+    to_change, first, last, lo, hi = db.session.execute(
+        select(
+            func.count(), func.min(AttendanceLog.timestamp), func.max(AttendanceLog.timestamp),
+            func.min(AttendanceLog.id), func.max(AttendanceLog.id)
+        ).where(target)
+    ).one()
+    student_ids = list(db.session.scalars(select(AttendanceLog.student_id).where(target).distinct()))
+
+    summary = {
+        'dry_run': bool(dry_run),
+        'matched': matched,
+        'to_change': to_change,
+        'students': len(student_ids),
+        'first': first,
+        'last': last,
+    }
+    if dry_run or not to_change:
+        summary.update(updated=0, chunks=0, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+        return summary
+
+    chunk = current_app.config['BULK_UPDATE_CHUNK']
+    updated = chunks = 0
+    if to_change <= chunk:
+        updated = db.session.execute(update(AttendanceLog).where(target).values(**patch)).rowcount
+        db.session.commit()
+        chunks = 1
+    else:
+        for range_start in range(lo, hi + 1, chunk):
+            updated += db.session.execute(
+                update(AttendanceLog)
+                .where(target, AttendanceLog.id >= range_start, AttendanceLog.id < range_start + chunk)
+                .values(**patch)
+            ).rowcount
+            db.session.commit()
+            chunks += 1
+
+    # Derived state for the students and days touched
+    visits_written = visits.rebuild_students(student_ids)
+    refresh_is_inside(student_ids)
+    if len(student_ids) > OCCUPANCY_REFRESH_LIMIT:
+        occupancy.reconcile(full=True)  # Edited logs can be of any date
+    else:
+        for student_id in student_ids:
+            occupancy.refresh_student(student_id)
+    for day in _days(first, last):
+        report_cache.invalidate_day(day)
+
+    summary.update(
+        updated=updated, chunks=chunks, visits_rebuilt=visits_written,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+    )
+    return summary
@@ -0,0 +1,77 @@
+"""
+Server-side duplicate suppression for /api/scan.
+
+Two TTL caches of scan results, in the shared cache (app/services/cache.py) so a
+retry or bounce landing on another worker or node is still caught:
+  - idempotency keys (device_id, client_seq): a retried request returns the
+    result of the original one instead of writing again. The key is claimed
+    with an atomic add (SET NX) holding PENDING before the scan is recorded, so
+    a retry racing the original on another worker waits for its result
+    instead of recording the tap a second time
+  - debounce keys (rfid_uid, zone): a second tap inside SCAN_DEBOUNCE_SECONDS
+    returns the previous result
+"""
+import threading
+import time
+
+from app.services.cache import cache
+
+PENDING = 'pending'  # Idempotency value while the claiming request records the scan
+CLAIM_SECONDS = 10   # A claim left by a crashed request expires after this long
+
+
+class ScanDeduplicator:
+    STRIPES = 64
+
+    def __init__(self):
+        self.idempotency = cache.namespace('scan-idempotency', max_keys=50000)
+        self.idempotency_ttl = 3600
+        self.debounce = cache.namespace('scan-debounce', max_keys=10000)
+        self.debounce_ttl = 2.0
+        # Same card + zone is handled by one request at a time (per process) so
+        # concurrent retries can't both miss the cache and both write
+        self._stripes = [threading.Lock() for _ in range(self.STRIPES)]
+
+    def init_app(self, app):
+        self.idempotency = cache.namespace('scan-idempotency', app.config['SCAN_IDEMPOTENCY_MAX_KEYS'])
+        self.idempotency_ttl = app.config['SCAN_IDEMPOTENCY_TTL']
+        self.debounce = cache.namespace('scan-debounce', app.config['SCAN_DEBOUNCE_MAX_KEYS'])
+        self.debounce_ttl = app.config['SCAN_DEBOUNCE_SECONDS']
+
+    def lock_for(self, rfid_uid, zone):
+        return self._stripes[hash((rfid_uid, zone)) % self.STRIPES]
+
+    def claim(self, rfid_uid, zone, device_id=None, client_seq=None, debounce=True):
+        """
+        Return the original result if this scan is a retry or a bounce, else None
+        with its idempotency key claimed: call remember() or release() next.
+        """
+        if client_seq is not None:
+            key = f'{device_id}:{client_seq}'
+            while not self.idempotency.add(key, PENDING, CLAIM_SECONDS):
+                result = self.idempotency.get(key)
+                if result is not None and result != PENDING:
+                    return result
+                # Another worker is recording it (or the claim just expired: try again)
+                time.sleep(0.02)
+        if debounce and self.debounce_ttl > 0:
+            result = self.debounce.get(f'{rfid_uid}:{zone}')
+            if result is not None:
+                if client_seq is not None:
+                    self.idempotency.set(key, result, self.idempotency_ttl)
+                return result
+        return None
+
+    def release(self, device_id=None, client_seq=None):
+        """Drop a claim whose scan failed to record, so a retry records it"""
+        if client_seq is not None:
+            self.idempotency.delete(f'{device_id}:{client_seq}')
+
+    def remember(self, result, rfid_uid, zone, device_id=None, client_seq=None, debounce=True):
+        if client_seq is not None:
+            self.idempotency.set(f'{device_id}:{client_seq}', result, self.idempotency_ttl)
+        if debounce and self.debounce_ttl > 0:
+            self.debounce.set(f'{rfid_uid}:{zone}', result, self.debounce_ttl)
+
+
+scan_dedupe = ScanDeduplicator()
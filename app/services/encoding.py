@@ -0,0 +1,108 @@
+"""
+Response encoding: a faster JSON provider and negotiated compression.
+
+JSON goes through orjson when it is installed (stdlib json otherwise). Both
+paths write naive datetimes as ISO 8601 UTC with a trailing 'Z', the format
+the to_dict() methods used to build by hand, so models can hand datetimes
+straight to jsonify().
+
+JSON responses of at least COMPRESS_MIN_SIZE bytes are compressed with brotli
+(if installed) or gzip, whichever the client's Accept-Encoding prefers.
+"""
+import gzip
+from datetime import date, datetime
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat() + 'Z' if value.tzinfo is None else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """orjson-backed app.json; falls back to the stdlib encoder with the same datetime format"""
+    sort_keys = False
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def choose_encoding(accept_encodings):
+    """'br', 'gzip' or None for a request's parsed Accept-Encoding"""
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = max(candidates, key=lambda name: accept_encodings[name])
+    return best if accept_encodings[best] > 0 else None
+
+
+class ResponseCompressor:
+    def __init__(self):
+        self.min_size = 1024
+        self.mimetypes = ('application/json',)
+        self.gzip_level = 6
+        self.brotli_quality = 5
+
+    def init_app(self, app):
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.mimetypes = tuple(app.config['COMPRESS_MIMETYPES'])
+        self.gzip_level = app.config['COMPRESS_GZIP_LEVEL']
+        self.brotli_quality = app.config['COMPRESS_BROTLI_QUALITY']
+        if app.config['COMPRESS_MIN_SIZE'] >= 0:
+            app.after_request(self.compress)
+
+    def compress(self, response):
+        if (response.mimetype not in self.mimetypes or response.direct_passthrough
+                or response.is_streamed or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        if encoding == 'br':
+            body = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            body = gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+compressor = ResponseCompressor()
@@ -0,0 +1,153 @@
+"""
+Periodic maintenance jobs run by the scheduler (see services/scheduler.py).
+
+Each job takes a deadline (time.monotonic()) and returns a small summary
+dict that is stored with its run.
+"""
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, select, text
+
+from app import db
+from app.models import Book, BookCirculationStat, BorrowRecord, DailyCirculationStat, DeviceStatus
+from app.services.scheduler import parse_window
+
+# Fields the library kiosk loads its local catalog with (library.html)
+KIOSK_CATALOG_FIELDS = 'id,title,author,isbn,total_copies,available_copies,is_important'
+
+
+def overdue_sweep(deadline):
+    """Recalculate fines and OVERDUE status for open loans"""
+    batch_size = current_app.config['JOB_OVERDUE_SWEEP_BATCH']
+    now = datetime.utcnow()
+    checked = updated = 0
+    after_id = 0
+    while time.monotonic() < deadline:
+        # Only loans past due (fine grows daily) or flagged OVERDUE (may revert after an extension) can change
+        borrows = BorrowRecord.query.filter(
+            BorrowRecord.id > after_id,
+            BorrowRecord.status.in_(('ACTIVE', 'OVERDUE')),
+            (BorrowRecord.due_date < now) | (BorrowRecord.status == 'OVERDUE')
+        ).order_by(BorrowRecord.id).limit(batch_size).all()
+        if not borrows:
+            break
+        for borrow in borrows:
+            before = (borrow.status, borrow.fine_amount)
+            borrow.calculate_fine()
+            if (borrow.status, borrow.fine_amount) != before:
+                updated += 1
+        db.session.commit()
+        checked += len(borrows)
+        after_id = borrows[-1].id
+    return {'checked': checked, 'updated': updated}
+
+
+def compact(deadline):
+    """Prune old job runs and dead device rows, drop orphaned or empty rollup rows"""
+    from app.services.scheduler import scheduler
+
+    config = current_app.config
+    now = datetime.utcnow()
+    runs = scheduler.prune_history(now - timedelta(days=config['JOB_HISTORY_DAYS']), deadline=deadline)
+
+    devices = db.session.execute(
+        delete(DeviceStatus).where(DeviceStatus.last_seen < now - timedelta(days=config['DEVICE_PRUNE_DAYS']))
+    ).rowcount
+    orphans = db.session.execute(
+        delete(BookCirculationStat).where(BookCirculationStat.book_id.not_in(select(Book.id)))
+    ).rowcount
+    empty_days = db.session.execute(delete(DailyCirculationStat).where(
+        DailyCirculationStat.borrows == 0, DailyCirculationStat.returns == 0,
+        DailyCirculationStat.extensions == 0, DailyCirculationStat.fines_paid == 0
+    )).rowcount
+    db.session.commit()
+    return {'job_runs': runs, 'devices': devices, 'orphan_book_stats': orphans, 'empty_days': empty_days}
+
+
+def warm_caches(deadline):
+    """
+    Pre-load catalog pages (this worker's, or the shared cache's).
+    Reports are left to fill on demand: the default range runs through today, an
+    open range cached for only REPORT_OPEN_RANGE_TTL, so warming it would recompute
+    every report each run (in every worker on the memory backend) for a minute of hits.
+    """
+    from app.services import catalog
+
+    pages = 0
+    fields = catalog.parse_fields(KIOSK_CATALOG_FIELDS)
+    after_id = None
+    while time.monotonic() < deadline:
+        _, after_id, _ = catalog.catalog_cache.page(fields, after_id, 500)
+        pages += 1
+        if not after_id:
+            break
+    catalog.catalog_cache.page(catalog.parse_fields(None))
+    return {'catalog_pages': pages}
+
+
+def analyze(deadline):
+    """Refresh planner statistics; VACUUM SQLite once enough pages are free"""
+    engine = db.engine
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if engine.dialect.name == 'sqlite':
+            connection.execute(text('PRAGMA optimize'))
+            pages = connection.execute(text('PRAGMA page_count')).scalar() or 0
+            free = connection.execute(text('PRAGMA freelist_count')).scalar() or 0
+            vacuumed = bool(pages) and free / pages >= current_app.config['JOB_VACUUM_FREE_RATIO']
+            if vacuumed:
+                connection.execute(text('VACUUM'))
+            return {'dialect': 'sqlite', 'pages': pages, 'free_pages': free, 'vacuumed': vacuumed}
+        if engine.dialect.name == 'postgresql':
+            # Plain VACUUM takes no exclusive locks; autovacuum still does the bulk of the work
+            connection.execute(text('VACUUM (ANALYZE)'))
+            return {'dialect': 'postgresql', 'vacuumed': True}
+        connection.execute(text('ANALYZE'))
+        return {'dialect': engine.dialect.name}
+
+
+def reconcile_occupancy(deadline):
+    """Rebuild this worker's live occupancy counters from the DB"""
+    from app.services.occupancy import occupancy
+    return {'drift': occupancy.reconcile()}
+
+
+def purge_students(deadline):
+    """Remove deleted students' logs, visits and loans in short chunks"""
+    from app.services import purge
+    return purge.run_purges(deadline)
+
+
+def backup_snapshot(deadline):
+    """Full online backup of the database"""
+    from app.services import backup
+    record = backup.snapshot(deadline)
+    return {'path': record.path, 'size_bytes': record.size_bytes, 'throughput_mb_s': record.throughput_mb_s,
+            'lock_wait_ms': record.lock_wait_ms, 'max_step_ms': record.max_step_ms, 'restarts': record.restarts}
+
+
+def export_attendance(deadline):
+    """Attendance logs added since the last backup's watermark"""
+    from app.services import backup
+    record = backup.export_attendance(deadline)
+    if record is None:
+        return {'rows': 0}
+    return {'path': record.path, 'rows': record.rows, 'watermark': record.watermark,
+            'throughput_mb_s': record.throughput_mb_s, 'max_step_ms': record.max_step_ms}
+
+
+def register(scheduler, config):
+    window = parse_window(config['MAINTENANCE_WINDOW'])
+    scheduler.add('overdue-sweep', overdue_sweep, config['JOB_OVERDUE_SWEEP_INTERVAL'], jitter=60, timeout=300)
+    scheduler.add('compact', compact, config['JOB_COMPACT_INTERVAL'], jitter=300, timeout=600, window=window)
+    scheduler.add('analyze', analyze, config['JOB_ANALYZE_INTERVAL'], jitter=300, timeout=1800, window=window)
+    scheduler.add('backup', backup_snapshot, config['JOB_BACKUP_INTERVAL'], jitter=600, timeout=3600)
+    scheduler.add('attendance-export', export_attendance, config['JOB_ATTENDANCE_EXPORT_INTERVAL'],
+                  jitter=30, timeout=600)
+    scheduler.add('student-purge', purge_students, config['JOB_STUDENT_PURGE_INTERVAL'], jitter=5, timeout=300)
+    # A shared cache needs warming once for everyone, a per-process one in every worker
+    scheduler.add('cache-warm', warm_caches, config['JOB_CACHE_WARM_INTERVAL'], jitter=30, timeout=120,
+                  scope='process' if config['CACHE_BACKEND'] == 'memory' else 'cluster')
+    scheduler.add('occupancy-reconcile', reconcile_occupancy, config['OCCUPANCY_RECONCILE_INTERVAL'],
+                  jitter=5, timeout=60, scope='process', start_delay=config['OCCUPANCY_RECONCILE_INTERVAL'])
@@ -0,0 +1,238 @@
+"""
+Live per-zone / per-device occupancy served from in-memory counters.
+
+Counters are updated at scan time, seeded at startup from the latest log per
+(student, zone), and periodically reconciled against the database by the
+'occupancy-reconcile' scheduler job so any drift (manual zone edits, lost
+messages) heals on its own. The periodic pass only re-reads students whose
+presence can have changed since startup: those counted inside, flagged
+is_inside, or scanned today, so each worker's check stays small however long
+the attendance history grows.
+
+Seeding runs on a background thread, so a worker serves requests right away
+(snapshots say 'warming' until the counters are loaded). The first worker to
+start claims the full read and shares its result through the cache for
+SEED_TTL; workers starting meanwhile load that copy and catch up with a
+reconcile instead of reading every log again.
+
+Every change is also published on the shared cache's 'occupancy' channel and
+applied by the other workers and nodes, so each one's counters follow scans
+taken anywhere (with CACHE_BACKEND=memory there is no one to tell).
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select
+
+from app.services.cache import cache
+
+CHANNEL = 'occupancy'
+RECONCILE_CHUNK = 500  # Student ids per presence query (SQLite caps bound parameters)
+SEED_TTL = 300            # Workers starting within this long of a full read reuse it
+SEED_CLAIM_SECONDS = 120  # How long the other workers wait for the claiming worker's read
+
+seeds = cache.namespace('occupancy-seed', max_keys=4)
+
+
+class OccupancyTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._present = {}            # (student_id, zone) -> device_id of the ENTRY
+        self._zones = Counter()
+        self._devices = Counter()
+        self._students = Counter()    # student_id -> number of zones they are inside
+        self._events = 0              # bumped on every change, guards reconcile swaps
+        self.reconciled_at = None
+        self.warming = False
+
+    def init_app(self, app):
+        if not app.config.get('BACKGROUND_SERVICES', True):
+            return
+        cache.subscribe(CHANNEL, self.on_message)
+        self.warming = True
+        threading.Thread(target=self._warm, args=(app,), name='occupancy-seed', daemon=True).start()
+
+    def _warm(self, app):
+        try:
+            with app.app_context():
+                self.seed()
+        except Exception as e:
+            print(f"❌ Occupancy seeding failed: {e}")
+        finally:
+            self.warming = False
+
+    def seed(self):
+        """Load the startup counters: another worker's recent full read if there is one, else read and share it"""
+        rows = seeds.get('presence')
+        if rows is None and not seeds.add('claim', cache.origin, SEED_CLAIM_SECONDS):
+            # Another worker is reading every log; wait for its result
+            deadline = time.monotonic() + SEED_CLAIM_SECONDS
+            while rows is None and time.monotonic() < deadline and seeds.get('claim') is not None:
+                time.sleep(0.5)
+                rows = seeds.get('presence')
+        if rows is None:
+            rows = self._query_presence()
+            seeds.set('presence', rows, SEED_TTL)
+        self._replace(rows)
+        # Scans taken since the read (or while it ran) are among the candidates
+        self.warming = False
+        self.reconcile()
+
+    def on_message(self, message):
+        """Apply a change published by another process"""
+        if message['origin'] == cache.origin:
+            return
+        getattr(self, '_' + message['op'])(*message['args'])
+
+    # ---------- Mutations ----------
+    def _add(self, key, device_id):
+        self._present[key] = device_id
+        self._zones[key[1]] += 1
+        self._devices[device_id] += 1
+        self._students[key[0]] += 1
+
+    def _remove(self, key):
+        device_id = self._present.pop(key)
+        self._zones[key[1]] -= 1
+        self._devices[device_id] -= 1
+        self._students[key[0]] -= 1
+        if self._students[key[0]] <= 0:
+            del self._students[key[0]]
+
+    def record(self, student_id, zone, device_id, action):
+        """Apply a committed scan to the counters"""
+        self._record(student_id, zone, device_id, action)
+        cache.publish(CHANNEL, op='record', args=(student_id, zone, device_id, action))
+
+    def _record(self, student_id, zone, device_id, action):
+        key = (student_id, zone)
+        with self._lock:
+            self._events += 1
+            if key in self._present:
+                self._remove(key)
+            if action == 'ENTRY':
+                self._add(key, device_id)
+
+    def refresh_student(self, student_id):
+        """Re-read one student's presence from the DB (after edits/deletes)"""
+        rows = self._query_presence([student_id])
+        self._set_presence(student_id, rows)
+        cache.publish(CHANNEL, op='set_presence', args=(student_id, rows))
+
+    def _set_presence(self, student_id, rows):
+        with self._lock:
+            self._events += 1
+            for key in [k for k in self._present if k[0] == student_id]:
+                self._remove(key)
+            for sid, zone, device_id in rows:
+                self._add((sid, zone), device_id)
+
+    def remove_students(self, student_ids):
+        """Drop deleted students from the counters"""
+        self._remove_students(student_ids)
+        cache.publish(CHANNEL, op='remove_students', args=(list(student_ids),))
+
+    def _remove_students(self, student_ids):
+        student_ids = set(student_ids)
+        with self._lock:
+            self._events += 1
+            for key in [k for k in self._present if k[0] in student_ids]:
+                self._remove(key)
+
+    # ---------- Reconciliation ----------
+    def _query_presence(self, student_ids=None):
+        """(student_id, zone, device_id) for every (student, zone) whose latest log is an ENTRY"""
+        from app import db
+        from app.models import AttendanceLog, Student
+
+        # MAX(timestamp) per (student, zone) walks ix_attendance_logs_student_zone_ts once, with no
+        # sort; the latest rows are then fetched through the same index
+        latest = (select(AttendanceLog.student_id, AttendanceLog.zone,
+                         func.max(AttendanceLog.timestamp).label('timestamp'))
+                  .group_by(AttendanceLog.student_id, AttendanceLog.zone))
+        if student_ids is not None:
+            latest = latest.where(AttendanceLog.student_id.in_(student_ids))
+        latest = latest.subquery()
+
+        rows = db.session.execute(
+            select(AttendanceLog.student_id, AttendanceLog.zone, AttendanceLog.device_id, AttendanceLog.action)
+            .join(latest, and_(latest.c.student_id == AttendanceLog.student_id, latest.c.zone == AttendanceLog.zone,
+                               latest.c.timestamp == AttendanceLog.timestamp))
+            .join(Student, Student.id == AttendanceLog.student_id)
+            .where(Student.deleted_at.is_(None))
+            .order_by(AttendanceLog.id)
+        )
+        last = {}
+        for student_id, zone, device_id, action in rows:
+            last[(student_id, zone)] = (device_id, action)  # Same timestamp twice: the higher id wins
+        return [(sid, zone, device_id) for (sid, zone), (device_id, action) in last.items() if action == 'ENTRY']
+
+    def _candidates(self):
+        """Students whose presence may differ from the counters: counted, is_inside, or scanned today"""
+        from app import db
+        from app.models import AttendanceLog, Student
+
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        scanned_today = select(AttendanceLog.student_id).where(AttendanceLog.timestamp >= today)
+        flagged = db.session.scalars(
+            select(Student.id).where(or_(Student.is_inside.is_(True), Student.id.in_(scanned_today)))
+        ).all()
+        with self._lock:
+            counted = {student_id for student_id, _ in self._present}
+        return sorted(counted.union(flagged))
+
+    def reconcile(self, full=False):
+        """
+        Rebuild counters from the DB; returns how many (student, zone) entries changed.
+        full reads every student's latest logs (startup); otherwise only _candidates().
+        """
+        if self.warming:
+            return 0  # The seed thread is loading the counters
+        with self._lock:
+            events_before = self._events
+        if full:
+            rows = self._query_presence()
+        else:
+            ids = self._candidates()
+            rows = []
+            for start in range(0, len(ids), RECONCILE_CHUNK):
+                rows.extend(self._query_presence(ids[start:start + RECONCILE_CHUNK]))
+        return self._replace(rows, events_before)
+
+    def _replace(self, rows, events_before=None):
+        """
+        Swap in counters built from presence rows; returns how many entries changed.
+        With events_before, nothing is swapped if a change landed since then.
+        """
+        fresh = {(sid, zone): device_id for sid, zone, device_id in rows}
+        with self._lock:
+            if events_before is not None and self._events != events_before:
+                # A scan landed while we were reading; try again next cycle
+                return 0
+            drift = len(set(fresh.items()) ^ set(self._present.items()))
+            self._present = {}
+            self._zones, self._devices, self._students = Counter(), Counter(), Counter()
+            for key, device_id in fresh.items():
+                self._add(key, device_id)
+            self.reconciled_at = datetime.utcnow()
+        if drift:
+            print(f"🔄 Occupancy reconciled ({drift} drifted entries)")
+        return drift
+
+    # ---------- Reads ----------
+    def snapshot(self, zones=()):
+        with self._lock:
+            zone_counts = {zone: 0 for zone in zones}
+            zone_counts.update({z: n for z, n in self._zones.items() if n > 0})
+            return {
+                'zones': zone_counts,
+                'devices': {d: n for d, n in self._devices.items() if n > 0},
+                'total': len(self._students),
+                'warming': self.warming,
+                'reconciled_at': self.reconciled_at.isoformat() + 'Z' if self.reconciled_at else None
+            }
+
+
+occupancy = OccupancyTracker()
@@ -0,0 +1,50 @@
+"""
+Helpers for maintenance jobs that split work by primary-key range and run each
+range in its own process (each with its own app and DB connection).
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import func, select
+
+_worker_app = None
+
+
+def id_ranges(column, partitions):
+    """Split [min(column), max(column)] into `partitions` inclusive (lo, hi) ranges"""
+    from app import db
+
+    lo, hi = db.session.execute(select(func.min(column), func.max(column))).one()
+    if lo is None:
+        return []
+    partitions = max(1, min(partitions, hi - lo + 1))
+    step = -(-(hi - lo + 1) // partitions)  # ceil division
+    return [(start, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+
+
+def _init_worker():
+    global _worker_app
+    from app import create_app
+    from config import MaintenanceConfig
+    _worker_app = create_app(MaintenanceConfig)
+
+
+def _run_in_worker(func, lo, hi, kwargs):
+    with _worker_app.app_context():
+        return func(lo, hi, **kwargs)
+
+
+def run_partitioned(func, ranges, workers, **kwargs):
+    """
+    Run func(lo, hi, **kwargs) for every range across a process pool.
+    Yields ((lo, hi), result) as partitions finish. func must be importable (module-level).
+    """
+    if workers <= 1:
+        # Run inline in the caller's app context
+        for lo, hi in ranges:
+            yield (lo, hi), func(lo, hi, **kwargs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_run_in_worker, func, lo, hi, kwargs): (lo, hi) for lo, hi in ranges}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,187 @@
+"""
+Student deletion: an immediate soft delete, then a chunked background purge.
+
+delete_students() only touches the students table: each student is deactivated,
+stamped with deleted_at and has its card and roll number released (so the card
+can be re-issued and scans never match it), and a StudentPurge row is queued.
+The 'student-purge' scheduler job then removes each student's visit sessions,
+attendance logs and borrow records PURGE_BATCH_SIZE rows at a time, one short
+transaction per chunk, so gate scans never queue behind a long delete. Loans
+still open are closed first and their copies put back on the shelf. Progress
+is kept on the StudentPurge rows (GET /api/admin/purges).
+"""
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import String, cast, delete, func, literal, select, update
+
+from app import db
+from app.models import AttendanceLog, Book, BorrowRecord, Student, StudentPurge, VisitSession
+from app.services import catalog, circulation
+from app.services.occupancy import occupancy
+
+QUEUE_CHUNK = 500  # Students soft-deleted per transaction
+
+
+def _counts(model, student_ids):
+    rows = db.session.execute(
+        select(model.student_id, func.count()).where(model.student_id.in_(student_ids)).group_by(model.student_id)
+    )
+    return dict(rows.all())
+
+
+def delete_students(student_ids):
+    """
+    Soft-delete students and queue their purge; returns {'deleted', 'requeued', 'open_loans'}.
+    Ids of students already deleted re-queue a failed purge; unknown ids are ignored.
+    """
+    now = datetime.utcnow()
+    deleted = requeued = open_loans = 0
+    student_ids = sorted(set(student_ids))
+    for start in range(0, len(student_ids), QUEUE_CHUNK):
+        chunk = student_ids[start:start + QUEUE_CHUNK]
+        students = db.session.execute(
+            select(Student.id, Student.name, Student.roll_number, Student.rfid_uid)
+            .where(Student.id.in_(chunk), Student.deleted_at.is_(None))
+        ).all()
+        requeued += db.session.execute(
+            update(StudentPurge)
+            .where(StudentPurge.student_id.in_(chunk), StudentPurge.status == 'failed')
+            .values(status='pending', error=None)
+        ).rowcount
+        if not students:
+            db.session.commit()
+            continue
+
+        ids = [s.id for s in students]
+        released = literal('DELETED-') + cast(Student.id, String)
+        db.session.execute(
+            update(Student).where(Student.id.in_(ids)).values(
+                is_active=False, is_inside=False, deleted_at=now, rfid_uid=released, roll_number=released
+            )
+        )
+        # Totals for progress reporting (all three are indexed by student_id)
+        totals = [_counts(model, ids) for model in (AttendanceLog, VisitSession, BorrowRecord)]
+        open_loans += db.session.scalar(
+            select(func.count()).select_from(BorrowRecord)
+            .where(BorrowRecord.student_id.in_(ids), BorrowRecord.returned_at.is_(None))
+        )
+        db.session.add_all([
+            StudentPurge(
+                student_id=s.id, name=s.name, roll_number=s.roll_number, rfid_uid=s.rfid_uid,
+                requested_at=now, rows_total=sum(total.get(s.id, 0) for total in totals)
+            )
+            for s in students
+        ])
+        db.session.commit()
+        deleted += len(ids)
+        occupancy.remove_students(ids)
+    return {'deleted': deleted, 'requeued': requeued, 'open_loans': open_loans}
+
+
+def _delete_chunk(model, student_id, batch_size):
+    ids = select(model.id).where(model.student_id == student_id).limit(batch_size)
+    return db.session.execute(delete(model).where(model.id.in_(ids))).rowcount
+
+
+def _purge_loans_chunk(purge, batch_size):
+    """Close open loans (copy back on the shelf), then delete one chunk of borrow records"""
+    borrows = BorrowRecord.query.filter_by(student_id=purge.student_id).limit(batch_size).all()
+    now = datetime.utcnow()
+    for borrow in borrows:
+        if borrow.returned_at is None:
+            borrow.returned_at = now
+            borrow.status = 'RETURNED'
+            circulation.record_return(borrow)
+            book = db.session.get(Book, borrow.book_id)
+            if book is not None:
+                book.available_copies += 1
+                catalog.bump_availability(book)
+            purge.copies_restored += 1
+        db.session.delete(borrow)
+    return len(borrows)
+
+
+def purge_student(purge, batch_size, deadline):
+    """Purge one student's history in chunks; returns True once finished, False at the deadline"""
+    if purge.status == 'pending':
+        purge.status = 'running'
+        purge.started_at = datetime.utcnow()
+        db.session.commit()
+
+    # Visits reference log rows, so they go first
+    steps = (
+        ('visits_deleted', lambda: _delete_chunk(VisitSession, purge.student_id, batch_size)),
+        ('logs_deleted', lambda: _delete_chunk(AttendanceLog, purge.student_id, batch_size)),
+        ('borrows_deleted', lambda: _purge_loans_chunk(purge, batch_size)),
+    )
+    for counter, step in steps:
+        while True:
+            if time.monotonic() >= deadline:
+                return False
+            removed = step()
+            setattr(purge, counter, getattr(purge, counter) + removed)
+            db.session.commit()
+            if removed < batch_size:
+                break
+
+    db.session.execute(delete(Student).where(Student.id == purge.student_id))
+    purge.status = 'done'
+    purge.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def run_purges(deadline):
+    """Scheduler job: work through queued purges, oldest first, until the deadline"""
+    batch_size = current_app.config['PURGE_BATCH_SIZE']
+    finished = failed = 0
+    while time.monotonic() < deadline:
+        purge = (StudentPurge.query.filter(StudentPurge.status.in_(('pending', 'running')))
+                 .order_by(StudentPurge.id).first())
+        if purge is None:
+            break
+        try:
+            if not purge_student(purge, batch_size, deadline):
+                break
+            finished += 1
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Purge of student {purge.student_id} failed: {e}")
+            purge.status = 'failed'
+            purge.error = str(e)
+            db.session.commit()
+            failed += 1
+
+    if finished:
+        # Reports are computed from the rows just removed
+        from app.services.reports import report_cache
+        report_cache.clear()
+    pending = StudentPurge.query.filter(StudentPurge.status.in_(('pending', 'running'))).count()
+    return {'finished': finished, 'failed': failed, 'pending': pending}
+
+
+def progress(status=None, limit=50):
+    """Counts per status, remaining rows, and the latest purges for the admin view"""
+    counts = dict(db.session.execute(
+        select(StudentPurge.status, func.count()).group_by(StudentPurge.status)
+    ).all())
+    open_purges = StudentPurge.status.in_(('pending', 'running'))
+    rows_total, rows_deleted = db.session.execute(
+        select(
+            func.coalesce(func.sum(StudentPurge.rows_total), 0),
+            func.coalesce(func.sum(
+                StudentPurge.logs_deleted + StudentPurge.visits_deleted + StudentPurge.borrows_deleted
+            ), 0)
+        ).where(open_purges)
+    ).one()
+
+    query = StudentPurge.query.order_by(StudentPurge.id.desc())
+    if status:
+        query = query.filter_by(status=status)
+    return {
+        'counts': {name: counts.get(name, 0) for name in ('pending', 'running', 'done', 'failed')},
+        'rows_remaining': max(0, rows_total - rows_deleted),
+        'purges': [purge.to_dict() for purge in query.limit(limit)]
+    }
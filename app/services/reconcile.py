@@ -0,0 +1,183 @@
+"""
+Consistency checks for denormalized state, recomputed from the source tables:
+
+  students  Student.is_inside       <- action of the student's latest attendance log
+  books     Book.available_copies   <- total_copies - unreturned borrow records
+  borrows   BorrowRecord.status / fine_amount <- due_date, returned_at, fine_paid
+
+Each check_* function handles one primary-key range, reads it STREAM_BATCH ids
+at a time (each page fully fetched, so fixes can commit between pages without
+closing a server-side cursor), and optionally writes fixes back in batches. Each
+fix only applies while the row still holds the value that was read: a borrow,
+return or scan committed in between wins, and the row is counted as changed
+concurrently instead of being overwritten with a stale correction.
+reconcile_state.py runs them across a process pool.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, func, select, update
+
+from app import db
+from app.models import AttendanceLog, Book, BorrowRecord, Student
+from app.models.borrow_record import days_overdue
+
+STREAM_BATCH = 2000
+SAMPLE_SIZE = 20
+
+
+def _id_pages(lo, hi):
+    """[lo, hi] in inclusive sub-ranges of STREAM_BATCH ids"""
+    for start in range(lo, hi + 1, STREAM_BATCH):
+        yield start, min(start + STREAM_BATCH - 1, hi)
+
+
+class _Report:
+    """Collects diffs for one partition, flushing fixes every batch_size rows"""
+
+    def __init__(self, model, apply, batch_size):
+        self.model = model
+        self.apply = apply
+        self.batch_size = batch_size
+        self.checked = 0
+        self.diff_count = 0
+        self.fixed = 0
+        self.concurrent = 0
+        self.samples = []
+        self._pending = []
+
+    def diff(self, row_id, changes, before):
+        self.diff_count += 1
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append({'id': row_id, 'before': before, 'after': changes})
+        if self.apply:
+            self._pending.append((row_id, changes, before))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def _unchanged(self, before):
+        """WHERE clauses matching the values the check read"""
+        return [getattr(self.model, column).is_(None) if value is None else getattr(self.model, column) == value
+                for column, value in before.items()]
+
+    def flush(self):
+        if not self._pending:
+            return
+        for row_id, changes, before in self._pending:
+            result = db.session.execute(
+                update(self.model).where(self.model.id == row_id, *self._unchanged(before)).values(**changes)
+            )
+            if result.rowcount:
+                self.fixed += 1
+            else:
+                self.concurrent += 1  # Written since it was read; the next run checks it again
+        db.session.commit()
+        self._pending = []
+
+    def result(self):
+        self.flush()
+        return {
+            'checked': self.checked,
+            'diff_count': self.diff_count,
+            'fixed': self.fixed,
+            'concurrent': self.concurrent,
+            'samples': self.samples
+        }
+
+
+def check_students(lo, hi, apply=False, batch_size=1000):
+    """is_inside should match the student's most recent scan in any zone"""
+    report = _Report(Student, apply, batch_size)
+    for start, end in _id_pages(lo, hi):
+        rank = func.row_number().over(
+            partition_by=AttendanceLog.student_id,
+            order_by=(AttendanceLog.timestamp.desc(), AttendanceLog.id.desc())
+        ).label('rank')
+        ranked = (
+            select(AttendanceLog.student_id, AttendanceLog.action, rank)
+            .where(AttendanceLog.student_id.between(start, end))
+            .subquery()
+        )
+        rows = db.session.execute(
+            select(Student.id, Student.is_inside, ranked.c.action)
+            .outerjoin(ranked, and_(ranked.c.student_id == Student.id, ranked.c.rank == 1))
+            .where(Student.id.between(start, end), Student.deleted_at.is_(None))  # Deleted: out, until purged
+            .order_by(Student.id)
+        ).all()
+        for student_id, is_inside, last_action in rows:
+            report.checked += 1
+            expected = last_action == 'ENTRY'
+            if bool(is_inside) != expected:
+                report.diff(student_id, {'is_inside': expected}, {'is_inside': is_inside})
+    return report.result()
+
+
+def check_books(lo, hi, apply=False, batch_size=1000):
+    """available_copies should equal total copies minus unreturned borrows"""
+    report = _Report(Book, apply, batch_size)
+    for start, end in _id_pages(lo, hi):
+        on_loan = (
+            select(BorrowRecord.book_id, func.count(BorrowRecord.id).label('on_loan'))
+            .where(BorrowRecord.returned_at.is_(None), BorrowRecord.book_id.between(start, end))
+            .group_by(BorrowRecord.book_id)
+            .subquery()
+        )
+        rows = db.session.execute(
+            select(Book.id, Book.total_copies, Book.available_copies, on_loan.c.on_loan)
+            .outerjoin(on_loan, on_loan.c.book_id == Book.id)
+            .where(Book.id.between(start, end))
+            .order_by(Book.id)
+        ).all()
+        for book_id, total, available, loaned in rows:
+            report.checked += 1
+            expected = max(0, (total or 0) - (loaned or 0))
+            if available != expected:
+                report.diff(book_id, {'available_copies': expected}, {'available_copies': available})
+    return report.result()
+
+
+def expected_borrow_state(due_date, returned_at, fine_amount, fine_paid, now):
+    """(status, fine_amount) a borrow record should have; accrued fines are never reduced"""
+    if returned_at:
+        status = 'RETURNED'
+    elif now > due_date:
+        status = 'OVERDUE'
+    else:
+        status = 'ACTIVE'
+
+    fine = fine_amount or 0.0
+    if not fine_paid:
+        fine = max(fine, float(days_overdue(due_date, returned_at or now)))
+    return status, fine
+
+
+def check_borrows(lo, hi, apply=False, batch_size=1000):
+    """status and fine_amount should follow from the due date and return time"""
+    now = datetime.utcnow()
+    report = _Report(BorrowRecord, apply, batch_size)
+    for start, end in _id_pages(lo, hi):
+        rows = db.session.execute(
+            select(BorrowRecord.id, BorrowRecord.due_date, BorrowRecord.returned_at,
+                   BorrowRecord.fine_amount, BorrowRecord.fine_paid, BorrowRecord.status)
+            .where(BorrowRecord.id.between(start, end))
+            .order_by(BorrowRecord.id)
+        ).all()
+        for borrow_id, due_date, returned_at, fine_amount, fine_paid, status in rows:
+            report.checked += 1
+            expected_status, expected_fine = expected_borrow_state(
+                due_date, returned_at, fine_amount, fine_paid, now
+            )
+            if status != expected_status or (fine_amount or 0.0) != expected_fine:
+                report.diff(
+                    borrow_id,
+                    {'status': expected_status, 'fine_amount': expected_fine},
+                    {'status': status, 'fine_amount': fine_amount}
+                )
+    return report.result()
+
+
+# name -> (id column to partition on, partition function)
+CHECKS = {
+    'students': (Student.id, check_students),
+    'books': (Book.id, check_books),
+    'borrows': (BorrowRecord.id, check_borrows),
+}
@@ -0,0 +1,120 @@
+"""
+Read/write routing between the primary database and an optional read replica.
+
+Read-only GET endpoints decorated with ``@replica_reads`` run their queries on
+the ``replica`` bind, unless:
+  - no replica is configured (``REPLICA_DATABASE_URL`` unset),
+  - the replica lags more than ``REPLICA_MAX_STALENESS`` seconds, or its lag
+    can't be measured (only PostgreSQL reports it; ``REPLICA_TRUST_UNMEASURED``
+    opts other engines, e.g. a SQLite copy for testing, in as lag 0), or
+  - the client wrote something recently (read-your-writes cookie).
+Anything that flushes (writes) always goes to the primary.
+"""
+import time
+import threading
+from functools import wraps
+
+from flask import current_app, g, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+
+REPLICA_BIND = 'replica'
+PRIMARY_UNTIL_COOKIE = 'primary_until'
+
+_lag_lock = threading.Lock()
+_lag_cache = {'checked_at': 0.0, 'lag': None}
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica when the current request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and g and g.get('use_replica'):
+            engines = self._db.engines
+            if REPLICA_BIND in engines:
+                return engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_configured():
+    return REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {})
+
+
+def measure_replica_lag(engine, trust_unmeasured=False):
+    """Return replica lag in seconds, or None if the engine has no replication info and isn't trusted"""
+    if engine.dialect.name != 'postgresql':
+        # SQLite file copies / test replicas carry no replication clock
+        if not trust_unmeasured:
+            return None
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))  # Still fall back when it is unreachable
+        return 0.0
+    with engine.connect() as conn:
+        lag = conn.execute(text(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp())) "
+            "ELSE 0 END"
+        )).scalar()
+    return float(lag or 0.0)
+
+
+def replica_lag():
+    """Cached replica lag in seconds, or None if the replica is unreachable or its lag unknown"""
+    interval = current_app.config['REPLICA_LAG_CHECK_INTERVAL']
+    now = time.monotonic()
+    with _lag_lock:
+        if now - _lag_cache['checked_at'] < interval:
+            return _lag_cache['lag']
+        _lag_cache['checked_at'] = now
+
+    from app import db
+    try:
+        lag = measure_replica_lag(db.engines[REPLICA_BIND], current_app.config['REPLICA_TRUST_UNMEASURED'])
+    except Exception as e:
+        print(f"⚠️  Replica lag check failed: {e}")
+        lag = None
+
+    with _lag_lock:
+        _lag_cache['lag'] = lag
+    return lag
+
+
+def _client_needs_primary():
+    """True if this client wrote recently and must read its own writes"""
+    try:
+        primary_until = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+    except ValueError:
+        return False
+    return time.time() < primary_until
+
+
+def should_use_replica():
+    if not replica_configured() or _client_needs_primary():
+        return False
+    lag = replica_lag()
+    return lag is not None and lag <= current_app.config['REPLICA_MAX_STALENESS']
+
+
+def replica_reads(view):
+    """Route the queries of a read-only view to the replica when it is fresh enough"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = request.method == 'GET' and should_use_replica()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return wrapper
+
+
+def init_app(app):
+    """Mark writers so their follow-up reads stay on the primary"""
+    @app.after_request
+    def pin_writers_to_primary(response):
+        if (request.method not in ('GET', 'HEAD', 'OPTIONS')
+                and response.status_code < 400
+                and replica_configured()):
+            window = app.config['REPLICA_MAX_STALENESS'] + app.config['REPLICA_LAG_CHECK_INTERVAL']
+            response.set_cookie(PRIMARY_UNTIL_COOKIE, str(time.time() + window),
+                                max_age=int(window) + 1, httponly=True, samesite='Lax')
+        return response
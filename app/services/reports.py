@@ -0,0 +1,218 @@
+"""
+Attendance reports computed on columns instead of ORM objects.
+
+AttendanceLog rows in the requested range are streamed through a chunked cursor
+as plain integers (epoch seconds, student id, zone code, action) into NumPy
+arrays, and every report is a handful of vectorized group-bys over them.
+
+NumPy is imported on first use, so workers that never serve a report don't
+pay for it at startup.
+
+Results are cached per (report, date range) in the shared cache, so every
+worker and node reuses a report computed once. Ranges made only of closed days
+(before today, UTC) don't change and stay cached until evicted; ranges that
+include today expire after REPORT_OPEN_RANGE_TTL. Backfilled scans and zone
+corrections on a past day invalidate the cached ranges covering that day: each
+invalidation stamps the day with a new value of a shared counter, and a cached
+result computed before the latest stamp of any day in its range is stale.
+"""
+import itertools
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import BigInteger, Integer, case, cast, func, select
+
+from app import db
+from app.models import AttendanceLog, Student
+from app.services.cache import cache
+
+DAY = 86400
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+# ---------- Column loading ----------
+def _epoch_seconds(column):
+    if db.engine.dialect.name == 'sqlite':
+        return cast(func.strftime('%s', column), Integer)
+    return cast(func.extract('epoch', column), BigInteger)
+
+
+def load_columns(start, end, zones, chunk_size=50000, action=None):
+    """
+    AttendanceLog rows with start <= timestamp < end (and the given action, if any) as int64 arrays:
+    ts (epoch seconds, UTC), student_id, zone (index into zones, -1 if other), action (1 ENTRY, 0 EXIT)
+    """
+    import numpy as np
+    zone_code = case({zone: i for i, zone in enumerate(zones)}, value=AttendanceLog.zone, else_=-1)
+    action_code = case((AttendanceLog.action == 'ENTRY', 1), else_=0)
+    query = select(
+        _epoch_seconds(AttendanceLog.timestamp), AttendanceLog.student_id, zone_code, action_code
+    ).where(AttendanceLog.timestamp >= start, AttendanceLog.timestamp < end)
+    if action:
+        query = query.where(AttendanceLog.action == action)
+
+    # Core execution: no ORM row processing; server-side cursor where the driver has one
+    chunks = []
+    connection = db.session.connection().execution_options(stream_results=True)
+    for part in connection.execute(query).partitions(chunk_size):
+        flat = np.fromiter(itertools.chain.from_iterable(part), dtype=np.int64, count=len(part) * 4)
+        chunks.append(flat.reshape(-1, 4))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 4), dtype=np.int64)
+    return {'ts': data[:, 0], 'student_id': data[:, 1], 'zone': data[:, 2], 'action': data[:, 3]}
+
+
+def _departments():
+    """(department names, array mapping student id -> department index)"""
+    import numpy as np
+    rows = db.session.execute(select(Student.id, Student.department)).all()
+    names = sorted({department or 'Unknown' for _, department in rows})
+    index = {name: i for i, name in enumerate(names)}
+    lookup = np.full(max((sid for sid, _ in rows), default=0) + 1, -1, dtype=np.int64)
+    for sid, department in rows:
+        lookup[sid] = index[department or 'Unknown']
+    return names, lookup
+
+
+# ---------- Reports ----------
+def department_weekly(columns, start, end, zones):
+    """ENTRY count and distinct students per department per week (weeks start Monday)"""
+    import numpy as np
+    entries = columns['action'] == 1
+    ts = columns['ts'][entries]
+    students = columns['student_id'][entries]
+    names, lookup = _departments()
+    if ts.size == 0:
+        return []
+
+    week = (ts // DAY + 3) // 7  # Epoch day 0 is a Thursday
+    first_week = int(week.min())
+    week -= first_week
+    n_weeks = int(week.max()) + 1
+    known = students < lookup.size
+    department = np.where(known, lookup[np.where(known, students, 0)], -1)
+    keep = department >= 0
+    key = department[keep] * n_weeks + week[keep]
+    students = students[keep]
+    if key.size == 0:
+        return []
+
+    size = len(names) * n_weeks
+    entry_counts = np.bincount(key, minlength=size)
+    # Distinct (department-week, student) pairs, counted per department-week
+    stride = int(students.max()) + 1
+    unique_counts = np.bincount(np.unique(key * stride + students) // stride, minlength=size)
+
+    rows = []
+    for k in np.flatnonzero(entry_counts):
+        d, w = divmod(int(k), n_weeks)
+        week_start = datetime(1970, 1, 1) + timedelta(days=7 * (first_week + w) - 3)
+        rows.append({
+            'department': names[d],
+            'week_start': week_start.date().isoformat(),
+            'entries': int(entry_counts[k]),
+            'unique_students': int(unique_counts[k])
+        })
+    rows.sort(key=lambda row: (row['week_start'], row['department']))
+    return rows
+
+
+def zone_heatmap(columns, start, end, zones):
+    """ENTRY counts per zone by hour of week: zone -> 7 rows (Mon..Sun) x 24 hours, UTC"""
+    import numpy as np
+    mask = (columns['action'] == 1) & (columns['zone'] >= 0)
+    ts = columns['ts'][mask]
+    hour_of_week = ((ts // DAY + 3) % 7) * 24 + (ts % DAY) // 3600
+    counts = np.bincount(columns['zone'][mask] * 168 + hour_of_week, minlength=len(zones) * 168)
+    grid = counts.reshape(len(zones), 7, 24)
+    return {
+        'days': list(WEEKDAYS),
+        'weeks': round((end - start).days / 7, 2),
+        'zones': {zone: grid[i].tolist() for i, zone in enumerate(zones)},
+        'totals': {zone: int(grid[i].sum()) for i, zone in enumerate(zones)}
+    }
+
+
+# name -> (report function, action the rows are filtered on before loading)
+REPORTS = {
+    'department-weekly': (department_weekly, 'ENTRY'),
+    'zone-heatmap': (zone_heatmap, 'ENTRY'),
+}
+
+
+# ---------- Cache ----------
+class ReportCache:
+    def __init__(self):
+        self.open_ttl = 60
+        self.chunk_size = 50000
+        self.zones = ('Library', 'Lab', 'Classroom')
+        self.entries = cache.namespace('reports', max_keys=128)      # name:start:end -> (version, result)
+        self.stamps = cache.namespace('report-stamps', max_keys=4096)  # day -> version that invalidated it
+
+    def init_app(self, app):
+        self.open_ttl = app.config['REPORT_OPEN_RANGE_TTL']
+        self.chunk_size = app.config['REPORT_CHUNK_SIZE']
+        self.zones = tuple(app.config['ZONES'])
+        self.entries = cache.namespace('reports', app.config['REPORT_CACHE_MAX_ENTRIES'])
+
+    @staticmethod
+    def _key(key):
+        return ':'.join(str(part) for part in key)
+
+    def get(self, key):
+        _, start, end = key
+
+        def fresh(entry):
+            days = [(start + timedelta(days=n)).isoformat() for n in range((end - start).days)]
+            return all(stamp is None or stamp <= entry[0] for stamp in self.stamps.get_many(['all'] + days))
+
+        entry = self.entries.get(self._key(key), valid=fresh)
+        return entry[1] if entry is not None else None
+
+    def version(self):
+        """Read before computing a result: invalidations after this make it stale"""
+        return self.stamps.counter('version')
+
+    def set(self, key, result, closed, version=0):
+        self.entries.set(self._key(key), (version, result), None if closed else self.open_ttl)
+
+    def _stamp(self, name):
+        version = self.stamps.incr('version')
+        if version is not None:
+            self.stamps.set(name, version)
+
+    def invalidate_day(self, day):
+        """Drop cached ranges that include this date"""
+        self._stamp(day.isoformat())
+
+    def clear(self):
+        self._stamp('all')
+
+    def run(self, name, start, end):
+        """
+        Report over the dates start..end (inclusive, UTC).
+        Returns (result, meta); raises KeyError for an unknown report.
+        """
+        report, action = REPORTS[name]
+        end_exclusive = end + timedelta(days=1)
+        key = (name, start.date(), end_exclusive.date())
+        meta = {'report': name, 'start': start.date().isoformat(), 'end': end.date().isoformat()}
+
+        result = self.get(key)
+        if result is not None:
+            return result, {**meta, 'cached': True}
+
+        started = time.perf_counter()
+        version = self.version()
+        columns = load_columns(start, end_exclusive, self.zones, self.chunk_size, action)
+        result = report(columns, start, end_exclusive, self.zones)
+        closed = end_exclusive.date() <= datetime.utcnow().date()
+        self.set(key, result, closed, version)
+        return result, {
+            **meta,
+            'cached': False,
+            'rows_scanned': int(columns['ts'].size),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+
+
+report_cache = ReportCache()
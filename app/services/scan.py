@@ -0,0 +1,208 @@
+"""
+Scan recording shared by every ingestion path (/api/scan and friends).
+
+The statement builders and row helpers here are also used by the asyncio
+ingestion service (app/services/scan_async.py), so both paths toggle,
+auto-register and respond identically.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Student, AttendanceLog
+from app.services.occupancy import occupancy
+from app.services.dedupe import scan_dedupe
+from app.services import visits
+from app.services.corrections import refresh_is_inside
+from app.services.reports import report_cache
+
+
+def next_action(latest_action):
+    """Zone-specific toggle: an ENTRY is followed by an EXIT, anything else by an ENTRY"""
+    return 'EXIT' if latest_action == 'ENTRY' else 'ENTRY'
+
+
+def parse_scan_timestamp(value):
+    """
+    Tap time sent with a backfilled scan (ISO 8601) as naive UTC. Naive input is
+    taken as UTC; times in the future are clamped to now. Raises ValueError.
+    """
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError('timestamp must be an ISO 8601 string')
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(parsed, datetime.utcnow())
+
+
+def scan_args(data):
+    """
+    (rfid_uid, device_id, zone, client_seq, timestamp) from one scan's JSON object.
+    Raises ValueError with the message to send back to the reader.
+    """
+    if not isinstance(data, dict) or not data.get('rfid_uid'):
+        raise ValueError('RFID UID required')
+    try:
+        # Original tap time, sent when a reader uploads from its offline queue
+        timestamp = parse_scan_timestamp(data.get('timestamp'))
+    except ValueError as e:
+        raise ValueError(f'Invalid timestamp: {e}')
+    return (
+        data['rfid_uid'].upper().strip(),
+        data.get('device_id', 'GATE_01'),
+        data.get('zone', 'Library'),
+        data.get('client_seq'),  # Optional idempotency key: (device_id, client_seq)
+        timestamp
+    )
+
+
+def active_student(rfid_uid):
+    """SELECT for the active student holding a card"""
+    return select(Student).filter_by(rfid_uid=rfid_uid, is_active=True).limit(1)
+
+
+def latest_zone_log(student_id, zone, before=None):
+    """
+    SELECT for the student's latest log in a zone, which decides the next action.
+    A backfilled scan toggles against the latest log at or before its tap time (before).
+    """
+    query = select(AttendanceLog).filter_by(student_id=student_id, zone=zone)
+    if before is not None:
+        query = query.where(AttendanceLog.timestamp <= before)
+    return query.order_by(AttendanceLog.timestamp.desc(), AttendanceLog.id.desc()).limit(1)
+
+
+def later_log(student_id, timestamp):
+    """SELECT for any of the student's logs after timestamp; a backfill landing before one is out of order"""
+    return (select(AttendanceLog.id)
+            .where(AttendanceLog.student_id == student_id, AttendanceLog.timestamp > timestamp).limit(1))
+
+
+def auto_register(rfid_uid):
+    """Placeholder student for an unknown card (caller adds and commits)"""
+    print(f"✨ Auto-registering new card: {rfid_uid}")
+    return Student(
+        rfid_uid=rfid_uid,
+        name=f"New Student ({rfid_uid})",
+        roll_number=f"TEMP-{rfid_uid}",
+        department="Auto-Registered",
+        is_inside=False # Will be set to True below
+    )
+
+
+def new_log(student, rfid_uid, action, device_id, zone, timestamp=None):
+    """The attendance log row for a scan; also updates the student's global state"""
+    student.is_inside = action == 'ENTRY'
+    log = AttendanceLog(
+        student_id=student.id,
+        rfid_uid=rfid_uid,
+        action=action,
+        device_id=device_id,
+        zone=zone
+    )
+    if timestamp is not None:
+        log.timestamp = timestamp
+    return log
+
+
+def after_commit(student, log, backfilled=False, out_of_order=False):
+    """In-process state to update once a scan is committed"""
+    if out_of_order:
+        resequence(student.id)
+    else:
+        occupancy.record(student.id, log.zone, log.device_id, log.action)
+    if backfilled:
+        # Backfilled tap: cached reports covering that day are stale
+        report_cache.invalidate_day(log.timestamp.date())
+
+
+def resequence(student_id):
+    """
+    Re-derive visits, is_inside and occupancy for a student after a backfilled
+    scan landed before logs already recorded (needs an app context)
+    """
+    visits.rebuild_students([student_id])
+    refresh_is_inside([student_id])
+    occupancy.refresh_student(student_id)
+
+
+def scan_result(student, log):
+    return {
+        'success': True,
+        'action': log.action,
+        'student': {
+            'id': student.id,
+            'name': student.name,
+            'roll_number': student.roll_number,
+            'department': student.department
+        },
+        'zone': log.zone,
+        'timestamp': log.timestamp.isoformat() + 'Z'
+    }
+
+
+def record_scan(rfid_uid, device_id='GATE_01', zone='Library', timestamp=None):
+    """
+    Log an ENTRY/EXIT for a card (auto-registering unknown cards); returns the response dict.
+    timestamp (naive UTC) keeps the original tap time of scans uploaded from a reader's offline queue.
+    """
+    # Find student by RFID
+    student = db.session.scalar(active_student(rfid_uid))
+    
+    if not student:
+        # AUTO-REGISTRATION LOGIC
+        student = auto_register(rfid_uid)
+        db.session.add(student)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another reader registered the same card concurrently
+            db.session.rollback()
+            student = db.session.scalar(active_student(rfid_uid))
+            if student is None:
+                raise
+    
+    # Zone-specific toggling logic
+    latest_log = db.session.scalar(latest_zone_log(student.id, zone, before=timestamp))
+    out_of_order = timestamp is not None and db.session.scalar(later_log(student.id, timestamp)) is not None
+
+    action = next_action(latest_log.action if latest_log else None)
+    log = new_log(student, rfid_uid, action, device_id, zone, timestamp)
+    
+    db.session.add(log)
+    if action == 'EXIT' and not out_of_order:
+        # Close the visit opened by the matching ENTRY
+        db.session.flush()
+        visits.record_visit(latest_log, log)
+    db.session.commit()
+    # Out of order, the visits around the new log are rebuilt instead
+    after_commit(student, log, backfilled=timestamp is not None, out_of_order=out_of_order)
+    
+    return scan_result(student, log)
+
+
+def handle_scan(rfid_uid, device_id='GATE_01', zone='Library', client_seq=None, timestamp=None):
+    """
+    Record a scan unless it is a retry (same device_id + client_seq) or a bounce
+    (same card and zone inside the debounce window). Duplicates replay the original
+    result with 'duplicate': True and do no DB work.
+    Backfilled scans (with a timestamp) skip the debounce: the reader already
+    debounced them at tap time, and a queue drains many taps of a card in a burst.
+    """
+    debounce = timestamp is None
+    with scan_dedupe.lock_for(rfid_uid, zone):
+        original = scan_dedupe.claim(rfid_uid, zone, device_id, client_seq, debounce=debounce)
+        if original is not None:
+            return {**original, 'duplicate': True}
+        
+        try:
+            result = record_scan(rfid_uid, device_id, zone, timestamp)
+        except Exception:
+            scan_dedupe.release(device_id, client_seq)
+            raise
+        scan_dedupe.remember(result, rfid_uid, zone, device_id, client_seq, debounce=debounce)
+    return result
@@ -0,0 +1,122 @@
+"""
+asyncio scan recording for the ASGI ingestion service (app/asgi.py).
+
+Same models, toggling, auto-registration, dedupe and occupancy updates as
+handle_scan(), but on an async driver (aiosqlite / asyncpg) with its own
+connection pool, so a request waiting on the database holds a coroutine
+instead of a worker thread. The optional drivers are only imported when the
+service starts. Dedupe and occupancy go to the shared cache, which may be a
+blocking Redis client, so those calls run on the loop's thread pool.
+"""
+import asyncio
+import contextlib
+import functools
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.services import visits
+from app.services.dedupe import scan_dedupe
+from app.services.scan import (
+    active_student, after_commit, auto_register, later_log, latest_zone_log, new_log, next_action, scan_result
+)
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+def async_database_url(url):
+    """DATABASE_URL with the dialect's async driver (sqlite -> aiosqlite, postgresql -> asyncpg)"""
+    scheme, _, rest = url.partition('://')
+    dialect = scheme.split('+')[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for {dialect}; set ASYNC_DATABASE_URL')
+    return f'{ASYNC_DRIVERS[dialect]}://{rest}'
+
+
+async def in_thread(func, *args, **kwargs):
+    """Run a blocking call (shared cache / Redis) off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+class AsyncScanRecorder:
+    STRIPES = 64
+
+    def __init__(self, app):
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        self.app = app
+        url = app.config['ASYNC_DATABASE_URL'] or async_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        options = {}
+        if not url.startswith('sqlite'):
+            options = {
+                'pool_size': app.config['ASYNC_DB_POOL_SIZE'],
+                'max_overflow': app.config['ASYNC_DB_MAX_OVERFLOW'],
+                'pool_pre_ping': True,
+            }
+        self.engine = create_async_engine(url, **options)
+        # SQLite has a single writer: interleaved transactions on pooled connections fail
+        # with 'database is locked' instead of waiting, so queue them here instead
+        self._write_lock = asyncio.Lock() if url.startswith('sqlite') else contextlib.nullcontext()
+        # Rows are read after commit to build the response; don't expire them
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        # Same card + zone is recorded by one coroutine at a time (see ScanDeduplicator)
+        self._stripes = [asyncio.Lock() for _ in range(self.STRIPES)]
+
+    async def handle(self, rfid_uid, device_id='GATE_01', zone='Library', client_seq=None, timestamp=None):
+        """Async twin of scan.handle_scan(): dedupe, then record"""
+        debounce = timestamp is None
+        async with self._stripes[hash((rfid_uid, zone)) % self.STRIPES]:
+            original = await in_thread(scan_dedupe.claim, rfid_uid, zone, device_id, client_seq, debounce=debounce)
+            if original is not None:
+                return {**original, 'duplicate': True}
+
+            try:
+                result = await self.record(rfid_uid, device_id, zone, timestamp)
+            except Exception:
+                await in_thread(scan_dedupe.release, device_id, client_seq)
+                raise
+            await in_thread(scan_dedupe.remember, result, rfid_uid, zone, device_id, client_seq, debounce=debounce)
+        return result
+
+    async def record(self, rfid_uid, device_id='GATE_01', zone='Library', timestamp=None):
+        """Async twin of scan.record_scan()"""
+        async with self._write_lock, self.sessions() as session:
+            student = await session.scalar(active_student(rfid_uid))
+            if not student:
+                student = auto_register(rfid_uid)
+                session.add(student)
+                try:
+                    await session.commit()
+                except IntegrityError:
+                    # Another reader registered the same card concurrently
+                    await session.rollback()
+                    student = await session.scalar(active_student(rfid_uid))
+                    if student is None:
+                        raise
+
+            latest_log = await session.scalar(latest_zone_log(student.id, zone, before=timestamp))
+            out_of_order = timestamp is not None and await session.scalar(later_log(student.id, timestamp)) is not None
+            action = next_action(latest_log.action if latest_log else None)
+            log = new_log(student, rfid_uid, action, device_id, zone, timestamp)
+
+            session.add(log)
+            if action == 'EXIT' and not out_of_order:
+                # Close the visit opened by the matching ENTRY
+                await session.flush()
+                session.add(visits.build_visit(latest_log, log))
+            await session.commit()
+
+        await in_thread(self._after_commit, student, log, timestamp is not None, out_of_order)
+        return scan_result(student, log)
+
+    def _after_commit(self, student, log, backfilled, out_of_order):
+        # Rebuilding visits for an out-of-order backfill goes through the Flask-SQLAlchemy session
+        with self.app.app_context():
+            after_commit(student, log, backfilled=backfilled, out_of_order=out_of_order)
+
+    async def ping(self):
+        async with self.engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+
+    async def close(self):
+        await self.engine.dispose()
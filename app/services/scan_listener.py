@@ -0,0 +1,151 @@
+"""
+UDP / TCP listener for the compact binary scan protocol (see app/services/wire.py).
+
+Every decoded frame goes through the same handle_scan() as /api/scan, so
+toggling, auto-registration, dedupe and occupancy behave identically.
+Frames carry their tap time: one older than SCAN_WIRE_LIVE_WINDOW is a scan
+drained from the reader's offline queue and keeps that time, like a backfilled
+/api/scan; anything newer (or ahead of the server clock) is a live tap.
+
+DEVICE_AUTH applies as on /api/scan: under 'require' only signed frames whose
+MAC checks out against an unrevoked device key are recorded ('warn' logs the
+rest), and only for the device ids the key was issued for. Each key (else each
+source address) is held to the 'critical' admission rate, like HTTP gates.
+"""
+import math
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+
+from app.services import wire
+from app.services.admission import admission
+from app.services.auth import device_keys
+from app.services.scan import handle_scan
+
+
+def frame_timestamp(app, timestamp):
+    """Tap time (naive UTC) of a queued frame, or None for a live tap"""
+    if timestamp <= 0 or time.time() - timestamp <= app.config['SCAN_WIRE_LIVE_WINDOW']:
+        return None
+    return datetime.utcfromtimestamp(timestamp)
+
+
+def process_frame(app, frame, source=''):
+    """Decode a SCAN frame from address source, record it and return the ACK frame (None if undecodable)"""
+    try:
+        scan = wire.decode_scan(frame)
+    except wire.WireError as e:
+        print(f"⚠️  Dropped malformed scan frame: {e}")
+        return None
+
+    rfid_uid = scan['rfid_uid'].upper().strip()
+    if not rfid_uid:
+        return wire.encode_ack(scan['seq'], wire.STATUS_ERROR, message='RFID UID required')
+
+    device_id = scan['device_id'] or 'GATE_01'
+    key_name = None
+    if device_keys.mode != 'off':
+        key_name = device_keys.verify_frame(scan['key_id'], scan['signed'], scan['mac'])
+        if key_name is None:
+            if device_keys.mode == 'require':
+                return wire.encode_ack(scan['seq'], wire.STATUS_ERROR, message='Valid device token required')
+            print(f"⚠️ Scan frame from {device_id} without a valid device token")
+        error = device_keys.device_error(key_name, device_id, source)
+        if error:
+            return wire.encode_ack(scan['seq'], wire.STATUS_ERROR, message=error)
+    if admission.enabled:
+        # Bucket per verified key as for HTTP scans; the frame's own device_id is the sender's to choose
+        wait = admission.check_rate('critical', f'device:{key_name}' if key_name else f'ip:{source}')
+        if wait:
+            return wire.encode_ack(scan['seq'], wire.STATUS_ERROR,
+                                   message=f'Rate limit exceeded, retry in {max(1, math.ceil(wait))}s')
+
+    try:
+        with app.app_context():
+            result = handle_scan(
+                rfid_uid,
+                device_id,
+                scan['zone'] or 'Library',
+                client_seq=scan['seq'],
+                timestamp=frame_timestamp(app, scan['timestamp'])
+            )
+    except Exception as e:
+        print(f"❌ Scan listener error: {e}")
+        return wire.encode_ack(scan['seq'], wire.STATUS_ERROR, message='server error')
+
+    status = wire.STATUS_DUPLICATE if result.get('duplicate') else wire.STATUS_OK
+    return wire.encode_ack(scan['seq'], status, result['action'], result['student']['name'])
+
+
+class _UDPHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        frame, sock = self.request
+        ack = process_frame(self.server.app, frame, self.client_address[0])
+        if ack is not None:
+            sock.sendto(ack, self.client_address)
+
+
+class _TCPHandler(socketserver.BaseRequestHandler):
+    """Persistent stream: length-prefixed frames in, length-prefixed ACKs out"""
+
+    def _recv_exactly(self, n):
+        data = b''
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                return b''
+            data += chunk
+        return data
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                frame = wire.read_stream_frame(self._recv_exactly)
+            except OSError:
+                return
+            if not frame:
+                return
+            ack = process_frame(self.server.app, frame, self.client_address[0])
+            if ack is not None:
+                self.request.sendall(wire.frame_stream(ack))
+
+
+class _UDPServer(socketserver.ThreadingUDPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ScanListener:
+    def __init__(self, app, host=None, udp_port=None, tcp_port=None):
+        host = host or app.config['SCAN_LISTENER_HOST']
+        udp_port = app.config['SCAN_UDP_PORT'] if udp_port is None else udp_port
+        tcp_port = app.config['SCAN_TCP_PORT'] if tcp_port is None else tcp_port
+        self.servers = []
+        if udp_port is not None:
+            self.servers.append(_UDPServer((host, udp_port), _UDPHandler))
+        if tcp_port is not None:
+            self.servers.append(_TCPServer((host, tcp_port), _TCPHandler))
+        for server in self.servers:
+            server.app = app
+
+    @property
+    def addresses(self):
+        return [server.server_address for server in self.servers]
+
+    def start(self):
+        """Serve in background threads"""
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def shutdown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
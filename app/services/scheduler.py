@@ -0,0 +1,300 @@
+"""
+In-process scheduler for periodic maintenance jobs.
+
+Every web worker runs one scheduler thread. Jobs come in two scopes:
+
+- 'cluster' jobs (overdue sweep, compaction, ANALYZE) run in one worker at a
+  time. Their schedule lives in job_leases: a worker may start the job only by
+  winning a conditional UPDATE on a row whose lease has expired and whose
+  next_run_at has passed, so concurrent workers can't both run it and a job
+  runs once per interval across the whole deployment.
+- 'process' jobs (occupancy reconcile, cache warming) maintain per-process
+  in-memory state and run in every worker.
+
+Each run executes on its own thread and is recorded in job_runs. A run that
+outlives its timeout is marked 'timeout' right away; Python can't kill the
+thread, so the job keeps its lease (and won't start again in this process)
+until it actually returns. Leases last twice the timeout, so a worker that
+dies mid-run only blocks its jobs until then.
+
+Jobs receive a deadline (time.monotonic() value) and should stop at a batch
+boundary once it has passed. Jobs with a window only start between those UTC
+hours.
+"""
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+
+def parse_window(value):
+    """'2-5' -> (2, 5): UTC hours [start, end); empty -> None"""
+    if not value:
+        return None
+    start, _, end = str(value).partition('-')
+    window = (int(start), int(end))
+    if not all(0 <= hour <= 24 for hour in window) or window[0] == window[1]:
+        raise ValueError(f'Invalid window {value!r}, expected e.g. "2-5"')
+    return window
+
+
+def in_window(window, now):
+    if window is None:
+        return True
+    start, end = window
+    if start < end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end  # Wraps past midnight, e.g. 22-4
+
+
+def next_window_start(window, now):
+    start = now.replace(hour=window[0] % 24, minute=0, second=0, microsecond=0)
+    return start if start > now else start + timedelta(days=1)
+
+
+class Job:
+    def __init__(self, name, func, interval, jitter=0, timeout=300, scope='cluster', window=None, start_delay=0):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.scope = scope
+        self.window = window
+        self.start_delay = start_delay
+        self.next_run_at = None    # Local view; the lease row is authoritative for cluster jobs
+        self.running = False
+
+    def spread(self):
+        return timedelta(seconds=random.uniform(0, self.jitter)) if self.jitter else timedelta()
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'description': (self.func.__doc__ or '').strip().splitlines()[0] if self.func.__doc__ else None,
+            'scope': self.scope,
+            'interval_seconds': self.interval,
+            'jitter_seconds': self.jitter,
+            'timeout_seconds': self.timeout,
+            'window_utc': f'{self.window[0]}-{self.window[1]}' if self.window else None,
+            'running_here': self.running
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs = {}
+        self.app = None
+        self.tick = 5
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self._thread = None
+
+    def add(self, name, func, interval, **options):
+        """Register func(deadline) -> summary dict; interval <= 0 leaves the job disabled"""
+        if interval and interval > 0:
+            self.jobs[name] = Job(name, func, interval, **options)
+
+    def init_app(self, app):
+        self.app = app
+        self.tick = app.config['SCHEDULER_TICK_SECONDS']
+        if not app.config.get('BACKGROUND_SERVICES', True) or self._thread is not None:
+            return
+        now = datetime.utcnow()
+        for job in self.jobs.values():
+            job.next_run_at = now + timedelta(seconds=job.start_delay) + job.spread()
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        print(f"⏱️  Scheduler started ({len(self.jobs)} jobs)")
+
+    # ---------- Leases ----------
+    def _acquire(self, job, now):
+        """Take the job's lease if it is free and due; False (and a local retry time) otherwise"""
+        from app import db
+        from app.models import JobLease
+
+        result = db.session.execute(
+            update(JobLease)
+            .where(JobLease.name == job.name, JobLease.expires_at <= now, JobLease.next_run_at <= now)
+            .values(owner=self.owner, acquired_at=now, expires_at=now + timedelta(seconds=2 * job.timeout))
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return True
+
+        lease = db.session.get(JobLease, job.name)
+        if lease is None:
+            # First sighting of this job anywhere: create its schedule, due after a jittered delay
+            try:
+                db.session.add(JobLease(name=job.name, expires_at=now, next_run_at=now + job.spread()))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+            job.next_run_at = now + timedelta(seconds=self.tick)
+        else:
+            # Another worker holds it or ran it recently: check back when it's due again
+            job.next_run_at = max(lease.next_run_at, lease.expires_at if lease.owner else now) + job.spread()
+        return False
+
+    def _release(self, job, finished_at):
+        from app import db
+        from app.models import JobLease
+
+        db.session.execute(
+            update(JobLease)
+            .where(JobLease.name == job.name, JobLease.owner == self.owner)
+            .values(owner=None, expires_at=finished_at,
+                    next_run_at=finished_at + timedelta(seconds=job.interval) + job.spread())
+        )
+        db.session.commit()
+
+    # ---------- Running ----------
+    def _loop(self):
+        while True:
+            time.sleep(self.tick)
+            try:
+                with self.app.app_context():
+                    self.run_pending()
+            except Exception as e:
+                print(f"⚠️  Scheduler tick failed: {e}")
+
+    def run_pending(self):
+        """Start every due job this worker may run; returns the names started"""
+        now = datetime.utcnow()
+        started = []
+        for job in list(self.jobs.values()):
+            if job.running or (job.next_run_at and job.next_run_at > now):
+                continue
+            if not in_window(job.window, now):
+                job.next_run_at = next_window_start(job.window, now) + job.spread()
+                continue
+            if job.scope == 'cluster' and not self._acquire(job, now):
+                continue
+            if job.scope == 'process':
+                job.next_run_at = now + timedelta(seconds=job.interval) + job.spread()
+            job.running = True
+            threading.Thread(target=self._execute, args=(job,), daemon=True).start()
+            started.append(job.name)
+        return started
+
+    def _execute(self, job):
+        """Run one job on a worker thread, wait up to its timeout and record the outcome"""
+        from app import db
+        from app.models import JobRun
+
+        outcome = {}
+        done = threading.Event()
+
+        def work():
+            with self.app.app_context():
+                try:
+                    outcome['result'] = job.func(time.monotonic() + job.timeout)
+                except Exception as e:
+                    db.session.rollback()
+                    outcome['error'] = f'{type(e).__name__}: {e}'
+                    traceback.print_exc()
+                finally:
+                    done.set()
+                    if job.scope == 'cluster':
+                        try:
+                            self._release(job, datetime.utcnow())
+                        except Exception as e:
+                            print(f"⚠️  Could not release lease for {job.name}: {e}")
+                    job.running = False
+
+        with self.app.app_context():
+            run = JobRun(job=job.name, owner=self.owner, started_at=datetime.utcnow(), status='running')
+            db.session.add(run)
+            db.session.commit()
+            started = time.perf_counter()
+
+            threading.Thread(target=work, daemon=True, name=f'job-{job.name}').start()
+            finished = done.wait(job.timeout)
+
+            run.finished_at = datetime.utcnow()
+            run.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            if not finished:
+                run.status = 'timeout'
+                run.error = f'Still running after {job.timeout}s'
+                print(f"⚠️  Job {job.name} exceeded its {job.timeout}s timeout")
+            elif 'error' in outcome:
+                run.status = 'failed'
+                run.error = outcome['error']
+                print(f"⚠️  Job {job.name} failed: {run.error}")
+            else:
+                run.status = 'success'
+                run.result = outcome.get('result')
+            db.session.commit()
+
+    def trigger(self, name):
+        """Make a job due now (cluster jobs: on whichever worker ticks first). KeyError if unknown."""
+        from app import db
+        from app.models import JobLease
+
+        job = self.jobs[name]
+        now = datetime.utcnow()
+        job.next_run_at = now
+        if job.scope == 'cluster':
+            db.session.execute(update(JobLease).where(JobLease.name == name).values(next_run_at=now))
+            db.session.commit()
+
+    # ---------- Status ----------
+    def status(self):
+        """Registered jobs with their last run and schedule, for the admin view"""
+        from app import db
+        from app.models import JobLease, JobRun
+
+        leases = {lease.name: lease for lease in JobLease.query}
+        now = datetime.utcnow()
+        results = []
+        for job in self.jobs.values():
+            data = job.to_dict()
+            last = JobRun.query.filter_by(job=job.name).order_by(JobRun.started_at.desc(), JobRun.id.desc()).first()
+            last_success = db.session.query(db.func.max(JobRun.finished_at)).filter(
+                JobRun.job == job.name, JobRun.status == 'success'
+            ).scalar()
+            lease = leases.get(job.name)
+            next_run_at = lease.next_run_at if job.scope == 'cluster' and lease else job.next_run_at
+            data.update({
+                'last_run': last.to_dict() if last else None,
+                'last_success_at': last_success.isoformat() + 'Z' if last_success else None,
+                'next_run_at': next_run_at.isoformat() + 'Z' if next_run_at else None,
+                'lease_owner': lease.owner if lease and lease.is_held(now) else None
+            })
+            results.append(data)
+        return results
+
+    def history(self, name, limit=50):
+        from app.models import JobRun
+        runs = JobRun.query.filter_by(job=name).order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit)
+        return [run.to_dict() for run in runs]
+
+    def prune_history(self, before, batch_size=5000, deadline=None):
+        """Delete runs started before `before` in batches; mark runs stuck in 'running' as abandoned"""
+        from app import db
+        from app.models import JobRun
+
+        db.session.execute(
+            update(JobRun)
+            .where(JobRun.status == 'running', JobRun.started_at < datetime.utcnow() - timedelta(days=1))
+            .values(status='abandoned')
+        )
+        db.session.commit()
+        deleted = 0
+        while deadline is None or time.monotonic() < deadline:
+            ids = [row[0] for row in db.session.query(JobRun.id).filter(JobRun.started_at < before).limit(batch_size)]
+            if not ids:
+                break
+            JobRun.query.filter(JobRun.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+        return deleted
+
+
+scheduler = Scheduler()
@@ -0,0 +1,38 @@
+"""
+Additive upserts for counter/rollup tables: INSERT ... ON CONFLICT DO UPDATE
+SET col = col + n on SQLite and Postgres, so concurrent writers never lose an
+increment. Other databases fall back to UPDATE, then INSERT if no row matched.
+"""
+from sqlalchemy import update
+
+from app import db
+
+
+def _dialect_insert(name):
+    """The dialect's insert() with on_conflict_do_update, imported on first use (the PostgreSQL dialect is slow to import)"""
+    if name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    return None
+
+
+def bump(model, keys, assign=None, **deltas):
+    """Add deltas to the row for keys (creating it), and set the assign columns"""
+    assign = assign or {}
+    insert = _dialect_insert(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(model).values(**keys, **deltas, **assign)
+        values = {name: getattr(model, name) + stmt.excluded[name] for name in deltas}
+        values.update({name: stmt.excluded[name] for name in assign})
+        db.session.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=values))
+        return
+
+    conditions = [getattr(model, name) == value for name, value in keys.items()]
+    values = {name: getattr(model, name) + delta for name, delta in deltas.items()}
+    result = db.session.execute(update(model).where(*conditions).values(**values, **assign))
+    if result.rowcount == 0:
+        db.session.add(model(**keys, **deltas, **assign))
+        db.session.flush()
@@ -0,0 +1,180 @@
+"""
+Visit sessions (paired ENTRY/EXIT per student and zone) and dwell-time analytics.
+
+Sessions are written incrementally by scan_rfid when an EXIT is recorded.
+rebuild_partition() re-derives them from attendance_logs for a student id range
+and is driven in parallel by rebuild_visits.py; rebuild_students() does the same
+for the students touched by a bulk attendance correction. Both work
+STUDENT_CHUNK students at a time: read their logs, then replace their sessions
+in one transaction, so no cursor stays open across a commit (PostgreSQL closes
+it) and dwell reports never read a half-emptied table.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+
+from app import db
+from app.models import AttendanceLog, Student, VisitSession
+
+INSERT_BATCH = 5000
+STUDENT_CHUNK = 200  # Students re-derived per transaction
+
+
+def build_visit(entry_log, exit_log):
+    """The visit closed by exit_log, not yet added to a session"""
+    duration = int((exit_log.timestamp - entry_log.timestamp).total_seconds())
+    return VisitSession(
+        student_id=exit_log.student_id,
+        zone=exit_log.zone,
+        entered_at=entry_log.timestamp,
+        exited_at=exit_log.timestamp,
+        duration_seconds=max(0, duration),
+        entry_log_id=entry_log.id,
+        exit_log_id=exit_log.id
+    )
+
+
+def record_visit(entry_log, exit_log):
+    """Materialize the visit closed by exit_log (caller commits)"""
+    visit = build_visit(entry_log, exit_log)
+    db.session.add(visit)
+    return visit
+
+
+def pair_visits(rows):
+    """
+    Pair log rows ordered by (student_id, zone, timestamp, id) into visit dicts.
+    Mirrors scan_rfid toggling: an EXIT closes the latest open ENTRY in that zone.
+    """
+    open_entries = {}
+    for log_id, student_id, zone, action, timestamp in rows:
+        key = (student_id, zone)
+        if action == 'ENTRY':
+            open_entries[key] = (log_id, timestamp)
+        elif key in open_entries:
+            entry_id, entered_at = open_entries.pop(key)
+            yield {
+                'student_id': student_id,
+                'zone': zone,
+                'entered_at': entered_at,
+                'exited_at': timestamp,
+                'duration_seconds': max(0, int((timestamp - entered_at).total_seconds())),
+                'entry_log_id': entry_id,
+                'exit_log_id': log_id
+            }
+
+
+def _insert_new(visits):
+    # Skip visits that scan_rfid wrote live while the rebuild was running
+    existing = set()
+    for start in range(0, len(visits), INSERT_BATCH):
+        existing.update(db.session.scalars(
+            select(VisitSession.exit_log_id).where(
+                VisitSession.exit_log_id.in_([v['exit_log_id'] for v in visits[start:start + INSERT_BATCH]])
+            )
+        ))
+    fresh = [v for v in visits if v['exit_log_id'] not in existing]
+    for start in range(0, len(fresh), INSERT_BATCH):
+        db.session.execute(VisitSession.__table__.insert(), fresh[start:start + INSERT_BATCH])
+    return len(fresh)
+
+
+def _rebuild(student_ids):
+    """
+    Re-derive visit sessions for a chunk of students in one transaction; returns rows written.
+    Readers see the old sessions until the commit, never an empty table.
+    """
+    rows = db.session.execute(
+        select(AttendanceLog.id, AttendanceLog.student_id, AttendanceLog.zone,
+               AttendanceLog.action, AttendanceLog.timestamp)
+        .where(AttendanceLog.student_id.in_(student_ids))
+        .order_by(AttendanceLog.student_id, AttendanceLog.zone,
+                  AttendanceLog.timestamp, AttendanceLog.id)
+    ).all()
+    visits = list(pair_visits(rows))
+    last_log_id = max((row[0] for row in rows), default=0)
+    # Sessions closed by logs newer than what was read were written live; keep them
+    db.session.execute(delete(VisitSession).where(
+        VisitSession.student_id.in_(student_ids),
+        (VisitSession.exit_log_id <= last_log_id) | VisitSession.exit_log_id.is_(None)
+    ))
+    written = _insert_new(visits)
+    db.session.commit()
+    return written
+
+
+def rebuild_partition(lo, hi):
+    """Re-derive visit sessions for students with lo <= id <= hi; returns rows written"""
+    written = 0
+    after_id = lo - 1
+    while True:
+        student_ids = db.session.scalars(
+            select(Student.id).where(Student.id > after_id, Student.id <= hi)
+            .order_by(Student.id).limit(STUDENT_CHUNK)
+        ).all()
+        if not student_ids:
+            return written
+        written += _rebuild(student_ids)
+        after_id = student_ids[-1]
+
+
+def rebuild_students(student_ids, chunk_size=STUDENT_CHUNK):
+    """Re-derive visit sessions for a set of students (after log corrections); returns rows written"""
+    student_ids = sorted(set(student_ids))
+    written = 0
+    for start in range(0, len(student_ids), chunk_size):
+        written += _rebuild(student_ids[start:start + chunk_size])
+    return written
+
+
+def dwell_time(group_by, start=None, end=None, zone=None, student_id=None):
+    """Aggregate visit count and time spent, grouped by 'student', 'zone' or 'day'"""
+    total = func.sum(VisitSession.duration_seconds)
+    visits = func.count(VisitSession.id)
+
+    if group_by == 'student':
+        keys = (VisitSession.student_id, Student.name, Student.roll_number)
+    elif group_by == 'zone':
+        keys = (VisitSession.zone,)
+    elif group_by == 'day':
+        keys = (func.date(VisitSession.entered_at).label('day'),)
+    else:
+        raise ValueError("group_by must be 'student', 'zone' or 'day'")
+
+    query = select(*keys, visits, total)
+    if group_by == 'student':
+        query = query.join(Student, Student.id == VisitSession.student_id)
+    if start:
+        query = query.where(VisitSession.entered_at >= start)
+    if end:
+        query = query.where(VisitSession.entered_at < end + timedelta(days=1))
+    if zone:
+        query = query.where(VisitSession.zone == zone)
+    if student_id:
+        query = query.where(VisitSession.student_id == student_id)
+    query = query.group_by(*keys).order_by(total.desc())
+
+    results = []
+    for row in db.session.execute(query):
+        *key_values, count, seconds = row
+        seconds = int(seconds or 0)
+        item = {
+            'visits': count,
+            'total_seconds': seconds,
+            'total_hours': round(seconds / 3600, 2),
+            'avg_seconds': seconds // count if count else 0
+        }
+        if group_by == 'student':
+            item.update(student_id=key_values[0], name=key_values[1], roll_number=key_values[2])
+        elif group_by == 'zone':
+            item['zone'] = key_values[0]
+        else:
+            day = key_values[0]
+            item['day'] = day.isoformat() if hasattr(day, 'isoformat') else day
+        results.append(item)
+    return results
+
+
+def parse_day(value):
+    """Parse YYYY-MM-DD query args; None if missing"""
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
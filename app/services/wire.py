@@ -0,0 +1,27 @@
+"""
+Compact binary scan protocol for gate devices (UDP datagrams or a TCP stream).
+
+The one implementation is raspberry_pi/wire.py, which the Pi ships on its own
+(without the server code). It is loaded here by path, so the listener always
+decodes exactly what the readers encode; see that file for the frame layout.
+"""
+import importlib.util
+import os
+
+_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                     'raspberry_pi', 'wire.py')
+_spec = importlib.util.spec_from_file_location('gate_wire', _PATH)
+_wire = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_wire)
+
+WireError = _wire.WireError
+STATUS_OK = _wire.STATUS_OK
+STATUS_DUPLICATE = _wire.STATUS_DUPLICATE
+STATUS_ERROR = _wire.STATUS_ERROR
+encode_scan = _wire.encode_scan
+decode_scan = _wire.decode_scan
+frame_mac = _wire.frame_mac
+encode_ack = _wire.encode_ack
+decode_ack = _wire.decode_ack
+frame_stream = _wire.frame_stream
+read_stream_frame = _wire.read_stream_frame
@@ -0,0 +1,80 @@
+// ========================================
+// Kiosk polling helpers (shared by the zone, station, home and register pages)
+// ========================================
+
+// Call onScan(log) once for every new scan, if it happened within `freshness` ms.
+// Returns a poller with stop()/start(); restarting doesn't replay a scan already handled.
+function pollLatestScan(onScan, { interval = 1000, freshness = 5000 } = {}) {
+    let lastProcessedTime = null;
+    let timer = null;
+
+    async function check() {
+        try {
+            const response = await API.get('/attendance?per_page=1');
+            if (!response || !response.success || response.logs.length === 0) return;
+
+            const latest = response.logs[0];
+            const logTime = new Date(latest.timestamp).getTime();
+            if (Date.now() - logTime < freshness && (!lastProcessedTime || logTime > lastProcessedTime)) {
+                lastProcessedTime = logTime;
+                await onScan(latest);
+            }
+        } catch (e) {
+            console.error("Polling error", e);
+        }
+    }
+
+    const poller = {
+        start() {
+            if (!timer) timer = setInterval(check, interval);
+            return poller;
+        },
+        stop() {
+            clearInterval(timer);
+            timer = null;
+        }
+    };
+    return poller.start();
+}
+
+// Zone kiosks: new cards go to registration, entries are assigned to this zone
+// and handed to onEntry(log, student), exits return to the home page
+function watchZoneScans(zone, onEntry) {
+    return pollLatestScan(async latest => {
+        if (latest.action !== 'ENTRY') {
+            showToast('Goodbye!', 'Checking out...', 'info');
+            setTimeout(() => window.location.href = '/', 1000);
+            return;
+        }
+
+        const student = {
+            id: latest.student_id, name: latest.student_name,
+            roll_number: latest.roll_number, rfid_uid: latest.rfid_uid, logId: latest.id
+        };
+        if (latest.student_name && latest.student_name.startsWith('New Student')) {
+            sessionStorage.setItem('currentStudent', JSON.stringify(student));
+            sessionStorage.setItem('currentZone', zone);
+            showToast('New Card Detected', 'Please register your details', 'info');
+            setTimeout(() => window.location.href = '/register', 1000);
+            return;
+        }
+
+        await API.put(`/attendance/${latest.id}/zone`, { zone: zone });
+        sessionStorage.setItem('currentStudent', JSON.stringify(student));
+        sessionStorage.setItem('currentZone', zone);
+        updateSidebarVisibility();
+        onEntry(latest, student);
+    });
+}
+
+// Live headcount for a zone, written into elementId every `interval` ms
+function pollZoneOccupancy(zone, elementId, interval = 10000) {
+    async function load() {
+        const data = await API.get('/occupancy');
+        if (data && data.success) {
+            document.getElementById(elementId).textContent = `👥 ${data.zones[zone] || 0} currently inside`;
+        }
+    }
+    load();
+    return setInterval(load, interval);
+}
@@ -0,0 +1,21 @@
+"""
+ASGI server entry point: asyncio scan ingestion plus the full Flask site.
+
+Usage: uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+   or: python asgi.py [--host 0.0.0.0] [--port 8000] [--workers 1]
+"""
+import argparse
+
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Serve the app with asyncio scan ingestion')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run('asgi:app', host=args.host, port=args.port, workers=args.workers)
@@ -0,0 +1,76 @@
+"""
+Online backups without stopping the app: full snapshots and incremental attendance exports.
+
+snapshot copies the whole database into BACKUP_DIR. SQLite is copied with the
+backup API in small steps, so gate scans keep going. PostgreSQL is streamed
+through pg_dump. export writes the attendance logs added since the last
+backup's watermark. The scheduler runs both as the 'backup' and
+'attendance-export' jobs.
+
+Usage: python backup.py snapshot
+       python backup.py export
+       python backup.py list [--kind full|attendance] [--limit 20]
+       python backup.py prune [--keep 7]
+"""
+import argparse
+
+from app import create_app
+from app.services import backup
+from config import MaintenanceConfig
+
+
+def describe(record):
+    size = f"{record.size_bytes / 1e6:.1f} MB" if record.size_bytes is not None else '-'
+    parts = [f"{size} in {record.duration_ms / 1000:.1f}s" if record.duration_ms is not None else size]
+    if record.throughput_mb_s is not None:
+        parts.append(f"{record.throughput_mb_s} MB/s")
+    if record.rows is not None:
+        parts.append(f"{record.rows:,} logs")
+    if record.lock_wait_ms is not None:
+        parts.append(f"lock wait {record.lock_wait_ms:.0f}ms")
+    if record.max_step_ms is not None:
+        parts.append(f"longest step {record.max_step_ms:.0f}ms")
+    if record.restarts:
+        parts.append(f"{record.restarts} restarts")
+    return ', '.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Online database backups and attendance exports')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('snapshot', help='full backup of the database')
+    commands.add_parser('export', help='attendance logs added since the last backup')
+    listing = commands.add_parser('list', help='show backup history')
+    listing.add_argument('--kind', choices=('full', 'attendance'))
+    listing.add_argument('--limit', type=int, default=20)
+    pruning = commands.add_parser('prune', help='delete old snapshots and the exports they supersede')
+    pruning.add_argument('--keep', type=int, help='full snapshots to keep (default BACKUP_KEEP)')
+    args = parser.parse_args()
+
+    app = create_app(MaintenanceConfig)
+    with app.app_context():
+        if args.command == 'snapshot':
+            print("💾 Backing up the database...")
+            record = backup.snapshot()
+            print(f"✅ {record.path}")
+            print(f"   {describe(record)}; attendance watermark {record.watermark}")
+        elif args.command == 'export':
+            print(f"💾 Exporting attendance since log {backup.last_watermark()}...")
+            record = backup.export_attendance()
+            if record is None:
+                print("✅ No new attendance logs")
+            else:
+                print(f"✅ {record.path}")
+                print(f"   {describe(record)}; watermark now {record.watermark}")
+        elif args.command == 'list':
+            for entry in backup.history(args.kind, args.limit):
+                print(f"{entry['id']:>5}  {entry['kind']:<10} {entry['status']:<8} {entry['started_at'][:19]}  "
+                      f"watermark {entry['watermark'] if entry['watermark'] is not None else '-':<9}  "
+                      f"{entry['path'] or entry['error'] or ''}")
+        else:
+            pruned = backup.prune(args.keep)
+            print(f"🧹 Pruned {pruned} backups")
+
+
+if __name__ == '__main__':
+    main()
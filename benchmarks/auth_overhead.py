@@ -0,0 +1,112 @@
+"""
+Authentication cost per request: device tokens on /api/scan and admin sessions.
+
+Migrates a throwaway SQLite DB, issues a device key and creates an admin, then
+measures with the test client:
+  - verifying one X-Device-Token (HMAC + cached key table) on its own
+  - POST /api/scan with DEVICE_AUTH off vs require
+  - an admin request (GET /api/admin/load) resolving current_user from the
+    signed session vs the old user_loader (an Admin SELECT per request)
+Also counts SQL statements per request, to show the checks add none.
+
+Usage: python benchmarks/auth_overhead.py [--requests 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import MaintenanceConfig
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+
+class BenchConfig(MaintenanceConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + DB_PATH
+    ADMISSION_CONTROL = False      # Measure auth, not rate limits
+    SCAN_DEBOUNCE_SECONDS = 0      # Every scan is written
+    DEVICE_AUTH = 'require'
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+
+def timed(requests, func):
+    """(mean µs per call, SQL statements per call)"""
+    func()  # Warm caches
+    statements = counter.count
+    started = time.perf_counter()
+    for i in range(requests):
+        func(i)
+    elapsed = time.perf_counter() - started
+    return elapsed / requests * 1e6, (counter.count - statements) / requests
+
+
+def main():
+    global counter
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    from app import create_app, db, login_manager
+    from app.models import Admin
+    from app.services import auth
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        _, token = auth.device_keys.issue('BENCH_GATE')
+        admin = Admin(username='bench')
+        admin.set_password('bench')
+        db.session.add(admin)
+        db.session.commit()
+        counter = StatementCounter(db.engine)
+
+    n = args.requests
+    print(f"\n{n} requests each (mean per request)")
+    print(f"{'':<44} {'µs':>9} {'SQL/request':>12}")
+
+    us, sql = timed(n * 10, lambda i=0: auth.device_keys.verify(token))
+    print(f"{'verify X-Device-Token':<44} {us:>9.1f} {sql:>12.2f}")
+
+    client = app.test_client()
+    scan = lambda i=0: client.post('/api/scan', json={'rfid_uid': f'CARD{i % 200}', 'device_id': 'BENCH_GATE'},
+                                   headers={'X-Device-Token': token})
+    auth.device_keys.mode = 'off'
+    for i in range(200):
+        scan(i)  # Register the cards first: both runs then only toggle
+    results = {}
+    for mode in ('off', 'require'):
+        auth.device_keys.mode = mode
+        results[mode] = timed(n, scan)
+        print(f"{'POST /api/scan, DEVICE_AUTH=' + mode:<44} {results[mode][0]:>9.1f} {results[mode][1]:>12.2f}")
+    print(f"{'  token check overhead':<44} {results['require'][0] - results['off'][0]:>9.1f} "
+          f"{results['require'][1] - results['off'][1]:>12.2f}")
+
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+    admin_request = lambda i=0: client.get('/api/admin/load')
+    signed = timed(n, admin_request)
+
+    # The old loader: one primary-key SELECT per authenticated request
+    loader = login_manager._user_callback
+    login_manager.user_loader(lambda user_id: db.session.get(Admin, int(user_id)))
+    try:
+        queried = timed(n, admin_request)
+    finally:
+        login_manager.user_loader(loader)
+    print(f"{'GET /api/admin/load, user_loader query':<44} {queried[0]:>9.1f} {queried[1]:>12.2f}")
+    print(f"{'GET /api/admin/load, signed session':<44} {signed[0]:>9.1f} {signed[1]:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Worker cold start: time from process spawn to the first served request.
+
+Migrates a throwaway SQLite DB once and seeds it with a school's worth of
+attendance (--students, --logs over the last 180 days), then --runs times spawns
+a fresh Python process that creates the app and serves it on a local port, and
+polls /api/health until it answers. Reports spawn -> first response, the time
+to a first /api/books page, and the app's own create_app() phase breakdown. For
+reference it also times db.create_all() against the migrated DB, the DDL check
+every worker used to run on boot.
+
+With --background the worker starts its background services like a web worker
+does, and the run also waits for /api/occupancy to stop 'warming'. The seed
+scales with the attendance table, so it must stay off the startup path: the
+script exits 1 when create_app()'s occupancy phase exceeds --occupancy-budget.
+
+Usage: python benchmarks/cold_start.py [--runs 10] [--background] [--students 5000] [--logs 1000000]
+                                       [--occupancy-budget 100]
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+ZONES = ('Library', 'Lab', 'Classroom')
+
+# Runs in the child process: build the app, report its startup phases, serve
+WORKER = """
+import json, sys
+from werkzeug.serving import make_server
+from app import create_app
+from config import Config, MaintenanceConfig
+
+base = Config if sys.argv[2] == '1' else MaintenanceConfig
+app = create_app(type('BenchConfig', (base,), {'STARTUP_REPORT': False}))
+print(json.dumps(app.extensions['startup']), flush=True)
+make_server('127.0.0.1', int(sys.argv[1]), app, threaded=True).serve_forever()
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                response.read()
+                return
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError(f'{url} did not answer within {timeout}s')
+
+
+def wait_warm(url, timeout=120):
+    """Poll /api/occupancy until the counters are seeded"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            if not json.loads(response.read()).get('warming'):
+                return
+        time.sleep(0.02)
+    raise RuntimeError(f'occupancy still warming after {timeout}s')
+
+
+def cold_start(background):
+    port = free_port()
+    env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + DB_PATH, 'PYTHONPATH': ROOT,
+           'ADMISSION_CONTROL': 'false'}  # Polling would hit the per-client rate limits
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', WORKER, str(port), '1' if background else '0'],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        wait_for(f'http://127.0.0.1:{port}/api/health')
+        first_request = time.perf_counter() - started
+        wait_for(f'http://127.0.0.1:{port}/api/books?limit=50')
+        first_page = time.perf_counter() - started
+        occupancy_warm = None
+        if background:
+            wait_warm(f'http://127.0.0.1:{port}/api/occupancy')
+            occupancy_warm = time.perf_counter() - started
+        line = process.stdout.readline()
+        while not line.startswith('{'):  # Skip service banners
+            line = process.stdout.readline()
+        startup = json.loads(line)
+    finally:
+        process.terminate()
+        process.wait()
+    return first_request, first_page, startup, occupancy_warm
+
+
+def seed_attendance(students, logs):
+    """Bulk insert students and attendance straight through sqlite3; the ORM would dominate"""
+    random.seed(7)
+    start = datetime.utcnow() - timedelta(days=180)
+    span = 180 * 86400
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        'INSERT INTO students (id, rfid_uid, name, roll_number, department, is_active, is_inside, created_at) '
+        "VALUES (?, ?, ?, ?, 'CSE', 1, 0, ?)",
+        ((i, f'UID{i:06d}', f'Student {i}', f'R{i:06d}', start) for i in range(1, students + 1))
+    )
+    conn.executemany(
+        'INSERT INTO attendance_logs (student_id, rfid_uid, action, timestamp, device_id, zone) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((student, f'UID{student:06d}', 'ENTRY' if i % 2 == 0 else 'EXIT',
+          (start + timedelta(seconds=random.randrange(span))).strftime('%Y-%m-%d %H:%M:%S.%f'),
+          'GATE_01', random.choice(ZONES))
+         for i, student in enumerate(random.randint(1, students) for _ in range(logs)))
+    )
+    conn.commit()
+    conn.close()
+
+
+def prepare(students, logs):
+    """Migrate the DB and seed it; returns the old create_all() cost in ms"""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + DB_PATH
+    from app import create_app, db
+    from app.models import Book
+    from config import MaintenanceConfig
+
+    app = create_app(MaintenanceConfig)
+    with app.app_context():
+        db.session.add_all([Book(title=f'Book {i}', total_copies=2, available_copies=2) for i in range(200)])
+        db.session.commit()
+        db.engine.dispose()
+        seed_attendance(students, logs)
+        started = time.perf_counter()
+        db.create_all()
+        return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--background', action='store_true',
+                        help='start background services (occupancy seed, scheduler) like a web worker')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--logs', type=int, default=1_000_000)
+    parser.add_argument('--occupancy-budget', type=float, default=100,
+                        help='max median ms of the occupancy phase in create_app() (default: 100)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    create_all_ms = prepare(args.students, args.logs)
+    print(f"Seeded {args.students:,} students and {args.logs:,} attendance logs in "
+          f"{time.perf_counter() - started:.1f}s")
+    results = [cold_start(args.background) for _ in range(args.runs)]
+
+    first_request = [r[0] * 1000 for r in results]
+    first_page = [r[1] * 1000 for r in results]
+    rows = [('spawn -> /api/health', first_request), ('spawn -> /api/books page', first_page)]
+    if args.background:
+        rows.append(('spawn -> occupancy warm', [r[3] * 1000 for r in results]))
+    print(f"\n{'':<26} {'median':>10} {'min':>10} {'max':>10}")
+    for label, values in rows:
+        print(f"{label:<26} {statistics.median(values):>8.0f}ms {min(values):>8.0f}ms {max(values):>8.0f}ms")
+
+    print("\ncreate_app() phases (median ms)")
+    for phase in results[0][2]['phases']:
+        print(f"  {phase:<14} {statistics.median(r[2]['phases'][phase] for r in results):>8.1f}")
+    print(f"  {'total':<14} {statistics.median(r[2]['total_ms'] for r in results):>8.1f}")
+    print(f"\nFor reference, db.create_all() on a fresh connection: {create_all_ms:.1f} ms")
+
+    if not args.background:
+        return  # No occupancy seed without background services
+    occupancy_ms = statistics.median(r[2]['phases'].get('occupancy', 0) for r in results)
+    if occupancy_ms > args.occupancy_budget:
+        print(f"\n❌ occupancy phase {occupancy_ms:.0f} ms, budget {args.occupancy_budget:.0f} ms: "
+              f"seeding is blocking worker start")
+        sys.exit(1)
+    print(f"\n✅ occupancy phase {occupancy_ms:.1f} ms, within {args.occupancy_budget:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
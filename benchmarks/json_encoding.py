@@ -0,0 +1,114 @@
+"""
+JSON encoding and compression for a large list response.
+
+Seeds a throwaway SQLite DB with --rows attendance logs, then compares for the
+same payload (the /api/attendance/today body):
+  - encoding: the old path (stdlib json, datetimes pre-formatted per field) vs
+    the app's JSON provider (orjson with native datetimes, when installed)
+  - bytes on the wire and compression time: identity, gzip, brotli
+  - the full endpoint through the test client for each Accept-Encoding
+
+Usage: python benchmarks/json_encoding.py [--rows 10000] [--repeat 20]
+"""
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import MaintenanceConfig
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+
+class BenchConfig(MaintenanceConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + DB_PATH
+
+
+def seed(rows, students=500):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        'INSERT INTO students (id, rfid_uid, name, roll_number, department, is_active, is_inside, created_at) '
+        'VALUES (?, ?, ?, ?, ?, 1, 0, ?)',
+        ((i, f'UID{i:06d}', f'Student {i}', f'R{i:06d}', 'CSE', today) for i in range(1, students + 1))
+    )
+    conn.executemany(
+        'INSERT INTO attendance_logs (student_id, rfid_uid, action, timestamp, device_id, zone) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((i % students + 1, f'UID{i % students + 1:06d}', 'ENTRY' if i % 2 else 'EXIT',
+          (today + timedelta(microseconds=i * 4321)).strftime('%Y-%m-%d %H:%M:%S.%f'), 'GATE_01', 'Library')
+         for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.models import AttendanceLog
+    from app.services import encoding
+
+    app = create_app(BenchConfig)
+    seed(args.rows)
+
+    with app.app_context():
+        logs = AttendanceLog.query.all()
+        payload = {'success': True, 'logs': [log.to_dict() for log in logs], 'count': len(logs)}
+
+        def old_encode():
+            # Before: every datetime formatted in to_dict(), then the stdlib encoder (sorted keys)
+            rows = [{**row, 'timestamp': row['timestamp'].isoformat() + 'Z'} for row in payload['logs']]
+            return json.dumps({**payload, 'logs': rows}, sort_keys=True, separators=(',', ':')).encode()
+
+        old_ms, old_body = best_of(args.repeat, old_encode)
+        new_ms, new_body = best_of(args.repeat, lambda: app.json.dumps(payload).encode())
+
+    encoder = 'orjson' if encoding.orjson is not None else 'stdlib json (orjson not installed)'
+    print(f"\nEncoding {len(payload['logs']):,} rows, best of {args.repeat}")
+    print(f"  {'stdlib + isoformat':<22} {old_ms:>8.1f} ms  {len(old_body):>10,} bytes")
+    print(f"  {encoder:<22} {new_ms:>8.1f} ms  {len(new_body):>10,} bytes")
+
+    print("\nOn the wire")
+    print(f"  {'identity':<22} {'':>8}     {len(new_body):>10,} bytes")
+    gzip_ms, gz = best_of(args.repeat, lambda: gzip.compress(new_body, compresslevel=app.config['COMPRESS_GZIP_LEVEL']))
+    print(f"  {'gzip':<22} {gzip_ms:>8.1f} ms  {len(gz):>10,} bytes ({len(gz) / len(new_body):.1%})")
+    if encoding.brotli is not None:
+        br_ms, br = best_of(args.repeat, lambda: encoding.brotli.compress(
+            new_body, quality=app.config['COMPRESS_BROTLI_QUALITY']))
+        print(f"  {'brotli':<22} {br_ms:>8.1f} ms  {len(br):>10,} bytes ({len(br) / len(new_body):.1%})")
+    else:
+        print("  brotli                 not installed")
+
+    print("\nGET /api/attendance/today (test client)")
+    client = app.test_client()
+    for accept in ('identity', 'gzip', 'br'):
+        ms, response = best_of(max(3, args.repeat // 4), lambda: client.get(
+            '/api/attendance/today', headers={'Accept-Encoding': accept}))
+        print(f"  {accept:<22} {ms:>8.1f} ms  {len(response.data):>10,} bytes  "
+              f"{response.headers.get('Content-Encoding', 'identity')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""
+Performance regression suite: API latency and SQL statement budgets.
+
+Seeds a throwaway SQLite DB (--students, --logs, --books, --borrows), then
+drives the main API paths through the Flask test client: gate scans,
+dashboard stats, attendance pages, book search, borrow and return, and the
+student listing. Every scenario starts from the freshly seeded database
+(return starts where borrow left off), so one scenario's writes, such as
+today's scans, never change another's counts. For each scenario it records
+the median and p95 wall time and the SQL statements per request, and runs
+EXPLAIN QUERY PLAN on every statement the scenario issued, counting full
+scans of the large tables.
+
+Results are checked against benchmarks/budgets.json and the script exits 1 on
+a regression:
+  - SQL statements per request or full table scans differing from the budget:
+    more is a regression (an N+1 in to_dict, another query loop in a view),
+    fewer means the budget is stale and should be lowered with --update-budgets
+  - median time above the budget times its tolerance; only checked when the
+    dataset matches the one the budgets were recorded with (--no-timing skips
+    it on noisy machines)
+Statement and scan counts don't depend on the machine; times do, so rerun
+with --update-budgets on the reference machine when a slower path is intended.
+
+Usage: python benchmarks/perf_suite.py [--students 2000] [--logs 100000] [--books 2000] [--borrows 500]
+       [--repeat 30] [--explain] [--output results.json] [--no-timing] [--update-budgets]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import MaintenanceConfig
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+SEED_PATH = DB_PATH + '.seed'
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'budgets.json')
+DEPARTMENTS = ['CSE', 'ECE', 'MECH', 'CIVIL', 'EEE', 'IT', 'MBA', 'PHYSICS']
+SUBJECTS = ['Algorithms', 'Circuits', 'Thermodynamics', 'Structures', 'Networks', 'Finance', 'Optics', 'Databases']
+# Tables that grow with the school; a full scan of one of these is worth a budget line
+LARGE_TABLES = ('students', 'attendance_logs', 'books', 'borrow_records', 'visit_sessions')
+DEFAULT_TOLERANCE = 2.0
+
+
+class BenchConfig(MaintenanceConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + DB_PATH
+    ADMISSION_CONTROL = False      # The test client would exceed every rate limit
+    SCAN_DEBOUNCE_SECONDS = 0      # Every scan is written
+
+
+def seed(students, logs, books, borrows, zones):
+    """Bulk insert straight through sqlite3; the ORM would dominate the run time"""
+    random.seed(7)
+    # Four weeks of whole days ending with today, whatever the time now: same rows per day on every run
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=27)
+    span = 28 * 86400
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        'INSERT INTO students (id, rfid_uid, name, roll_number, department, is_active, is_inside, created_at) '
+        'VALUES (?, ?, ?, ?, ?, 1, 0, ?)',
+        ((i, f'UID{i:06d}', f'Student {i}', f'R{i:06d}', DEPARTMENTS[i % len(DEPARTMENTS)], start)
+         for i in range(1, students + 1))
+    )
+
+    def attendance():
+        for i in range(logs):
+            ts = start + timedelta(seconds=random.randrange(span))
+            student = random.randint(1, students)
+            yield (student, f'UID{student:06d}', 'ENTRY' if i % 2 == 0 else 'EXIT',
+                   ts.strftime('%Y-%m-%d %H:%M:%S.%f'), 'GATE_01', random.choice(zones))
+
+    conn.executemany(
+        'INSERT INTO attendance_logs (student_id, rfid_uid, action, timestamp, device_id, zone) '
+        'VALUES (?, ?, ?, ?, ?, ?)', attendance()
+    )
+    conn.executemany(
+        'INSERT INTO books (id, title, author, isbn, total_copies, available_copies, is_important, created_at) '
+        'VALUES (?, ?, ?, ?, 3, 3, ?, ?)',
+        ((i, f'{SUBJECTS[i % len(SUBJECTS)]} Volume {i}', f'Author {i % 300}', f'978{i:010d}', i % 20 == 0, start)
+         for i in range(1, books + 1))
+    )
+
+    def records():
+        for i in range(borrows):
+            borrowed_at = start + timedelta(seconds=random.randrange(span))
+            returned = i % 3 == 0
+            yield (random.randint(1, books // 2), random.randint(1, students), borrowed_at,
+                   borrowed_at + timedelta(days=14), borrowed_at + timedelta(days=7) if returned else None,
+                   'RETURNED' if returned else 'ACTIVE')
+
+    conn.executemany(
+        'INSERT INTO borrow_records (book_id, student_id, borrowed_at, due_date, returned_at, '
+        'extensions_used, fine_amount, fine_paid, status) VALUES (?, ?, ?, ?, ?, 0, 0, 0, ?)', records()
+    )
+    conn.commit()
+    conn.close()
+
+
+class StatementRecorder:
+    """Counts SQL statements while active; keeps (statement, parameters) when recording"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.active = False
+        self.recording = False
+        self.count = 0
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.count += 1
+            if self.recording and not executemany:
+                self.statements.append((statement, parameters))
+
+
+# ---------- Scenarios ----------
+# name -> request(i, state) returning (method, url, json body or None); state carries ids between scenarios
+def scan(i, state):
+    return 'POST', '/api/scan', {'rfid_uid': f'UID{i % state["students"] + 1:06d}', 'device_id': 'GATE_01'}
+
+
+def attendance_date(i, state):
+    return 'GET', f'/api/attendance?date={(datetime.utcnow() - timedelta(days=1)):%Y-%m-%d}', None
+
+
+def borrow(i, state):
+    # Distinct book and student per request, from the upper half of the books no seeded borrow uses
+    book_id, student_id = state['books'] - i, state['students'] - i
+    return 'POST', '/api/borrow', {'book_id': book_id, 'student_id': student_id}
+
+
+def return_book(i, state):
+    return 'PUT', f'/api/borrow/{state["borrow_ids"][i]}/return', None
+
+
+SCENARIOS = {
+    'scan': scan,
+    'dashboard-stats': lambda i, state: ('GET', '/api/dashboard/stats', None),
+    'attendance-page': lambda i, state: ('GET', '/api/attendance?page=1&per_page=50', None),
+    'attendance-deep-page': lambda i, state: ('GET', '/api/attendance?page=200&per_page=50', None),
+    'attendance-date': attendance_date,
+    'attendance-today': lambda i, state: ('GET', '/api/attendance/today', None),
+    'book-search': lambda i, state: ('GET', f'/api/books?search={SUBJECTS[i % len(SUBJECTS)]}&limit=50', None),
+    'book-page': lambda i, state: ('GET', '/api/books?limit=100', None),
+    'borrow': borrow,
+    'return': return_book,
+    'student-list': lambda i, state: ('GET', '/api/students', None),
+}
+
+
+def call(client, request):
+    method, url, body = request
+    return client.open(url, method=method, json=body)
+
+
+def run_scenario(client, recorder, name, repeat, state):
+    """Warm up once, then time `repeat` requests; returns the measurements"""
+    make_request = SCENARIOS[name]
+    if name not in ('borrow', 'return'):
+        call(client, make_request(repeat, state))  # Warm caches; borrow/return ids are single-use
+    times, statements = [], []
+    for i in range(repeat):
+        request = make_request(i, state)
+        recorder.count = 0
+        recorder.recording = i == 0
+        recorder.active = True
+        started = time.perf_counter()
+        response = call(client, request)
+        elapsed = time.perf_counter() - started
+        recorder.active = False
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: {request[0]} {request[1]} returned {response.status_code}: '
+                               f'{response.get_data(as_text=True)[:200]}')
+        if name == 'borrow':
+            state['borrow_ids'].append(response.get_json()['borrow']['id'])
+        times.append(elapsed * 1000)
+        statements.append(recorder.count)
+    recorder.recording = False
+    ordered = sorted(times)
+    return {
+        'p50_ms': round(statistics.median(times), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'queries': max(statements),
+    }
+
+
+def explain(recorded):
+    """EXPLAIN QUERY PLAN for each distinct statement: [{'sql', 'plan', 'full_scans'}]"""
+    from app import db
+
+    plans, seen = [], set()
+    connection = db.session.connection()
+    for statement, parameters in recorded:
+        if statement in seen or not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+            continue
+        seen.add(statement)
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        details = [row[-1] for row in rows]
+        # 'SCAN t' is a full table scan; 'SCAN t USING [COVERING] INDEX' walks an index
+        full_scans = [d for d in details if d.startswith('SCAN ') and 'USING' not in d
+                      and d.split()[1] in LARGE_TABLES]
+        plans.append({'sql': ' '.join(statement.split()), 'plan': details, 'full_scans': len(full_scans)})
+    db.session.rollback()
+    return plans
+
+
+def check(results, budgets, dataset, timing, tolerance):
+    """Budget violations as messages; measured scenarios without a budget are reported too"""
+    failures = []
+    budget_dataset = budgets.get('dataset')
+    timing = timing and budget_dataset == dataset
+    tolerance = tolerance or budgets.get('time_tolerance', DEFAULT_TOLERANCE)
+    for name, result in results.items():
+        budget = budgets.get('scenarios', {}).get(name)
+        if budget is None:
+            failures.append(f'{name}: no budget (run with --update-budgets)')
+            continue
+        # Counts are exact: fewer than budgeted passes silently today and hides the next regression
+        for key, label in (('queries', 'SQL statements per request'), ('full_scans', 'full scans of large tables')):
+            if result[key] > budget[key]:
+                failures.append(f"{name}: {result[key]} {label}, budget {budget[key]}")
+            elif result[key] < budget[key]:
+                failures.append(f"{name}: {result[key]} {label}, below the budget of {budget[key]} "
+                                f"(lower it with --update-budgets)")
+        if timing and result['p50_ms'] > budget['p50_ms'] * tolerance:
+            failures.append(f"{name}: median {result['p50_ms']:.2f}ms, budget {budget['p50_ms']:.2f}ms "
+                            f"x {tolerance}")
+    return failures, timing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--logs', type=int, default=100_000)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--borrows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=30, help='timed requests per scenario')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='run only these (repeatable)')
+    parser.add_argument('--explain', action='store_true', help='print the query plans')
+    parser.add_argument('--output', help='write results and query plans to this JSON file')
+    parser.add_argument('--budgets', default=BUDGETS_PATH)
+    parser.add_argument('--tolerance', type=float, help=f'allowed slowdown factor (default: from budgets, {DEFAULT_TOLERANCE})')
+    parser.add_argument('--no-timing', action='store_true', help='check statement and scan counts only')
+    parser.add_argument('--update-budgets', action='store_true', help='write this run as the new budgets')
+    args = parser.parse_args()
+    if args.repeat > min(args.books, args.students) // 2:
+        parser.error('--repeat must be at most half of --books and --students (borrow uses distinct ids)')
+
+    from app import create_app, db
+
+    app = create_app(BenchConfig)
+    t0 = time.perf_counter()
+    seed(args.students, args.logs, args.books, args.borrows, BenchConfig.ZONES)
+    print(f"Seeded {args.students:,} students, {args.logs:,} logs, {args.books:,} books, "
+          f"{args.borrows:,} borrows in {time.perf_counter() - t0:.1f}s")
+    shutil.copyfile(DB_PATH, SEED_PATH)
+
+    names = args.scenario or list(SCENARIOS)
+    if 'return' in names and 'borrow' not in names:
+        names.insert(names.index('return'), 'borrow')  # Returns need the borrows' ids
+    state = {'students': args.students, 'books': args.books, 'borrow_ids': []}
+    results, plans = {}, {}
+    client = app.test_client()
+    with app.app_context():
+        recorder = StatementRecorder(db.engine)
+        for name in names:
+            if name != 'return':
+                # Back to the seeded data: earlier scenarios' writes (today's scans) would change the counts
+                db.session.remove()
+                db.engine.dispose()
+                shutil.copyfile(SEED_PATH, DB_PATH)
+            # Views print progress lines (borrow, scan); keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run_scenario(client, recorder, name, args.repeat, state)
+            plans[name] = explain(recorder.statements)
+            recorder.statements = []
+            result['full_scans'] = sum(plan['full_scans'] for plan in plans[name])
+            results[name] = result
+
+    dataset = {'students': args.students, 'logs': args.logs, 'books': args.books, 'borrows': args.borrows}
+    budgets = {}
+    if os.path.exists(args.budgets):
+        with open(args.budgets) as f:
+            budgets = json.load(f)
+    budgeted = budgets.get('scenarios', {})
+
+    print(f"\n{args.repeat} requests per scenario")
+    print(f"{'scenario':<22} {'p50 ms':>9} {'p95 ms':>9} {'SQL/req':>8} {'scans':>6}   budget (ms / SQL / scans)")
+    for name, result in results.items():
+        budget = budgeted.get(name)
+        budget_text = f"{budget['p50_ms']:.2f} / {budget['queries']} / {budget['full_scans']}" if budget else '-'
+        print(f"{name:<22} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['queries']:>8} "
+              f"{result['full_scans']:>6}   {budget_text}")
+
+    if args.explain:
+        for name, scenario_plans in plans.items():
+            print(f"\n== {name}")
+            for plan in scenario_plans:
+                print(f"  {plan['sql'][:160]}")
+                for line in plan['plan']:
+                    print(f"    {line}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'dataset': dataset, 'repeat': args.repeat, 'results': results, 'plans': plans}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.update_budgets:
+        budgets = {
+            'dataset': dataset,
+            'time_tolerance': budgets.get('time_tolerance', DEFAULT_TOLERANCE),
+            'recorded_at': datetime.utcnow().strftime('%Y-%m-%d'),
+            'scenarios': {**budgeted, **{name: {'p50_ms': result['p50_ms'], 'queries': result['queries'],
+                                                'full_scans': result['full_scans']}
+                                         for name, result in results.items()}},
+        }
+        with open(args.budgets, 'w') as f:
+            json.dump(budgets, f, indent=2)
+            f.write('\n')
+        print(f"\n✅ Budgets written to {args.budgets}")
+        return
+
+    failures, timed = check(results, budgets, dataset, not args.no_timing, args.tolerance)
+    if not timed and not args.no_timing:
+        print("\n⚠️ Dataset differs from the budgets' (or no budgets): timings not checked")
+    if failures:
+        print(f"\n❌ {len(failures)} performance regression(s):")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Within budgets")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Report latency over a large attendance table: columnar engine vs ORM loops.
+
+Seeds a throwaway SQLite DB with --rows attendance logs spread over a term
+(--weeks), then times each /api/reports report cold (load + compute) and warm
+(cached). --baseline also times the department-weekly report computed the old
+way, by loading AttendanceLog objects and grouping in Python.
+
+Usage: python benchmarks/reports.py [--rows 1000000] [--students 5000] [--weeks 16] [--baseline]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import MaintenanceConfig
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+DEPARTMENTS = ['CSE', 'ECE', 'MECH', 'CIVIL', 'EEE', 'IT', 'MBA', 'PHYSICS']
+
+
+class BenchConfig(MaintenanceConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + DB_PATH
+
+
+def seed(rows, students, weeks, zones):
+    """Bulk insert straight through sqlite3; the ORM would dominate the run time"""
+    random.seed(7)
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(weeks=weeks)
+    span = weeks * 7 * 86400
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        'INSERT INTO students (id, rfid_uid, name, roll_number, department, is_active, is_inside, created_at) '
+        'VALUES (?, ?, ?, ?, ?, 1, 0, ?)',
+        ((i, f'UID{i:06d}', f'Student {i}', f'R{i:06d}', DEPARTMENTS[i % len(DEPARTMENTS)], start)
+         for i in range(1, students + 1))
+    )
+
+    def logs():
+        for i in range(rows):
+            ts = start + timedelta(seconds=random.randrange(span))
+            student = random.randint(1, students)
+            yield (student, f'UID{student:06d}', 'ENTRY' if i % 2 == 0 else 'EXIT',
+                   ts.strftime('%Y-%m-%d %H:%M:%S.%f'), 'GATE_01', random.choice(zones))
+
+    conn.executemany(
+        'INSERT INTO attendance_logs (student_id, rfid_uid, action, timestamp, device_id, zone) '
+        'VALUES (?, ?, ?, ?, ?, ?)', logs()
+    )
+    conn.commit()
+    conn.close()
+    return start
+
+
+def orm_department_weekly(start, end):
+    from app.models import AttendanceLog
+    counts = defaultdict(int)
+    seen = defaultdict(set)
+    logs = AttendanceLog.query.filter(
+        AttendanceLog.timestamp >= start, AttendanceLog.timestamp < end, AttendanceLog.action == 'ENTRY'
+    )
+    for log in logs.yield_per(10000):
+        week = (log.timestamp - timedelta(days=log.timestamp.weekday())).date()
+        key = (log.student.department, week)
+        counts[key] += 1
+        seen[key].add(log.student_id)
+    return len(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--weeks', type=int, default=16)
+    parser.add_argument('--baseline', action='store_true', help='also time the ORM-loop version')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.services.reports import REPORTS, report_cache
+
+    app = create_app(BenchConfig)
+    t0 = time.perf_counter()
+    start = seed(args.rows, args.students, args.weeks, BenchConfig.ZONES)
+    print(f"Seeded {args.rows:,} logs in {time.perf_counter() - t0:.1f}s")
+
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    print(f"\n{'report':<20} {'rows':>12} {'cold':>10} {'warm':>10}")
+    with app.app_context():
+        for name in REPORTS:
+            t0 = time.perf_counter()
+            _, meta = report_cache.run(name, start, end)
+            cold = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            report_cache.run(name, start, end)
+            warm = time.perf_counter() - t0
+            print(f"{name:<20} {meta['rows_scanned']:>12,} {cold:>9.2f}s {warm * 1000:>8.2f}ms")
+
+        if args.baseline:
+            t0 = time.perf_counter()
+            orm_department_weekly(start, end + timedelta(days=1))
+            print(f"{'orm department-week':<20} {'':>12} {time.perf_counter() - t0:>9.2f}s")
+
+
+if __name__ == '__main__':
+    main()
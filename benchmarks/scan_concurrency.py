@@ -0,0 +1,165 @@
+"""
+Scan throughput with many gates at once: sync Flask workers vs the ASGI service.
+
+Migrates a throwaway SQLite DB (or uses --database-url) and seeds one card per
+gate, then for each server starts it on a local port and opens --connections
+concurrent gate connections that each POST --scans scans to /api/scan as fast
+as the server answers (keep-alive where the server allows it). Reports
+throughput, latency percentiles and failed requests.
+
+Servers:
+  sync   gunicorn --workers N run:app (sync workers, the production setup)
+  async  uvicorn --workers N asgi:app (asyncio scan ingestion, app/asgi.py)
+
+Usage: python benchmarks/scan_concurrency.py [--connections 1000] [--scans 5] [--workers 4]
+                                             [--servers sync,async] [--database-url URL]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                response.read()
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'{url} did not answer within {timeout}s')
+
+
+def prepare(database_url, cards):
+    """Migrate and seed one student per gate, so every scan is a plain toggle"""
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app, db
+    from app.models import Student
+    from config import MaintenanceConfig
+
+    app = create_app(MaintenanceConfig)
+    with app.app_context():
+        if database_url.startswith('sqlite'):
+            # WAL lets the readers of one worker run while another writes
+            db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+        existing = {uid for (uid,) in db.session.query(Student.rfid_uid)}
+        db.session.add_all([
+            Student(rfid_uid=f'GATECARD{i:05d}', name=f'Gate Student {i}', roll_number=f'G{i:05d}',
+                    department='CSE', created_at=datetime.utcnow())
+            for i in range(cards) if f'GATECARD{i:05d}' not in existing
+        ])
+        db.session.commit()
+
+
+def start_server(kind, port, workers, env):
+    if kind == 'sync':
+        command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+                   '--backlog', '4096', '--log-level', 'warning', 'run:app']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', '--workers', str(workers), '--port', str(port),
+                   '--backlog', '4096', '--log-level', 'warning', '--no-access-log', 'asgi:app']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for(f'http://127.0.0.1:{port}/api/health')
+    return process
+
+
+async def gate(port, card, scans, latencies, errors):
+    """One gate: POST scans back to back, reconnecting whenever the server closes"""
+    body = json.dumps({'rfid_uid': card, 'device_id': f'DEV-{card}', 'zone': 'Library'}).encode()
+    request = (f'POST /api/scan HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n'
+               f'Content-Length: {len(body)}\r\n\r\n').encode() + body
+    reader = writer = None
+    for _ in range(scans):
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            status, _, headers = head.decode('latin-1').lower().partition('\r\n')
+            if 'content-length:' in headers:
+                await reader.readexactly(int(headers.split('content-length:', 1)[1].split('\r\n', 1)[0]))
+            else:
+                headers += 'connection: close'  # Body runs to EOF; don't reuse
+            if status.split(' ')[1] == '200':
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors.append(f"HTTP {status.split(' ')[1]}")
+            if 'connection: close' in headers:
+                writer.close()
+                reader = writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, connections, scans):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(gate(port, f'GATECARD{i:05d}', scans, latencies, errors) for i in range(connections)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def percentile(values, p):
+    return sorted(values)[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--scans', type=int, default=5, help='scans per gate connection')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--servers', default='sync,async')
+    parser.add_argument('--database-url', default=None, help='default: a throwaway SQLite file')
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    prepare(database_url, args.connections)
+    env = {**os.environ, 'DATABASE_URL': database_url, 'PYTHONPATH': ROOT,
+           'SCAN_DEBOUNCE_SECONDS': '0',  # Every scan must hit the DB
+           'ADMISSION_CONTROL': 'false'}  # Measure the server, not the rate limits
+
+    print(f"\n{args.connections} gates x {args.scans} scans, {args.workers} workers per server")
+    print(f"{'server':<8} {'scans/s':>9} {'ok':>7} {'failed':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for kind in args.servers.split(','):
+        port = free_port()
+        process = start_server(kind, port, args.workers, env)
+        try:
+            elapsed, latencies, errors = asyncio.run(load(port, args.connections, args.scans))
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{kind:<8} {len(latencies) / elapsed:>9.0f} {len(latencies):>7} {len(errors):>7} "
+              f"{percentile(latencies, 0.5) * 1000:>7.0f}ms {percentile(latencies, 0.95) * 1000:>7.0f}ms "
+              f"{percentile(latencies, 0.99) * 1000:>7.0f}ms")
+        if errors:
+            print(f"         failures: {dict((e, errors.count(e)) for e in sorted(set(errors)))}")
+        if latencies:
+            print(f"         mean {statistics.mean(latencies) * 1000:.0f}ms over {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Per-scan bytes and latency: JSON over HTTP vs the compact UDP/TCP protocol.
+
+Starts the web app and the scan listener in-process on a throwaway SQLite DB,
+then sends the same scans over each transport. Bytes are application payload
+(HTTP request/response incl. headers, or binary frames), excluding TCP/IP headers;
+'http-new' also pays a TCP handshake per scan, like the Pi's requests.post().
+
+The in-process dev server can't keep connections alive; pass --keepalive-server
+host:port (e.g. gunicorn run.py's app) to also measure a reused HTTP connection.
+
+Usage: python benchmarks/scan_transport.py [--scans 500] [--cards 50] [--keepalive-server 127.0.0.1:8000]
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'raspberry_pi'))  # transport.py / wire.py (Pi side)
+
+from werkzeug.serving import make_server
+
+from config import MaintenanceConfig
+
+
+class BenchConfig(MaintenanceConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    SCAN_DEBOUNCE_SECONDS = 0  # every scan must hit the DB
+    ADMISSION_CONTROL = False  # measure the transport, not the rate limits
+
+
+class HttpClient:
+    """Raw-socket HTTP/1.1 client sending the headers python-requests would send"""
+
+    def __init__(self, host, port, keepalive):
+        self.host, self.port, self.keepalive = host, port, keepalive
+        self.sock = None
+        self.sent = self.received = 0
+
+    def _request_bytes(self, body):
+        headers = [
+            'POST /api/scan HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'User-Agent: python-requests/2.31.0',
+            'Accept-Encoding: gzip, deflate',
+            'Accept: */*',
+            f"Connection: {'keep-alive' if self.keepalive else 'close'}",
+            f'Content-Length: {len(body)}',
+            'Content-Type: application/json',
+        ]
+        return ('\r\n'.join(headers) + '\r\n\r\n').encode() + body
+
+    def _read_response(self):
+        buf = b''
+        while b'\r\n\r\n' not in buf:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError('closed')
+            buf += chunk
+        head, _, rest = buf.partition(b'\r\n\r\n')
+        length = 0
+        for line in head.split(b'\r\n')[1:]:
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                length = int(value)
+        while len(rest) < length:
+            rest += self.sock.recv(65536)
+        self.received += len(head) + 4 + length
+        return json.loads(rest[:length])
+
+    def send(self, seq, timestamp, rfid_uid, device_id, zone=''):
+        body = json.dumps({'rfid_uid': rfid_uid, 'device_id': device_id, 'client_seq': seq}).encode()
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port))
+        request = self._request_bytes(body)
+        self.sock.sendall(request)
+        self.sent += len(request)
+        result = self._read_response()
+        if not self.keepalive:
+            self.sock.close()
+            self.sock = None
+        return result
+
+
+class CountingSocket:
+    """Wraps a socket to count payload bytes for the binary clients"""
+
+    def __init__(self, sock, counter):
+        self._sock, self._counter = sock, counter
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def sendto(self, data, address):
+        self._counter['sent'] += len(data)
+        return self._sock.sendto(data, address)
+
+    def sendall(self, data):
+        self._counter['sent'] += len(data)
+        return self._sock.sendall(data)
+
+    def recvfrom(self, n):
+        data, address = self._sock.recvfrom(n)
+        self._counter['received'] += len(data)
+        return data, address
+
+    def recv(self, n):
+        data = self._sock.recv(n)
+        self._counter['received'] += len(data)
+        return data
+
+
+def run(name, client, scans, cards, counter):
+    latencies = []
+    for i in range(scans):
+        uid = f'BENCH{i % cards:04d}'
+        started = time.perf_counter()
+        result = client.send(time.time_ns() + i, time.time(), uid, 'BENCH_GATE')
+        latencies.append((time.perf_counter() - started) * 1000)
+        if not result or not result.get('success'):
+            raise SystemExit(f'{name}: scan failed: {result}')
+    sent, received = counter()
+    latencies.sort()
+    print(f"{name:<15} {statistics.median(latencies):8.2f} {latencies[int(len(latencies) * 0.95) - 1]:8.2f} "
+          f"{sent / scans:10.1f} {received / scans:10.1f} {(sent + received) / scans:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare scan transports')
+    parser.add_argument('--scans', type=int, default=500)
+    parser.add_argument('--cards', type=int, default=50)
+    parser.add_argument('--keepalive-server', default=None,
+                        help='host:port of a keep-alive capable server (gunicorn) for http-keepalive')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.services.scan_listener import ScanListener
+    import transport
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app = create_app(BenchConfig)
+    http = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    listener = ScanListener(app, '127.0.0.1', udp_port=0, tcp_port=0)
+    listener.start()
+    (_, udp_port), (_, tcp_port) = listener.addresses
+
+    # Warm up: auto-register every card once so all transports measure plain toggles
+    warm = HttpClient('127.0.0.1', http.server_port, keepalive=False)
+    for i in range(args.cards):
+        warm.send(i, 0, f'BENCH{i:04d}', 'WARMUP')
+
+    print(f"{'transport':<15} {'p50 ms':>8} {'p95 ms':>8} {'B sent':>10} {'B recv':>10} {'B total':>10}")
+    client = HttpClient('127.0.0.1', http.server_port, keepalive=False)
+    run('http-new', client, args.scans, args.cards, lambda: (client.sent, client.received))
+    if args.keepalive_server:
+        host, port = args.keepalive_server.rsplit(':', 1)
+        remote = HttpClient(host, int(port), keepalive=True)
+        run('http-keepalive', remote, args.scans, args.cards, lambda: (remote.sent, remote.received))
+
+    for name, client in (('udp', transport.UdpScanClient('127.0.0.1', udp_port)),
+                         ('tcp', transport.TcpScanClient('127.0.0.1', tcp_port))):
+        counts = {'sent': 0, 'received': 0}
+        if name == 'udp':
+            client.sock = CountingSocket(client.sock, counts)
+        else:
+            client._connect()
+            client.sock = CountingSocket(client.sock, counts)
+        run(name, client, args.scans, args.cards, lambda: (counts['sent'], counts['received']))
+
+    listener.shutdown()
+    http.shutdown()
+
+
+if __name__ == '__main__':
+    main()
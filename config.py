@@ -3,11 +3,183 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _normalize_db_url(url):
+    # Fix for Heroku/Railway PostgreSQL URLs
+    if url and url.startswith('postgres://'):
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-me'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///library.db'
+    SQLALCHEMY_DATABASE_URI = _normalize_db_url(os.environ.get('DATABASE_URL') or 'sqlite:///library.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
-    # Fix for Heroku/Railway PostgreSQL URLs
-    if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith('postgres://'):
-        SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace('postgres://', 'postgresql://', 1)
+
+    # Optional read replica for dashboards, listings and exports.
+    # Writes and read-your-writes paths always stay on the primary.
+    REPLICA_DATABASE_URL = _normalize_db_url(os.environ.get('REPLICA_DATABASE_URL'))
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+
+    # Max replica lag (seconds) a read may tolerate before falling back to the primary.
+    # Kiosks detect scans by polling /api/attendance, so keep this well under 5s.
+    REPLICA_MAX_STALENESS = float(os.environ.get('REPLICA_MAX_STALENESS', 2.0))
+    # How often (seconds) the measured replica lag is refreshed
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 5.0))
+    # Only PostgreSQL replicas report their lag; others (a SQLite copy for testing) are skipped
+    # unless this is set, which treats them as never lagging
+    REPLICA_TRUST_UNMEASURED = os.environ.get('REPLICA_TRUST_UNMEASURED', 'false').lower() == 'true'
+
+    # Zones a scan can be recorded against
+    ZONES = ('Library', 'Lab', 'Classroom')
+    # How often (seconds) live occupancy counters are reconciled against the DB (0 = never)
+    OCCUPANCY_RECONCILE_INTERVAL = int(os.environ.get('OCCUPANCY_RECONCILE_INTERVAL', 60))
+
+    # /api/scan duplicate suppression (in the shared cache, see CACHE_BACKEND)
+    # Repeat taps of the same card in the same zone within this window return the first result
+    SCAN_DEBOUNCE_SECONDS = float(os.environ.get('SCAN_DEBOUNCE_SECONDS', 2.0))
+    SCAN_DEBOUNCE_MAX_KEYS = 10000
+    # Retries carrying the same (device_id, client_seq) replay the original result
+    SCAN_IDEMPOTENCY_TTL = int(os.environ.get('SCAN_IDEMPOTENCY_TTL', 3600))
+    SCAN_IDEMPOTENCY_MAX_KEYS = 50000
+    # Max scans per /api/scan/batch request (offline queue uploads)
+    SCAN_BATCH_MAX_SIZE = int(os.environ.get('SCAN_BATCH_MAX_SIZE', 500))
+    # /api/attendance/bulk-update: larger corrections run as one UPDATE per this many ids
+    BULK_UPDATE_CHUNK = int(os.environ.get('BULK_UPDATE_CHUNK', 5000))
+
+    # Admission control (app/services/admission.py): per-client rate limits and load shedding.
+    # Requests are classed critical (scans, circulation writes), normal or low (dashboards, reports).
+    # Off by default: behind a proxy, set RATE_LIMIT_PROXY_HOPS before enabling it, or every
+    # kiosk and dashboard shares the proxy's bucket.
+    ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', 'false').lower() == 'true'
+    # Token bucket (requests/second, burst) per class and client: verified device key, else client IP
+    RATE_LIMITS = {
+        'critical': (float(os.environ.get('RATE_LIMIT_CRITICAL', 10)), int(os.environ.get('RATE_LIMIT_CRITICAL_BURST', 30))),
+        'normal': (float(os.environ.get('RATE_LIMIT_NORMAL', 20)), int(os.environ.get('RATE_LIMIT_NORMAL_BURST', 40))),
+        'low': (float(os.environ.get('RATE_LIMIT_LOW', 2)), int(os.environ.get('RATE_LIMIT_LOW_BURST', 10))),
+    }
+    RATE_LIMIT_MAX_KEYS = 10000
+    # Proxies in front of the app whose X-Forwarded-For is trusted for the client IP (0 = none)
+    RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 0))
+    # Requests in flight per process; low is shed at 50% of it, normal at 85%, critical never
+    ADMISSION_MAX_INFLIGHT = int(os.environ.get('ADMISSION_MAX_INFLIGHT', 32))
+    ADMISSION_SHED_AT = {'low': 0.5, 'normal': 0.85}
+    # Shed low when the proxy's X-Request-Start shows more queueing than this (normal at twice it; 0 = off)
+    ADMISSION_MAX_QUEUE_MS = int(os.environ.get('ADMISSION_MAX_QUEUE_MS', 0))
+    # Retry-After (seconds, jittered) sent with shed requests
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 5))
+
+    # Scanner endpoints (/api/scan, /api/scan/batch, /api/devices/heartbeat) check X-Device-Token:
+    # 'off', 'warn' (log and accept bad tokens, for rollout) or 'require'. Issue tokens with device_tokens.py.
+    DEVICE_AUTH = os.environ.get('DEVICE_AUTH', 'off')
+    # Tokens are HMACs under this key (default SECRET_KEY; changing it invalidates every token)
+    DEVICE_TOKEN_SECRET = os.environ.get('DEVICE_TOKEN_SECRET')
+    # Active device keys are cached per process and reloaded this often (and on issue/revoke)
+    DEVICE_KEY_REFRESH_SECONDS = int(os.environ.get('DEVICE_KEY_REFRESH_SECONDS', 60))
+    # Admin sessions carry a signed principal; its revocation version is re-read this often.
+    # Revocation is immediate with a shared cache, within this delay on other workers otherwise.
+    ADMIN_SESSION_RECHECK_SECONDS = int(os.environ.get('ADMIN_SESSION_RECHECK_SECONDS', 30))
+
+    # Cache, counters and pub/sub shared by workers and nodes (app/services/cache.py):
+    # 'memory' (per process), 'redis' (CACHE_URL) or 'fakeredis' (in-process stand-in for tests)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_URL = os.environ.get('CACHE_URL', 'redis://localhost:6379/0')
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'libattend:')
+    # Cached values without their own TTL expire after this many seconds
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 86400))
+
+    # Compact binary scan protocol listener (scan_listener.py)
+    SCAN_LISTENER_HOST = os.environ.get('SCAN_LISTENER_HOST', '0.0.0.0')
+    SCAN_UDP_PORT = int(os.environ.get('SCAN_UDP_PORT', 5005))
+    SCAN_TCP_PORT = int(os.environ.get('SCAN_TCP_PORT', 5006))
+    # Frames tapped longer ago than this (seconds) were queued offline and keep their tap time
+    SCAN_WIRE_LIVE_WINDOW = int(os.environ.get('SCAN_WIRE_LIVE_WINDOW', 30))
+
+    # Optional ASGI server (asgi.py): /api/scan on an async driver and pool, the rest via Flask.
+    # Defaults to DATABASE_URL with aiosqlite / asyncpg swapped in.
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 20))
+    ASYNC_DB_MAX_OVERFLOW = int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', 20))
+    # Threads running the Flask app for non-scan requests under the ASGI server
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 8))
+
+    # /api/reports/*: cached results per (report, date range). Ranges of closed days
+    # stay cached; ranges including today are recomputed after REPORT_OPEN_RANGE_TTL seconds.
+    # The entry limit bounds the memory cache backend (Redis relies on TTLs and maxmemory).
+    REPORT_CACHE_MAX_ENTRIES = int(os.environ.get('REPORT_CACHE_MAX_ENTRIES', 128))
+    REPORT_OPEN_RANGE_TTL = int(os.environ.get('REPORT_OPEN_RANGE_TTL', 60))
+    REPORT_CHUNK_SIZE = 50000  # Rows per cursor fetch when loading report columns
+
+    # Unfiltered /api/books pages are cached until a borrow/return changes availability,
+    # or for at most this many seconds (catalog edits made outside the borrow endpoints)
+    BOOK_CATALOG_CACHE_TTL = int(os.environ.get('BOOK_CATALOG_CACHE_TTL', 30))
+
+    # JSON responses of at least this many bytes are brotli/gzip-compressed when the
+    # client accepts it (-1 = never). JSON is encoded with orjson when it is installed.
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_MIMETYPES = ('application/json',)
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5  # 0-11; higher levels cost far more CPU for little gain on JSON
+
+    # Static files are hashed, minified and precompressed at startup; url_for('static')
+    # returns the content-hashed name, served with a year-long immutable Cache-Control
+    ASSET_FINGERPRINTING = os.environ.get('ASSET_FINGERPRINTING', '1') == '1'
+    ASSET_MAX_AGE = 365 * 24 * 3600
+    ASSET_MINIFY = True
+    ASSET_GZIP_LEVEL = 9
+    ASSET_BROTLI_QUALITY = 11  # Done once per file at startup, so use the densest setting
+
+    # Gate readers whose last heartbeat is older than this (seconds) show as stale
+    DEVICE_STALE_SECONDS = int(os.environ.get('DEVICE_STALE_SECONDS', 120))
+
+    # Apply pending schema migrations at startup instead of warning (dev convenience).
+    # Empty databases are always migrated; in production run `python migrate.py` once per deploy.
+    SCHEMA_AUTO_MIGRATE = os.environ.get('SCHEMA_AUTO_MIGRATE', 'false').lower() == 'true'
+
+    # In-process job scheduler (app/services/scheduler.py). Cluster-wide jobs run on one
+    # worker at a time, coordinated through the job_leases table; intervals in seconds, 0 = off.
+    SCHEDULER_TICK_SECONDS = int(os.environ.get('SCHEDULER_TICK_SECONDS', 5))
+    JOB_OVERDUE_SWEEP_INTERVAL = int(os.environ.get('JOB_OVERDUE_SWEEP_INTERVAL', 900))
+    JOB_OVERDUE_SWEEP_BATCH = 500
+    JOB_CACHE_WARM_INTERVAL = int(os.environ.get('JOB_CACHE_WARM_INTERVAL', 300))
+    JOB_COMPACT_INTERVAL = int(os.environ.get('JOB_COMPACT_INTERVAL', 21600))
+    JOB_ANALYZE_INTERVAL = int(os.environ.get('JOB_ANALYZE_INTERVAL', 21600))
+    # UTC hours in which compaction and ANALYZE/VACUUM may start ("" = any time).
+    # The default 20-23 UTC is 01:30-04:30 IST, after the library closes; shift it for
+    # other timezones. With the 6h intervals above they run once per night.
+    MAINTENANCE_WINDOW = os.environ.get('MAINTENANCE_WINDOW', '20-23')
+    # SQLite is VACUUMed when at least this fraction of its pages is free
+    JOB_VACUUM_FREE_RATIO = float(os.environ.get('JOB_VACUUM_FREE_RATIO', 0.2))
+    # Retention for job run history and readers that stopped sending heartbeats
+    JOB_HISTORY_DAYS = int(os.environ.get('JOB_HISTORY_DAYS', 14))
+    DEVICE_PRUNE_DAYS = int(os.environ.get('DEVICE_PRUNE_DAYS', 30))
+    # Deleted students' history is purged in the background, this many rows per transaction
+    JOB_STUDENT_PURGE_INTERVAL = int(os.environ.get('JOB_STUDENT_PURGE_INTERVAL', 30))
+    PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 1000))
+
+    # Online backups (app/services/backup.py, backup.py): full snapshots and incremental attendance
+    # exports written to BACKUP_DIR (relative to the instance folder) while the app keeps serving
+    BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+    JOB_BACKUP_INTERVAL = int(os.environ.get('JOB_BACKUP_INTERVAL', 86400))
+    JOB_ATTENDANCE_EXPORT_INTERVAL = int(os.environ.get('JOB_ATTENDANCE_EXPORT_INTERVAL', 900))
+    # SQLite copies this many pages per step and pauses between steps: a scan waits at most one step
+    BACKUP_STEP_PAGES = int(os.environ.get('BACKUP_STEP_PAGES', 256))
+    BACKUP_STEP_SLEEP_MS = int(os.environ.get('BACKUP_STEP_SLEEP_MS', 20))
+    # Without WAL every write restarts the copy; after this many restarts the rest is copied in one step
+    BACKUP_MAX_RESTARTS = int(os.environ.get('BACKUP_MAX_RESTARTS', 5))
+    # Seconds a backup waits for a lock (pg_dump behind DDL, SQLite's single-step fallback)
+    BACKUP_LOCK_TIMEOUT = int(os.environ.get('BACKUP_LOCK_TIMEOUT', 10))
+    BACKUP_EXPORT_CHUNK = 5000  # Attendance rows per read in incremental exports
+    # Full snapshots kept; older ones and the exports before the oldest kept are deleted (0 = keep all)
+    BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 7))
+
+    # Print a per-phase startup time breakdown when the app is created
+    STARTUP_REPORT = os.environ.get('STARTUP_REPORT', 'true').lower() == 'true'
+
+    # Start background threads (occupancy seeding, job scheduler) with the app.
+    # Disabled for CLI/maintenance processes.
+    BACKGROUND_SERVICES = True
+
+
+class MaintenanceConfig(Config):
+    """Config for CLI scripts and maintenance workers: no background services"""
+    BACKGROUND_SERVICES = False
+    STARTUP_REPORT = False
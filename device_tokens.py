@@ -0,0 +1,61 @@
+"""
+Issue, list and revoke scanner device tokens (X-Device-Token).
+
+A token is shown once, when issued; put it in the Pi's config.py (DEVICE_TOKEN).
+Revoking takes effect on every worker within DEVICE_KEY_REFRESH_SECONDS, at
+once where the cache is shared.
+
+A token is valid only for the device ids it was issued for: list every
+reader's device id when one Pi drives several (issue GATE_01 GATE_02).
+
+Usage: python device_tokens.py issue GATE_01 [GATE_02 ...]
+       python device_tokens.py list [--all]
+       python device_tokens.py revoke KEY_ID
+"""
+import argparse
+
+from app import create_app, db
+from app.models import DeviceKey
+from app.services.auth import device_keys
+from config import MaintenanceConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage scanner device tokens')
+    commands = parser.add_subparsers(dest='command', required=True)
+    issue = commands.add_parser('issue', help='create a key and print its token')
+    issue.add_argument('device_ids', nargs='+', help="the Pi's DEVICE_ID, or the device_id of each of its READERS")
+    listing = commands.add_parser('list', help='show keys')
+    listing.add_argument('--all', action='store_true', help='include revoked keys')
+    revoke = commands.add_parser('revoke', help='revoke a key')
+    revoke.add_argument('key_id', type=int)
+    args = parser.parse_args()
+
+    app = create_app(MaintenanceConfig)
+    with app.app_context():
+        if args.command == 'issue':
+            name = ','.join(args.device_ids)
+            if len(name) > DeviceKey.name.type.length:
+                parser.error(f'device ids too long for one key ({len(name)} > {DeviceKey.name.type.length} chars)')
+            key, token = device_keys.issue(name)
+            print(f"🔑 Key {key.id} for {key.name}")
+            print(f"   DEVICE_TOKEN = \"{token}\"")
+            if app.config['DEVICE_AUTH'] == 'off':
+                print("   (DEVICE_AUTH is off: set it to warn or require to check tokens)")
+        elif args.command == 'list':
+            query = DeviceKey.query.order_by(DeviceKey.id)
+            if not args.all:
+                query = query.filter(DeviceKey.revoked_at.is_(None))
+            for key in query:
+                state = f"revoked {key.revoked_at:%Y-%m-%d %H:%M}" if key.revoked_at else 'active'
+                print(f"{key.id:>5}  {key.name:<20} created {key.created_at:%Y-%m-%d %H:%M}  {state}")
+        else:
+            key = db.session.get(DeviceKey, args.key_id)
+            if key is None or key.revoked_at:
+                parser.error(f'no active key {args.key_id}')
+            device_keys.revoke(key)
+            print(f"🚫 Key {key.id} ({key.name}) revoked")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Apply pending schema migrations (app/migrations) and record the schema version.
+
+Safe to run against a live database: each statement commits on its own and
+indexes are built online (CREATE INDEX CONCURRENTLY on PostgreSQL). Run it once
+per deploy, before or while the new workers start; they only check the version.
+
+Usage: python migrate.py [--status] [--to VERSION] [--batch-size 10000]
+"""
+import argparse
+import time
+
+from app import create_app, db, migrations
+from config import MaintenanceConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--status', action='store_true', help='show the current version and pending migrations')
+    parser.add_argument('--to', type=int, default=None, help='stop after this version')
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows per batch for backfills')
+    args = parser.parse_args()
+
+    app = create_app(MaintenanceConfig)
+    with app.app_context():
+        with db.engine.connect() as connection:
+            version = migrations.current_version(connection)
+            pending = migrations.pending(connection)
+
+        print(f"📦 Schema version {version} (latest {migrations.latest_version()})")
+        if args.status or not pending:
+            for number, name, module in pending:
+                print(f"   pending {number:04d} {name}: {migrations.describe(module)}")
+            if not pending:
+                print("✅ Up to date")
+            return
+
+        started = time.perf_counter()
+        applied = migrations.upgrade(db.engine, target=args.to, batch_size=args.batch_size)
+
+    print(f"✅ Applied {len(applied)} migration(s) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,10 +10,38 @@ API_URL = "http://192.168.1.12:5000"  # Local testing (using 192.168.1.12)
 
 # RFID Scan Endpoint
 SCAN_ENDPOINT = "/api/scan"
+# Offline queue upload + connectivity probe
+BATCH_ENDPOINT = "/api/scan/batch"
+HEALTH_ENDPOINT = "/api/health"
 
 # Device ID (unique identifier for this scanner)
 DEVICE_ID = "GATE_01"
 
+# Token sent as X-Device-Token on every HTTP request (and used to sign UDP/TCP frames),
+# required when the server runs with DEVICE_AUTH=require. Issue one on the server for every device id
+# in READERS below: python device_tokens.py issue GATE_01 (GATE_02 ...)
+DEVICE_TOKEN = ""
+
+# Readers driven by this process, each in its own thread with its own device id
+# and zone. bus/device pick the SPI chip-select (CE0 = device 0, CE1 = device 1),
+# rst_pin is the reader's RST pin (BCM). Optional per-reader LED pins:
+# "led_green", "led_yellow", "led_red" (default: the shared pins below).
+READERS = [
+    {"device_id": DEVICE_ID, "zone": "Library", "bus": 0, "device": 0, "rst_pin": 25},
+    # {"device_id": "GATE_02", "zone": "Lab", "bus": 0, "device": 1, "rst_pin": 24},
+]
+
+# Scan transport:
+#   "http" - JSON POST to SCAN_ENDPOINT (default)
+#   "udp"  - compact binary frames with ack + retransmit (run scan_listener.py on the server)
+#   "tcp"  - compact binary frames over one persistent connection
+TRANSPORT = "http"
+SCAN_SERVER_HOST = "192.168.1.12"  # Host running scan_listener.py
+SCAN_UDP_PORT = 5005
+SCAN_TCP_PORT = 5006
+UDP_ACK_TIMEOUT = 0.5  # First ack wait (seconds), doubled per retransmit
+UDP_RETRIES = 4
+
 # ========================================
 # GPIO Pin Configuration (BCM numbering)
 # ========================================
@@ -33,11 +61,39 @@ BUZZER_PIN = 18
 # Delay between scans (seconds) - prevents duplicate reads
 SCAN_DELAY = 2.0
 
+# Reader poll interval when no card is present (seconds)
+POLL_INTERVAL = 0.05
+
 # LED on duration (seconds)
 LED_DURATION = 1.0
 
 # Buzzer beep duration (seconds)
 BEEP_DURATION = 0.1
 
-# Offline queue retry interval (seconds)
-RETRY_INTERVAL = 30
+# ========================================
+# Offline Queue Drain
+# ========================================
+
+# Scans read from the queue per pass, and per /api/scan/batch request
+DRAIN_CHUNK_SIZE = 500
+DRAIN_BATCH_SIZE = 100
+# Parallel upload lanes (a card's scans always share a lane, so stay in order)
+DRAIN_CONCURRENCY = 4
+# Health probe backoff while the API is unreachable (seconds, doubled with jitter)
+DRAIN_BACKOFF_MIN = 1
+DRAIN_BACKOFF_MAX = 60
+# Idle re-check of the queue (seconds); queuing a scan wakes the drainer early
+DRAIN_IDLE_INTERVAL = 30
+
+# ========================================
+# Health / Metrics
+# ========================================
+
+# Local metrics endpoint: http://<pi>:9100/metrics (Prometheus) and /metrics.json
+METRICS_ENABLED = True
+METRICS_HOST = "0.0.0.0"
+METRICS_PORT = 9100
+
+# Heartbeat pushed to the server so the dashboard can show gate health (seconds, 0 = off)
+HEARTBEAT_ENDPOINT = "/api/devices/heartbeat"
+HEARTBEAT_INTERVAL = 30
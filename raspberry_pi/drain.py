@@ -0,0 +1,205 @@
+"""
+Offline queue drain: once the API answers the health probe, queued scans are
+uploaded in chunks through /api/scan/batch over a few concurrent lanes.
+
+- Connectivity is probed with exponential backoff and jitter, so a Pi doesn't
+  hammer a recovering server (and a room full of Pis doesn't retry in lockstep).
+- Every scan of a card goes through the same lane, in queue order, so the
+  server sees each card's ENTRY/EXIT taps in the order they happened.
+- Progress is committed as a watermark in the queue DB together with the
+  deletes, so after a restart the drain resumes where it stopped.
+- Scans carry their original tap time and client_seq; re-sent scans are
+  dropped server-side as duplicates.
+"""
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from metrics import metrics
+
+
+def to_utc_iso(timestamp):
+    """Queue timestamps as UTC ISO; naive values (older queues) are local time"""
+    parsed = datetime.fromisoformat(timestamp)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+class QueueDrainer:
+    def __init__(self, queue_db, lock, http, api_url, batch_endpoint, health_endpoint,
+                 chunk_size=500, batch_size=100, concurrency=4,
+                 backoff_min=1.0, backoff_max=60.0, idle_interval=30.0):
+        self.queue_db = queue_db
+        self.lock = lock  # Shared with add_to_queue
+        self.http = http
+        self.batch_url = f"{api_url}{batch_endpoint}"
+        self.health_url = f"{api_url}{health_endpoint}"
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.idle_interval = idle_interval
+        self.wakeup = threading.Event()
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='drain')
+
+    # ---------- Queue DB ----------
+    def _connect(self):
+        return sqlite3.connect(self.queue_db)
+
+    def init_db(self):
+        with self.lock:
+            conn = self._connect()
+            conn.execute('CREATE TABLE IF NOT EXISTS drain_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO drain_state (key, value) VALUES ('watermark', 0)")
+            conn.commit()
+            conn.close()
+
+    def watermark(self, conn=None):
+        """Every queued scan with id <= watermark has been uploaded"""
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            return conn.execute("SELECT value FROM drain_state WHERE key = 'watermark'").fetchone()[0]
+        finally:
+            if own:
+                conn.close()
+
+    def fetch_chunk(self):
+        conn = self._connect()
+        try:
+            return conn.execute('''
+                SELECT id, rfid_uid, device_id, timestamp, client_seq, zone, retries FROM scan_queue
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (self.watermark(conn), self.chunk_size)).fetchall()
+        finally:
+            conn.close()
+
+    def has_pending(self):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT 1 FROM scan_queue WHERE id > ? LIMIT 1',
+                                (self.watermark(conn),)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def commit_progress(self, chunk, done_ids):
+        """Delete uploaded scans and advance the watermark past the chunk's done prefix, atomically"""
+        pending = [row[0] for row in chunk if row[0] not in done_ids]
+        watermark = pending[0] - 1 if pending else chunk[-1][0]
+        with self.lock:
+            conn = self._connect()
+            try:
+                conn.executemany('DELETE FROM scan_queue WHERE id = ?', [(i,) for i in done_ids])
+                conn.execute("UPDATE drain_state SET value = MAX(value, ?) WHERE key = 'watermark'", (watermark,))
+                conn.commit()
+            finally:
+                conn.close()
+
+    def count_attempts(self, rows):
+        """Bump the retries column of scans sent in a batch that failed, so their next upload counts as a retry"""
+        with self.lock:
+            conn = self._connect()
+            try:
+                conn.executemany('UPDATE scan_queue SET retries = retries + 1 WHERE id = ?', [(row[0],) for row in rows])
+                conn.commit()
+            finally:
+                conn.close()
+
+    # ---------- Upload ----------
+    def probe(self):
+        try:
+            return self.http.get(self.health_url, timeout=3).status_code == 200
+        except Exception:
+            return False
+
+    def upload_lane(self, scans):
+        """Upload one lane's scans in order; stops at the first scan that must be retried"""
+        done = set()
+        for start in range(0, len(scans), self.batch_size):
+            batch = scans[start:start + self.batch_size]
+            payload = {'scans': [{
+                'rfid_uid': rfid_uid,
+                'device_id': device_id,
+                'zone': zone,
+                'client_seq': client_seq,
+                'timestamp': to_utc_iso(timestamp)
+            } for _, rfid_uid, device_id, timestamp, client_seq, zone, _ in batch]}
+            try:
+                with metrics.timer('drain_batch'):
+                    response = self.http.post(self.batch_url, json=payload, timeout=15)
+                results = response.json()['results'] if response.status_code == 200 else None
+            except Exception as e:
+                print(f"   ⏳ Upload failed: {e}")
+                results = None
+            if results is None:
+                self.count_attempts(batch)
+                return done
+
+            for n, (row, result) in enumerate(zip(batch, results)):
+                if row[6]:  # Sent before in a batch that failed
+                    metrics.inc('retries_total', device=row[2])
+                if not result.get('success') and result.get('retryable'):
+                    # Server-side failure; later scans of the batch were not attempted
+                    self.count_attempts(batch[n:])
+                    return done
+                if not result.get('success'):
+                    print(f"   ⚠️ Removed invalid: {row[1]} ({result.get('error')})")
+                done.add(row[0])
+        return done
+
+    def drain_chunk(self, chunk):
+        """Upload a chunk over the lanes; returns how many of its scans were handled"""
+        lanes = [[] for _ in range(self.concurrency)]
+        for row in chunk:
+            lanes[zlib.crc32(row[1].encode()) % self.concurrency].append(row)
+
+        done = set()
+        for lane_done in self.pool.map(self.upload_lane, [lane for lane in lanes if lane]):
+            done |= lane_done
+        if done:
+            self.commit_progress(chunk, done)
+            metrics.inc('drain_uploaded_total', len(done))
+        return len(done)
+
+    def drain(self):
+        """Drain until the queue is empty (True) or an upload fails (False)"""
+        total = 0
+        started = time.monotonic()
+        while True:
+            chunk = self.fetch_chunk()
+            if not chunk:
+                if total:
+                    print(f"📤 Drained {total} queued scans in {time.monotonic() - started:.1f}s")
+                return True
+            if total == 0:
+                print("\n📤 Draining offline queue...")
+            done = self.drain_chunk(chunk)
+            total += done
+            if done < len(chunk):
+                print(f"   ⏳ {len(chunk) - done} scans left for the next attempt")
+                return False
+
+    # ---------- Loop ----------
+    def notify(self):
+        """Called when a scan is queued so an idle drainer wakes up"""
+        self.wakeup.set()
+
+    def run(self):
+        delay = self.backoff_min
+        while True:
+            if not self.has_pending():
+                self.wakeup.wait(self.idle_interval)
+                self.wakeup.clear()
+                continue
+
+            if self.probe() and self.drain():
+                delay = self.backoff_min
+                continue
+
+            # Exponential backoff with jitter: 50-100% of the current delay
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, self.backoff_max)
@@ -0,0 +1,188 @@
+"""
+Scanner instrumentation: rolling timing histograms per stage, counters and
+gauges, served on a tiny local HTTP endpoint and pushed to the server as a
+heartbeat.
+
+    GET /metrics       Prometheus text format
+    GET /metrics.json  same data as JSON (also /health)
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _label_str(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Histogram:
+    """Cumulative buckets for Prometheus plus a rolling window for percentiles"""
+
+    def __init__(self, window=1024):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, ms):
+        self.count += 1
+        self.sum_ms += ms
+        self.recent.append(ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(max(self.recent), 2) if self.recent else None
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}     # (name, labels) -> int
+        self.gauges = {}       # (name, labels) -> value or callable
+        self.histograms = {}   # (stage, labels) -> Histogram
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge(self, name, value, **labels):
+        """value may be a callable, evaluated when metrics are read"""
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, stage, ms, **labels):
+        key = self._key(stage, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(ms)
+
+    def timer(self, stage, **labels):
+        return _Timer(self, stage, labels)
+
+    def counter(self, name, **labels):
+        with self.lock:
+            return self.counters.get(self._key(name, labels), 0)
+
+    def summary(self, stage, **labels):
+        with self.lock:
+            histogram = self.histograms.get(self._key(stage, labels))
+            return histogram.summary() if histogram else Histogram().summary()
+
+    def _gauge_values(self):
+        values = {}
+        for key, value in list(self.gauges.items()):
+            try:
+                values[key] = value() if callable(value) else value
+            except Exception:
+                values[key] = None
+        return values
+
+    def to_dict(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: h.summary() for key, h in self.histograms.items()}
+        return {
+            'uptime_seconds': int(time.time() - self.started),
+            'counters': [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in counters.items()],
+            'gauges': [{'name': n, 'labels': dict(l), 'value': v}
+                       for (n, l), v in self._gauge_values().items()],
+            'timings': [{'stage': n, 'labels': dict(l), **s} for (n, l), s in histograms.items()]
+        }
+
+    def render_prometheus(self):
+        lines = [f'scanner_uptime_seconds {int(time.time() - self.started)}']
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f'scanner_{name}{_label_str(labels)} {value}')
+            histograms = [(key, list(h.counts), h.count, h.sum_ms) for key, h in sorted(self.histograms.items())]
+        for (name, labels), value in sorted(self._gauge_values().items()):
+            if value is not None:
+                lines.append(f'scanner_{name}{_label_str(labels)} {value}')
+        for (stage, labels), counts, count, total in histograms:
+            base = 'scanner_stage_duration_ms'
+            stage_labels = (('stage', stage),) + labels
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS_MS, counts):
+                cumulative += bucket
+                lines.append(f'{base}_bucket{_label_str(stage_labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{base}_bucket{_label_str(stage_labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{base}_sum{_label_str(stage_labels)} {total:.3f}')
+            lines.append(f'{base}_count{_label_str(stage_labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class _Timer:
+    def __init__(self, metrics, stage, labels):
+        self.metrics, self.stage, self.labels = metrics, stage, labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, (time.perf_counter() - self.started) * 1000, **self.labels)
+        return False
+
+
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body = metrics.render_prometheus().encode()
+            content_type = 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body = json.dumps(metrics.to_dict()).encode()
+            content_type = 'application/json'
+        elif self.path == '/health':
+            body = json.dumps({'status': 'ok', 'uptime_seconds': int(time.time() - metrics.started)}).encode()
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the scanner console readable
+
+
+def start_metrics_server(host, port):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
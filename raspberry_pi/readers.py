@@ -0,0 +1,75 @@
+"""
+RFID reader hardware layer.
+
+Each reader is constructed once and polled with read_uid(), which returns the
+card UID as an uppercase hex string or None when no card is present. Anything
+with that method can stand in for the hardware, e.g. SimulatedReader in tests
+or when running without a Pi.
+"""
+import queue
+import random
+
+try:
+    from mfrc522 import MFRC522
+except ImportError:
+    MFRC522 = None
+
+
+class RC522Reader:
+    """One RC522 on its own SPI chip-select (bus/device) and RST pin"""
+
+    def __init__(self, bus=0, device=0, rst_pin=25):
+        if MFRC522 is None:
+            raise RuntimeError('mfrc522 is not installed')
+        self.mfrc = MFRC522(bus=bus, device=device, pin_rst=rst_pin)
+
+    def read_uid(self):
+        """Non-blocking poll; same UID format as SimpleMFRC522.read_id()"""
+        status, _ = self.mfrc.MFRC522_Request(self.mfrc.PICC_REQIDL)
+        if status != self.mfrc.MI_OK:
+            return None
+        status, uid = self.mfrc.MFRC522_Anticoll()
+        if status != self.mfrc.MI_OK:
+            return None
+        number = 0
+        for byte in uid[:5]:
+            number = number * 256 + byte
+        return format(number, 'X')
+
+    def close(self):
+        self.mfrc.Close_MFRC522()
+
+
+class SimulatedReader:
+    """
+    Reader fed from a queue. Call tap(uid) (or tap() for a random test card)
+    and the next read_uid() returns it.
+    """
+
+    TEST_UIDS = ['ABC123', 'DEF456', 'UNKNOWN']  # Add your test UIDs
+
+    def __init__(self):
+        self.taps = queue.Queue()
+
+    def tap(self, uid=None):
+        self.taps.put(uid or random.choice(self.TEST_UIDS))
+
+    def read_uid(self):
+        try:
+            return self.taps.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+def create_reader(spec, simulate=False):
+    """Build a reader from a READERS entry in config.py"""
+    if simulate:
+        return SimulatedReader()
+    return RC522Reader(
+        bus=spec.get('bus', 0),
+        device=spec.get('device', 0),
+        rst_pin=spec.get('rst_pin', 25)
+    )
@@ -2,11 +2,14 @@
 """
 RFID Library Logger - Raspberry Pi Scanner
 ==========================================
-This script reads RFID cards using the RC522 module and sends
+This script reads RFID cards using one or more RC522 modules and sends
 scan data to the cloud API. Includes LED feedback and offline queue.
 
+Each reader listed in READERS (config.py) runs in its own thread with its own
+device id and zone; all readers share one HTTP session and one offline queue.
+
 Hardware Setup:
-- RFID-RC522 connected via SPI
+- RFID-RC522 reader(s) connected via SPI (CE0 / CE1)
 - Green LED on GPIO 17 (Entry indicator)
 - Yellow LED on GPIO 22 (Exit indicator)
 - Red LED on GPIO 27 (Error indicator)
@@ -17,16 +20,17 @@ Run with: python3 rfid_scanner.py
 
 import time
 import signal
+import socket
 import sys
 import sqlite3
 import threading
 import requests
-from datetime import datetime
+from datetime import datetime, timezone
 
 # Raspberry Pi specific imports
 try:
     import RPi.GPIO as GPIO
-    from mfrc522 import SimpleMFRC522
+    import mfrc522
     PI_MODE = True
 except ImportError:
     PI_MODE = False
@@ -34,15 +38,25 @@ except ImportError:
 
 # Local config
 from config import (
-    API_URL, SCAN_ENDPOINT, DEVICE_ID,
+    API_URL, SCAN_ENDPOINT, DEVICE_ID, DEVICE_TOKEN, READERS,
     LED_GREEN, LED_RED, LED_YELLOW, BUZZER_PIN,
-    SCAN_DELAY, LED_DURATION, BEEP_DURATION, RETRY_INTERVAL
+    SCAN_DELAY, POLL_INTERVAL, LED_DURATION, BEEP_DURATION,
+    BATCH_ENDPOINT, HEALTH_ENDPOINT, DRAIN_CHUNK_SIZE, DRAIN_BATCH_SIZE, DRAIN_CONCURRENCY,
+    DRAIN_BACKOFF_MIN, DRAIN_BACKOFF_MAX, DRAIN_IDLE_INTERVAL,
+    TRANSPORT, SCAN_SERVER_HOST, SCAN_UDP_PORT, SCAN_TCP_PORT,
+    UDP_ACK_TIMEOUT, UDP_RETRIES,
+    METRICS_ENABLED, METRICS_HOST, METRICS_PORT, HEARTBEAT_ENDPOINT, HEARTBEAT_INTERVAL
 )
+from transport import UdpScanClient, TcpScanClient
+from readers import create_reader
+from metrics import metrics, start_metrics_server
+from drain import QueueDrainer
 
 # ========================================
 # Offline Queue (SQLite)
 # ========================================
 QUEUE_DB = "offline_queue.db"
+queue_lock = threading.Lock()  # Readers and the queue processor share the DB
 
 def init_queue_db():
     """Initialize the offline queue database"""
@@ -54,40 +68,42 @@ def init_queue_db():
             rfid_uid TEXT NOT NULL,
             device_id TEXT NOT NULL,
             timestamp TEXT NOT NULL,
-            retries INTEGER DEFAULT 0
+            retries INTEGER DEFAULT 0,
+            client_seq INTEGER,
+            zone TEXT
         )
     ''')
+    # Older queues lack the idempotency key and zone columns
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(scan_queue)')]
+    if 'client_seq' not in columns:
+        cursor.execute('ALTER TABLE scan_queue ADD COLUMN client_seq INTEGER')
+    if 'zone' not in columns:
+        cursor.execute('ALTER TABLE scan_queue ADD COLUMN zone TEXT')
     conn.commit()
     conn.close()
 
-def add_to_queue(rfid_uid: str):
+def add_to_queue(rfid_uid: str, client_seq: int, device_id: str = DEVICE_ID, zone: str = None):
     """Add a scan to the offline queue"""
-    conn = sqlite3.connect(QUEUE_DB)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO scan_queue (rfid_uid, device_id, timestamp)
-        VALUES (?, ?, ?)
-    ''', (rfid_uid, DEVICE_ID, datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+    with queue_lock:
+        conn = sqlite3.connect(QUEUE_DB)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO scan_queue (rfid_uid, device_id, timestamp, client_seq, zone)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (rfid_uid, device_id, datetime.now(timezone.utc).isoformat(), client_seq, zone))
+        conn.commit()
+        conn.close()
+    metrics.inc('queued_total', device=device_id)
+    drainer.notify()
     print(f"📦 Added to offline queue: {rfid_uid}")
 
-def get_queued_scans():
-    """Get all pending scans from the queue"""
-    conn = sqlite3.connect(QUEUE_DB)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, rfid_uid, device_id, timestamp FROM scan_queue ORDER BY id')
-    scans = cursor.fetchall()
-    conn.close()
-    return scans
-
-def remove_from_queue(scan_id: int):
-    """Remove a scan from the queue after successful upload"""
+def queue_depth() -> int:
+    """Number of scans waiting for upload"""
     conn = sqlite3.connect(QUEUE_DB)
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM scan_queue WHERE id = ?', (scan_id,))
-    conn.commit()
-    conn.close()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM scan_queue').fetchone()[0]
+    finally:
+        conn.close()
 
 # ========================================
 # GPIO Setup
@@ -100,17 +116,13 @@ def setup_gpio():
     GPIO.setmode(GPIO.BCM)
     GPIO.setwarnings(False)
     
-    # Setup LED pins as outputs
-    GPIO.setup(LED_GREEN, GPIO.OUT)
-    GPIO.setup(LED_YELLOW, GPIO.OUT)
-    GPIO.setup(LED_RED, GPIO.OUT)
-    GPIO.setup(BUZZER_PIN, GPIO.OUT)
-    
-    # Turn all off initially
-    GPIO.output(LED_GREEN, GPIO.LOW)
-    GPIO.output(LED_YELLOW, GPIO.LOW)
-    GPIO.output(LED_RED, GPIO.LOW)
-    GPIO.output(BUZZER_PIN, GPIO.LOW)
+    # Setup LED pins (shared and per-reader) and buzzer as outputs, all off
+    pins = {LED_GREEN, LED_YELLOW, LED_RED, BUZZER_PIN}
+    for spec in READERS:
+        pins.update(spec[key] for key in ('led_green', 'led_yellow', 'led_red') if key in spec)
+    for pin in pins:
+        GPIO.setup(pin, GPIO.OUT)
+        GPIO.output(pin, GPIO.LOW)
     
     print("✅ GPIO initialized")
 
@@ -148,19 +160,59 @@ def beep(duration: float = BEEP_DURATION):
 # ========================================
 # API Communication
 # ========================================
-def send_scan(rfid_uid: str) -> dict:
+# One HTTP session (keep-alive connection pool) shared by all reader threads
+http = requests.Session()
+if DEVICE_TOKEN:
+    http.headers['X-Device-Token'] = DEVICE_TOKEN
+
+def create_wire_client():
+    """Compact-protocol client for TRANSPORT udp/tcp, or None for HTTP"""
+    if TRANSPORT == "udp":
+        return UdpScanClient(SCAN_SERVER_HOST, SCAN_UDP_PORT, UDP_ACK_TIMEOUT, UDP_RETRIES, token=DEVICE_TOKEN or None)
+    if TRANSPORT == "tcp":
+        return TcpScanClient(SCAN_SERVER_HOST, SCAN_TCP_PORT, token=DEVICE_TOKEN or None)
+    return None
+
+def next_client_seq() -> int:
+    """
+    Idempotency sequence for a tap. Millisecond clock: unique per device and
+    still increasing across restarts, with no state to persist.
+    """
+    return time.time_ns() // 1_000_000
+
+def send_scan(rfid_uid: str, client_seq: int = None, device_id: str = DEVICE_ID,
+              zone: str = None, wire_client=None) -> dict:
     """
     Send scan to the cloud API
+    Retries must reuse the tap's client_seq so the server can drop duplicates.
+    Each reader thread passes its own wire_client (UDP/TCP) so readers never
+    wait on each other; HTTP goes through the shared session.
     Returns: response dict or None if failed
     """
+    with metrics.timer('send', device=device_id):
+        result = _send_scan(rfid_uid, client_seq, device_id, zone, wire_client)
+    if result is None:
+        metrics.inc('send_failures_total', device=device_id)
+    return result
+
+def _send_scan(rfid_uid, client_seq, device_id, zone, wire_client):
+    if wire_client is not None:
+        if client_seq is None:
+            client_seq = next_client_seq()
+        return wire_client.send(client_seq, time.time(), rfid_uid, device_id, zone or '')
+    
     url = f"{API_URL}{SCAN_ENDPOINT}"
     payload = {
         "rfid_uid": rfid_uid,
-        "device_id": DEVICE_ID
+        "device_id": device_id
     }
+    if zone:
+        payload["zone"] = zone
+    if client_seq is not None:
+        payload["client_seq"] = client_seq
     
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = http.post(url, json=payload, timeout=10)
         return response.json()
     except requests.exceptions.ConnectionError:
         print("❌ Connection error - API unreachable")
@@ -172,16 +224,28 @@ def send_scan(rfid_uid: str) -> dict:
         print(f"❌ Error: {e}")
         return None
 
-def process_scan(rfid_uid: str):
+def process_scan(rfid_uid: str, device_id: str = DEVICE_ID, zone: str = None,
+                 wire_client=None, leds: dict = None):
     """Process an RFID scan - send to API and provide feedback"""
-    print(f"\n📡 Card scanned: {rfid_uid}")
+    leds = leds or {}
+    led_green = leds.get('led_green', LED_GREEN)
+    led_yellow = leds.get('led_yellow', LED_YELLOW)
+    led_red = leds.get('led_red', LED_RED)
+    print(f"\n📡 [{device_id}] Card scanned: {rfid_uid}")
     
-    result = send_scan(rfid_uid)
+    client_seq = next_client_seq()
+    result = send_scan(rfid_uid, client_seq, device_id, zone, wire_client)
     
+    with metrics.timer('feedback', device=device_id):
+        give_feedback(rfid_uid, client_seq, device_id, zone, result, led_green, led_yellow, led_red)
+
+def give_feedback(rfid_uid, client_seq, device_id, zone, result, led_green, led_yellow, led_red):
+    """LED/buzzer feedback for a scan result (queues the scan if the API was unreachable)"""
     if result is None:
         # Network error - add to offline queue
-        add_to_queue(rfid_uid)
-        led_feedback(LED_RED)
+        metrics.inc('scans_total', device=device_id, result='offline')
+        add_to_queue(rfid_uid, client_seq, device_id, zone)
+        led_feedback(led_red)
         beep()
         time.sleep(0.2)
         beep()  # Double beep for error
@@ -193,20 +257,26 @@ def process_scan(rfid_uid: str):
         name = student.get('name', 'Unknown')
         
         print(f"✅ {action}: {name}")
+        metrics.inc('scans_total', device=device_id, result=action.lower())
+        
+        if result.get('duplicate'):
+            metrics.inc('duplicates_total', device=device_id)
+            print("   ↩️  Duplicate tap, server returned the original result")
         
         if action == 'ENTRY':
-            led_feedback(LED_GREEN)
+            led_feedback(led_green)
             print(f"   🟢 Welcome, {name}!")
         else:  # EXIT
-            led_feedback(LED_YELLOW)
+            led_feedback(led_yellow)
             print(f"   🟡 Goodbye, {name}!")
         
         beep()
     else:
         # Card not recognized
         error = result.get('error', 'Unknown error')
+        metrics.inc('scans_total', device=device_id, result='rejected')
         print(f"❌ Error: {error}")
-        led_feedback(LED_RED)
+        led_feedback(led_red)
         beep()
         time.sleep(0.2)
         beep()
@@ -214,47 +284,116 @@ def process_scan(rfid_uid: str):
 # ========================================
 # Offline Queue Processor
 # ========================================
-def process_offline_queue():
-    """Background thread to process queued scans"""
-    while True:
-        time.sleep(RETRY_INTERVAL)
-        
-        scans = get_queued_scans()
-        if not scans:
-            continue
-        
-        print(f"\n📤 Processing {len(scans)} queued scans...")
+# Uploads queued scans through /api/scan/batch once the API is reachable again
+# (see drain.py). Always HTTP, whatever TRANSPORT the live scans use.
+drainer = QueueDrainer(
+    QUEUE_DB, queue_lock, http, API_URL, BATCH_ENDPOINT, HEALTH_ENDPOINT,
+    chunk_size=DRAIN_CHUNK_SIZE, batch_size=DRAIN_BATCH_SIZE, concurrency=DRAIN_CONCURRENCY,
+    backoff_min=DRAIN_BACKOFF_MIN, backoff_max=DRAIN_BACKOFF_MAX, idle_interval=DRAIN_IDLE_INTERVAL
+)
+
+# ========================================
+# RFID Readers
+# ========================================
+class ReaderWorker(threading.Thread):
+    """Polls one reader and processes its scans (own device id, zone and debounce)"""
+
+    def __init__(self, spec: dict, reader):
+        super().__init__(name=f"reader-{spec['device_id']}", daemon=True)
+        self.device_id = spec['device_id']
+        self.zone = spec.get('zone')
+        self.leds = {key: spec[key] for key in ('led_green', 'led_yellow', 'led_red') if key in spec}
+        self.reader = reader
+        self.wire_client = create_wire_client()
+        self.running = True
+
+    def run(self):
+        last_scan_time = 0
+        last_uid = None
         
-        for scan_id, rfid_uid, device_id, timestamp in scans:
-            result = send_scan(rfid_uid)
+        while self.running:
+            try:
+                with metrics.timer('read', device=self.device_id):
+                    uid = self.reader.read_uid()
+            except Exception as e:
+                metrics.inc('reader_errors_total', device=self.device_id)
+                print(f"[{self.device_id}] Reader error: {e}")
+                time.sleep(1)
+                continue
             
-            if result and result.get('success'):
-                remove_from_queue(scan_id)
-                print(f"   ✅ Uploaded: {rfid_uid}")
-            elif result:
-                # API responded but scan failed (e.g., unknown card)
-                remove_from_queue(scan_id)
-                print(f"   ⚠️ Removed invalid: {rfid_uid}")
-            else:
-                # Still can't reach API
-                print(f"   ⏳ Will retry: {rfid_uid}")
-                break  # Stop trying if API is still down
+            if uid is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            
+            current_time = time.time()
+            
+            # Debounce - prevent duplicate reads
+            if uid == last_uid and (current_time - last_scan_time) < SCAN_DELAY:
+                metrics.inc('debounced_total', device=self.device_id)
+                continue
+            
+            last_uid = uid
+            last_scan_time = current_time
+            
+            try:
+                with metrics.timer('scan', device=self.device_id):
+                    process_scan(uid, self.device_id, self.zone, self.wire_client, self.leds)
+            except Exception as e:
+                metrics.inc('scan_errors_total', device=self.device_id)
+                print(f"[{self.device_id}] Scan error: {e}")
+
+    def stop(self):
+        self.running = False
+
+def start_readers(specs=READERS, simulate=not PI_MODE) -> list:
+    """Construct every reader once and start its worker thread"""
+    workers = []
+    for spec in specs:
+        worker = ReaderWorker(spec, create_reader(spec, simulate=simulate))
+        worker.start()
+        workers.append(worker)
+    return workers
 
 # ========================================
-# RFID Reader
+# Health Heartbeat
 # ========================================
-def read_rfid():
-    """Read RFID card and return UID as hex string"""
-    if PI_MODE:
-        reader = SimpleMFRC522()
-        id = reader.read_id()
-        # Convert to hex string (uppercase)
-        return format(id, 'X')
-    else:
-        # Simulation mode - generate random UID or use test values
-        import random
-        test_uids = ['ABC123', 'DEF456', 'UNKNOWN']  # Add your test UIDs
-        return random.choice(test_uids)
+def build_heartbeat() -> dict:
+    """Compact health summary for the server dashboard"""
+    readers = []
+    for spec in READERS:
+        device_id = spec['device_id']
+        errors = (metrics.counter('reader_errors_total', device=device_id)
+                  + metrics.counter('scan_errors_total', device=device_id)
+                  + metrics.counter('send_failures_total', device=device_id))
+        scans = sum(metrics.counter('scans_total', device=device_id, result=result)
+                    for result in ('entry', 'exit', 'rejected', 'offline'))
+        send = metrics.summary('send', device=device_id)
+        readers.append({
+            'device_id': device_id,
+            'zone': spec.get('zone'),
+            'scans': scans,
+            'errors': errors,
+            'send_p50_ms': send['p50_ms'],
+            'send_p95_ms': send['p95_ms']
+        })
+    return {
+        'host': socket.gethostname(),
+        'transport': TRANSPORT,
+        'uptime_seconds': int(time.time() - metrics.started),
+        'queue_depth': queue_depth(),
+        'retries': sum(metrics.counter('retries_total', device=spec['device_id']) for spec in READERS),
+        'readers': readers
+    }
+
+def send_heartbeats():
+    """Background thread pushing the heartbeat every HEARTBEAT_INTERVAL seconds"""
+    url = f"{API_URL}{HEARTBEAT_ENDPOINT}"
+    while True:
+        try:
+            http.post(url, json=build_heartbeat(), timeout=5)
+        except Exception as e:
+            print(f"⚠️  Heartbeat failed: {e}")
+        time.sleep(HEARTBEAT_INTERVAL)
 
 # ========================================
 # Main Loop
@@ -271,8 +410,10 @@ def main():
     
     print(f"🔧 Configuration:")
     print(f"   API URL: {API_URL}")
-    print(f"   Device ID: {DEVICE_ID}")
+    print(f"   Transport: {TRANSPORT}")
     print(f"   Pi Mode: {'HARDWARE' if PI_MODE else 'SIMULATION'}")
+    for i, spec in enumerate(READERS):
+        print(f"   Reader {i}: {spec['device_id']} -> {spec.get('zone') or 'server default'}")
     print()
     
     # Initialize
@@ -280,52 +421,48 @@ def main():
     setup_gpio()
     
     # Start offline queue processor in background
-    queue_thread = threading.Thread(target=process_offline_queue, daemon=True)
+    drainer.init_db()
+    queue_thread = threading.Thread(target=drainer.run, daemon=True)
     queue_thread.start()
     
+    # Health: local metrics endpoint + heartbeat to the server
+    metrics.gauge('queue_depth', queue_depth)
+    if METRICS_ENABLED:
+        start_metrics_server(METRICS_HOST, METRICS_PORT)
+        print(f"📈 Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    if HEARTBEAT_INTERVAL > 0:
+        threading.Thread(target=send_heartbeats, daemon=True).start()
+    
+    workers = []
+    
     # Signal handler for clean exit
     def signal_handler(sig, frame):
         print("\n\n👋 Shutting down...")
+        for worker in workers:
+            worker.stop()
+            worker.reader.close()
         cleanup_gpio()
         sys.exit(0)
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
-    # Main scanning loop
-    last_scan_time = 0
-    last_uid = None
-    
-    print("📡 Waiting for RFID card...")
-    
     try:
+        workers.extend(start_readers())
+        print("📡 Waiting for RFID card...")
+        
+        if PI_MODE:
+            # Reader threads do the work
+            while True:
+                time.sleep(3600)
+        
+        # Simulation mode - "<reader index> [uid]" + Enter simulates a tap
         while True:
-            if PI_MODE:
-                # Real hardware mode
-                try:
-                    uid = read_rfid()
-                except Exception as e:
-                    print(f"Reader error: {e}")
-                    time.sleep(1)
-                    continue
-            else:
-                # Simulation mode - wait for Enter key
-                input("\n[Press Enter to simulate card scan] ")
-                uid = read_rfid()
-            
-            current_time = time.time()
-            
-            # Debounce - prevent duplicate reads
-            if uid == last_uid and (current_time - last_scan_time) < SCAN_DELAY:
-                continue
-            
-            last_uid = uid
-            last_scan_time = current_time
-            
-            # Process the scan
-            process_scan(uid)
-            
-            print("\n📡 Waiting for next card...")
+            line = input("\n[Enter = tap reader 0, or '<reader> [uid]'] ").split()
+            index = int(line[0]) if line else 0
+            uid = line[1] if len(line) > 1 else None
+            if 0 <= index < len(workers):
+                workers[index].reader.tap(uid)
     
     except Exception as e:
         print(f"\n❌ Fatal error: {e}")
@@ -0,0 +1,111 @@
+"""
+Compact scan transports for weak links: binary frames (see wire.py) over UDP
+with ack + retransmit, or over one persistent TCP connection.
+
+Both return the same dict shape as the JSON /api/scan response, or None when
+the server can't be reached (so the caller queues the scan offline). Given the
+device token, frames are signed so the listener accepts them under DEVICE_AUTH.
+"""
+import socket
+import threading
+import time
+
+import wire
+
+
+def ack_to_result(ack):
+    if ack['status'] == wire.STATUS_ERROR:
+        return {'success': False, 'error': ack['message'] or 'Scan rejected'}
+    return {
+        'success': True,
+        'action': ack['action'],
+        'student': {'name': ack['message']},
+        'duplicate': ack['status'] == wire.STATUS_DUPLICATE
+    }
+
+
+class UdpScanClient:
+    """Fire a datagram, wait for the matching ACK, retransmit with backoff"""
+
+    def __init__(self, host, port, ack_timeout=0.5, retries=4, token=None):
+        self.address = (host, port)
+        self.token = token
+        self.ack_timeout = ack_timeout
+        self.retries = retries
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.lock = threading.Lock()
+
+    def send(self, seq, timestamp, rfid_uid, device_id, zone=''):
+        frame = wire.encode_scan(seq, timestamp, rfid_uid, device_id, zone, self.token)
+        timeout = self.ack_timeout
+        with self.lock:
+            for _ in range(self.retries + 1):
+                try:
+                    self.sock.sendto(frame, self.address)
+                    deadline = time.monotonic() + timeout
+                    while True:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.sock.settimeout(remaining)
+                        data, _ = self.sock.recvfrom(512)
+                        ack = wire.decode_ack(data)
+                        if ack['seq'] == seq:
+                            return ack_to_result(ack)
+                        # Late ACK for an earlier retransmit; keep waiting
+                except socket.timeout:
+                    pass
+                except (OSError, wire.WireError) as e:
+                    print(f"❌ UDP error: {e}")
+                # Server dedupes by (device_id, seq), so retransmits are safe
+                timeout *= 2
+        return None
+
+
+class TcpScanClient:
+    """One long-lived connection; reconnects once per send on failure"""
+
+    def __init__(self, host, port, timeout=5.0, token=None):
+        self.address = (host, port)
+        self.token = token
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+
+    def _recv_exactly(self, n):
+        data = b''
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError('server closed the connection')
+            data += chunk
+        return data
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+
+    def send(self, seq, timestamp, rfid_uid, device_id, zone=''):
+        frame = wire.frame_stream(wire.encode_scan(seq, timestamp, rfid_uid, device_id, zone, self.token))
+        with self.lock:
+            for _ in range(2):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    self.sock.sendall(frame)
+                    while True:
+                        ack = wire.decode_ack(wire.read_stream_frame(self._recv_exactly))
+                        if ack['seq'] == seq:
+                            return ack_to_result(ack)
+                except (OSError, ConnectionError, wire.WireError) as e:
+                    print(f"❌ TCP error: {e}")
+                    self.close()
+        return None
@@ -0,0 +1,146 @@
+"""
+Compact binary scan protocol for gate devices (UDP datagrams or a TCP stream).
+
+The server loads this same file (app/services/wire.py), so there is one copy of the protocol.
+
+SCAN frame (big-endian), ~40 bytes for a typical tap:
+    magic    B    0xA5
+    type     B    0x01
+    version  B    0x01 unsigned, 0x02 signed
+    seq      Q    client sequence number (idempotency key with device_id)
+    ts       I    tap time, unix seconds
+    uid      B + bytes  (ASCII, len-prefixed)
+    device   B + bytes
+    zone     B + bytes  (empty = server default)
+  version 0x02 only (~20 more bytes):
+    key id   I    id of the device token (python device_tokens.py issue)
+    mac      16 bytes, HMAC-SHA256 of everything above keyed with the token's
+             signature part, truncated. The token itself never goes on the wire.
+
+ACK frame:
+    magic B, type B (0x02), status B (0 ok, 1 duplicate, 2 error), seq Q,
+    action B ('E' / 'X' / 0), message B + bytes (UTF-8 student name or error)
+
+On TCP every frame is prefixed with its length as an unsigned short.
+"""
+import hashlib
+import hmac
+import struct
+
+MAGIC = 0xA5
+TYPE_SCAN = 0x01
+TYPE_ACK = 0x02
+VERSION = 0x01
+VERSION_SIGNED = 0x02
+
+STATUS_OK = 0
+STATUS_DUPLICATE = 1
+STATUS_ERROR = 2
+
+_SCAN_HEADER = struct.Struct('!BBBQI')
+_ACK_HEADER = struct.Struct('!BBBQB')
+_KEY_ID = struct.Struct('!I')
+_LENGTH = struct.Struct('!H')
+MAC_SIZE = 16
+
+ACTION_CODES = {'ENTRY': ord('E'), 'EXIT': ord('X')}
+ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+
+
+class WireError(ValueError):
+    pass
+
+
+def _pack_str(value, limit=255):
+    data = (value or '').encode('utf-8')[:limit]
+    return bytes([len(data)]) + data
+
+
+def _unpack_str(frame, offset):
+    if offset >= len(frame):
+        raise WireError('truncated frame')
+    length = frame[offset]
+    end = offset + 1 + length
+    if end > len(frame):
+        raise WireError('truncated frame')
+    return frame[offset + 1:end].decode('utf-8', errors='replace'), end
+
+
+def frame_mac(signature, data):
+    """MAC of a signed SCAN frame; signature is the part of the device token after the dot"""
+    return hmac.new(signature.encode(), data, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def encode_scan(seq, timestamp, rfid_uid, device_id, zone='', token=None):
+    """Unsigned frame, or a signed one when token ('<key id>.<signature>') is given"""
+    version = VERSION_SIGNED if token else VERSION
+    frame = (_SCAN_HEADER.pack(MAGIC, TYPE_SCAN, version, seq, int(timestamp))
+             + _pack_str(rfid_uid) + _pack_str(device_id) + _pack_str(zone))
+    if not token:
+        return frame
+    key_id, _, signature = token.partition('.')
+    frame += _KEY_ID.pack(int(key_id))
+    return frame + frame_mac(signature, frame)
+
+
+def decode_scan(frame):
+    """
+    Returns dict(seq, timestamp, rfid_uid, device_id, zone, key_id, signed, mac).
+    key_id, signed (the bytes the MAC covers) and mac are None for unsigned frames.
+    """
+    if len(frame) < _SCAN_HEADER.size:
+        raise WireError('frame too short')
+    magic, frame_type, version, seq, timestamp = _SCAN_HEADER.unpack_from(frame)
+    if magic != MAGIC or frame_type != TYPE_SCAN:
+        raise WireError('not a scan frame')
+    if version not in (VERSION, VERSION_SIGNED):
+        raise WireError(f'unsupported version {version}')
+    rfid_uid, offset = _unpack_str(frame, _SCAN_HEADER.size)
+    device_id, offset = _unpack_str(frame, offset)
+    zone, offset = _unpack_str(frame, offset)
+    key_id = signed = mac = None
+    if version == VERSION_SIGNED:
+        if len(frame) != offset + _KEY_ID.size + MAC_SIZE:
+            raise WireError('bad signature block')
+        (key_id,) = _KEY_ID.unpack_from(frame, offset)
+        signed, mac = frame[:-MAC_SIZE], frame[-MAC_SIZE:]
+    return {
+        'seq': seq,
+        'timestamp': timestamp,
+        'rfid_uid': rfid_uid,
+        'device_id': device_id,
+        'zone': zone,
+        'key_id': key_id,
+        'signed': signed,
+        'mac': mac
+    }
+
+
+def encode_ack(seq, status, action=None, message=''):
+    return (_ACK_HEADER.pack(MAGIC, TYPE_ACK, status, seq, ACTION_CODES.get(action, 0))
+            + _pack_str(message, limit=64))
+
+
+def decode_ack(frame):
+    """Returns dict(seq, status, action, message)"""
+    if len(frame) < _ACK_HEADER.size:
+        raise WireError('frame too short')
+    magic, frame_type, status, seq, action = _ACK_HEADER.unpack_from(frame)
+    if magic != MAGIC or frame_type != TYPE_ACK:
+        raise WireError('not an ack frame')
+    message, _ = _unpack_str(frame, _ACK_HEADER.size)
+    return {'seq': seq, 'status': status, 'action': ACTION_NAMES.get(action), 'message': message}
+
+
+def frame_stream(payload):
+    """Length-prefix a frame for the TCP stream"""
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def read_stream_frame(recv_exactly):
+    """Read one length-prefixed frame using recv_exactly(n) -> bytes (b'' on EOF)"""
+    header = recv_exactly(_LENGTH.size)
+    if not header:
+        return None
+    (length,) = _LENGTH.unpack(header)
+    return recv_exactly(length)
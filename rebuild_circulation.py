@@ -0,0 +1,31 @@
+"""
+Rebuild the circulation rollups (book_circulation_stats, daily_circulation_stats)
+from borrow_records.
+
+The borrow endpoints keep the rollups current; run this after restoring a
+backup or importing borrow history.
+
+Usage: python rebuild_circulation.py
+"""
+import argparse
+import time
+
+from app import create_app
+from app.services.circulation import rebuild
+from config import MaintenanceConfig
+
+
+def main():
+    argparse.ArgumentParser(description='Rebuild circulation rollups from borrow records').parse_args()
+
+    app = create_app(MaintenanceConfig)
+    with app.app_context():
+        print("🔁 Rebuilding circulation rollups...")
+        started = time.perf_counter()
+        books, days = rebuild()
+
+    print(f"✅ Rebuilt {books} book rows and {days} day rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Rebuild visit_sessions from attendance_logs.
+
+Splits students into id ranges and pairs ENTRY/EXIT rows for each range in a
+separate process. Safe to run while gates are live.
+
+Usage: python rebuild_visits.py [--workers 4] [--partitions 16]
+"""
+import argparse
+import os
+import time
+
+from app import create_app
+from app.models import Student
+from app.services.partition import id_ranges, run_partitioned
+from app.services.visits import rebuild_partition
+from config import MaintenanceConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild visit sessions from attendance logs')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--partitions', type=int, default=None,
+                        help='number of student id ranges (default: 4 x workers)')
+    args = parser.parse_args()
+
+    app = create_app(MaintenanceConfig)
+    with app.app_context():
+        ranges = id_ranges(Student.id, args.partitions or args.workers * 4)
+        if not ranges:
+            print("No students found. Nothing to rebuild.")
+            return
+
+        print(f"🔁 Rebuilding visit sessions in {len(ranges)} partitions on {args.workers} workers...")
+        started = time.perf_counter()
+        total = 0
+        for (lo, hi), written in run_partitioned(rebuild_partition, ranges, args.workers):
+            total += written
+            print(f"   ✅ students {lo}-{hi}: {written} visits")
+
+    print(f"✅ Rebuilt {total} visits in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Run the compact UDP/TCP scan listener next to the web app.
+
+Gates configured with TRANSPORT = 'udp' or 'tcp' in raspberry_pi/config.py
+send binary scan frames here instead of JSON over HTTP.
+
+Usage: python scan_listener.py [--host 0.0.0.0] [--udp-port 5005] [--tcp-port 5006]
+"""
+import argparse
+import time
+
+from app import create_app
+from app.services.scan_listener import ScanListener
+from config import MaintenanceConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Binary scan protocol listener')
+    parser.add_argument('--host', default=None)
+    parser.add_argument('--udp-port', type=int, default=None)
+    parser.add_argument('--tcp-port', type=int, default=None)
+    args = parser.parse_args()
+
+    # The web workers run the scheduler and occupancy reconcile; this process only records scans
+    app = create_app(MaintenanceConfig)
+    listener = ScanListener(app, args.host, args.udp_port, args.tcp_port)
+    listener.start()
+    for host, port in listener.addresses:
+        print(f"📡 Listening for scan frames on {host}:{port}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down...")
+        listener.shutdown()
+
+
+if __name__ == '__main__':
+    main()
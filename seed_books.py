@@ -1,7 +1,8 @@
 from app import create_app, db
 from app.models.book import Book
+from config import MaintenanceConfig
 
-app = create_app()
+app = create_app(MaintenanceConfig)
 
 def seed_books():
     with app.app_context():
@@ -59,7 +60,5 @@ def seed_books():
         print("✅ Seeding complete!")
 
 if __name__ == "__main__":
-    # Ensure tables are created first
-    with app.app_context():
-        db.create_all()
+    # create_app() migrates an empty database; run `python migrate.py` on existing ones
     seed_books()